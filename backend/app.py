@@ -1,33 +1,121 @@
-from flask import Flask
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 import atexit
+import importlib
 import os
+import threading
+import time
 
 # Set OpenMP environment variables to avoid conflicts BEFORE importing any libraries
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
 
+# Split INFERENCE_THREAD_BUDGET across TF/Torch/Paddle/OpenCV/FAISS before they are imported
+from modules.common.scheduler import thread_budget
+thread_budget.export_env()
+
 from modules.camera_manager.camera_manager import camera_manager
-from modules.face_Recognition.face_recognition import face_recognition_bp
-from modules.vehicle_identification.vehicle_identification import vehicle_plate_bp
-from modules.human_Detection.human_detection import human_detection_bp
+from modules.jobs.jobs import jobs_bp
+from modules.common.jobs import job_manager
+from modules.common.lazy import get_lazy_stats
+from modules.common.db import client as mongo_client, get_db_stats
+
+# name -> (module path, blueprint attribute, url prefix)
+# Each module exposes warm_up() (load models/indexes now instead of on first use) and shutdown()
+AVAILABLE_MODULES = {
+    'face': ('modules.face_Recognition.face_recognition', 'face_recognition_bp', '/face_recog'),
+    'vehicle': ('modules.vehicle_identification.vehicle_identification', 'vehicle_plate_bp', '/vehicle_plate'),
+    'human': ('modules.human_Detection.human_detection', 'human_detection_bp', '/human_detection'),
+}
+# e.g. ENABLED_MODULES=human on a perimeter-only node
+ENABLED_MODULES = [name.strip() for name in os.environ.get('ENABLED_MODULES', 'face,vehicle,human').split(',') if name.strip()]
+# Modules whose models are loaded in the background right after startup
+WARMUP_MODULES = [name.strip() for name in os.environ.get('WARMUP_MODULES', '').split(',') if name.strip()]
 
 app = Flask(__name__)
 CORS(app)
+# Hard cap on any request body, enforced by Werkzeug while reading (also for chunked uploads);
+# endpoints check their own, smaller limits against Content-Length before parsing
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_REQUEST_BYTES', 512 * 1024 * 1024))
 
 # Set camera index to 0 to use USB webcam instead of built-in camera
 camera_manager.set_camera_index(0)  
 
-app.register_blueprint(face_recognition_bp, url_prefix='/face_recog')
-app.register_blueprint(vehicle_plate_bp, url_prefix='/vehicle_plate')
-app.register_blueprint(human_detection_bp, url_prefix='/human_detection')
+app.register_blueprint(jobs_bp, url_prefix='/jobs')
+
+loaded_modules = {}
+startup_report = {'modules': {}, 'warm_up': {}}
+
+for name in ENABLED_MODULES:
+    if name not in AVAILABLE_MODULES:
+        print(f"Unknown module '{name}' in ENABLED_MODULES, skipping")
+        continue
+    module_path, blueprint_name, url_prefix = AVAILABLE_MODULES[name]
+    started = time.perf_counter()
+    module = importlib.import_module(module_path)
+    startup_report['modules'][name] = {'import_seconds': round(time.perf_counter() - started, 3), 'url_prefix': url_prefix}
+    app.register_blueprint(getattr(module, blueprint_name), url_prefix=url_prefix)
+    loaded_modules[name] = module
+
+thread_budget.apply()
+
+print("Startup import report:")
+for name, entry in startup_report['modules'].items():
+    print(f"  {name:<8} {entry['import_seconds']:>7.3f}s  {entry['url_prefix']}")
+disabled = [name for name in AVAILABLE_MODULES if name not in loaded_modules]
+if disabled:
+    print(f"  disabled: {', '.join(disabled)}")
+
+def warm_up_modules(names):
+    for name in names:
+        module = loaded_modules.get(name)
+        if module is None:
+            continue
+        started = time.perf_counter()
+        try:
+            module.warm_up()
+            startup_report['warm_up'][name] = {'seconds': round(time.perf_counter() - started, 3)}
+        except Exception as e:
+            print(f"Warm-up of module '{name}' failed: {e}")
+            startup_report['warm_up'][name] = {'error': str(e)}
+
+if WARMUP_MODULES:
+    threading.Thread(target=warm_up_modules, args=(WARMUP_MODULES,), name="warm-up", daemon=True).start()
+
+@app.route('/system/modules', methods=['GET'])
+def system_modules():
+    return jsonify({
+        'enabled': list(loaded_modules),
+        'disabled': [name for name in AVAILABLE_MODULES if name not in loaded_modules],
+        'startup': startup_report,
+        'lazy_resources': get_lazy_stats()
+    })
+
+# Shared MongoDB client: pool settings, pool checkout wait and per-command latency
+@app.route('/system/db', methods=['GET'])
+def system_db():
+    return jsonify(get_db_stats())
+
+# Body: {"modules": ["face", "vehicle"]} (default: all enabled); loads in the background
+@app.route('/system/warmup', methods=['POST'])
+def system_warmup():
+    names = (request.get_json(silent=True) or {}).get('modules') or list(loaded_modules)
+    unknown = [name for name in names if name not in loaded_modules]
+    if unknown:
+        return jsonify({'success': False, 'message': f"Modules not enabled: {', '.join(unknown)}"}), 400
+    threading.Thread(target=warm_up_modules, args=(names,), name="warm-up", daemon=True).start()
+    return jsonify({'success': True, 'warming_up': names}), 202
 
 # Clean up camera resources on application exit
 def cleanup_resources():
     print("Cleaning up camera resources...")
+    job_manager.stop()
+    for module in loaded_modules.values():
+        module.shutdown()
     camera_manager.cleanup()
+    mongo_client.close()
 
 atexit.register(cleanup_resources)
 
 if __name__ == '__main__':
     # app.run(debug=True)
-    app.run(host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, threaded=True)
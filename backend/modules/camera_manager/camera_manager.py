@@ -3,8 +3,70 @@ import threading
 import time
 import os
 
+from modules.camera_manager.motion_gate import get_motion_stats
+
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
 
+# How long a read of a live source waits for a frame newer than the one it returned last
+LIVE_FRAME_TIMEOUT = float(os.environ.get('SOURCE_FRAME_TIMEOUT_SECONDS', 2.0))
+
+
+class LatestFrameReader:
+    """
+    Reads a live stream on its own thread and keeps only the newest frame.
+    Backends such as FFmpeg ignore CAP_PROP_BUFFERSIZE and keep buffering between reads,
+    so a consumer slower than the stream would otherwise get ever older frames.
+    The thread owns the capture and releases it when it stops or the stream drops.
+    """
+
+    def __init__(self, capture, name):
+        self.capture = capture
+        self.condition = threading.Condition()
+        self.frame = None
+        self.sequence = 0
+        self.delivered = 0
+        self.failed = False
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"source-reader-{name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                ret, frame = self.capture.read()
+                with self.condition:
+                    if not ret or frame is None or frame.size == 0:
+                        self.failed = True
+                        return
+                    self.frame = frame
+                    self.sequence += 1
+                    self.condition.notify_all()
+        except Exception as e:
+            print(f"Error reading source {self.thread.name}: {e}")
+            with self.condition:
+                self.failed = True
+        finally:
+            with self.condition:
+                self.condition.notify_all()
+            try:
+                self.capture.release()
+            except Exception as e:
+                print(f"Error releasing source {self.thread.name}: {e}")
+
+    def read(self, timeout):
+        """The newest frame not returned before, waiting up to timeout for one"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence > self.delivered or self.failed, timeout)
+            if self.sequence <= self.delivered:
+                return False, None
+            self.delivered = self.sequence
+            return True, self.frame
+
+    def stop(self):
+        # Not joined: a blocked network read can take a while, the thread exits after it
+        self.stop_event.set()
+
+
 class CameraManager:
     """
     Singleton class to manage camera access across different blueprints
@@ -30,6 +92,8 @@ class CameraManager:
                 cls._instance.video_feed_thread_id = None
                 cls._instance.video_feed_lock = threading.Lock()
                 cls._instance.cleanup_in_progress = False
+                cls._instance.sources = {}
+                cls._instance.sources_lock = threading.Lock()
             return cls._instance
     
     def set_camera_index(self, index):
@@ -213,6 +277,125 @@ class CameraManager:
                 
                 self.in_use = False
     
+    def add_source(self, source_id, uri, owner=None):
+        """
+        Register an additional named video source (RTSP/HTTP URL, file path or device index).
+        Named sources are independent of the USB camera and are opened lazily on first read.
+        owner tags which consumer the source belongs to; a source registered by another owner
+        is never replaced (ValueError).
+        """
+        with self.sources_lock:
+            existing = self.sources.get(source_id)
+            if existing is not None and existing["owner"] != owner:
+                raise ValueError(f"Source {source_id} is already registered by {existing['owner']}")
+            self.sources.pop(source_id, None)
+            self.sources[source_id] = {
+                "uri": uri,
+                "owner": owner,
+                "live": isinstance(uri, str) and "://" in uri,
+                "capture": None,
+                "reader": None,
+                "lock": threading.Lock(),
+                "read_failures": 0,
+                "last_frame_time": None
+            }
+        if existing is not None:
+            self._release_source(existing)
+
+    def remove_source(self, source_id, owner=None):
+        """Unregister a named source and release its capture; with owner, only that owner's source"""
+        with self.sources_lock:
+            source = self.sources.get(source_id)
+            if source is None or (owner is not None and source["owner"] != owner):
+                return False
+            del self.sources[source_id]
+        self._release_source(source)
+        return True
+
+    def list_sources(self, owner=None):
+        """Return the ids of all registered named sources, or only those of one owner"""
+        with self.sources_lock:
+            return [source_id for source_id, source in self.sources.items()
+                    if owner is None or source["owner"] == owner]
+
+    def _open_source(self, uri):
+        capture = cv2.VideoCapture(uri)
+        if not capture.isOpened():
+            capture.release()
+            return None
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+
+    def _release_source(self, source):
+        with source["lock"]:
+            if source["reader"] is not None:
+                source["reader"].stop()
+                source["reader"] = None
+            if source["capture"] is not None:
+                try:
+                    source["capture"].release()
+                except Exception as e:
+                    print(f"Error releasing source {source['uri']}: {e}")
+                source["capture"] = None
+
+    def read_source_frame(self, source_id):
+        """Read the latest frame from a named source, reopening it if the stream dropped"""
+        with self.sources_lock:
+            source = self.sources.get(source_id)
+        if source is None:
+            return False, None
+
+        with source["lock"]:
+            if source["live"]:
+                ret, frame = self._read_live(source_id, source)
+            else:
+                ret, frame = self._read_file(source)
+            if not ret:
+                source["read_failures"] += 1
+                return False, None
+
+            source["last_frame_time"] = time.time()
+            return True, frame
+
+    def _read_live(self, source_id, source):
+        if source["reader"] is None:
+            capture = self._open_source(source["uri"])
+            if capture is None:
+                return False, None
+            source["reader"] = LatestFrameReader(capture, source_id)
+        ret, frame = source["reader"].read(LIVE_FRAME_TIMEOUT)
+        if not ret and source["reader"].failed:
+            # The stream dropped, reopen it on the next read
+            source["reader"] = None
+        return ret, frame
+
+    def _read_file(self, source):
+        if source["capture"] is None:
+            source["capture"] = self._open_source(source["uri"])
+            if source["capture"] is None:
+                return False, None
+        ret, frame = source["capture"].read()
+        if not ret or frame is None or frame.size == 0:
+            source["capture"].release()
+            source["capture"] = None
+            return False, None
+        return True, frame
+
+    def get_sources_status(self, owner=None):
+        """Get status of all named sources, or only those of one owner"""
+        with self.sources_lock:
+            return {
+                source_id: {
+                    "uri": str(source["uri"]),
+                    "owner": source["owner"],
+                    "opened": source["capture"] is not None or source["reader"] is not None,
+                    "read_failures": source["read_failures"],
+                    "last_frame_time": source["last_frame_time"]
+                }
+                for source_id, source in self.sources.items()
+                if owner is None or source["owner"] == owner
+            }
+
     def is_camera_available(self):
         """Check if camera is available for use"""
         with self.camera_lock:
@@ -231,7 +414,9 @@ class CameraManager:
                     "video_feed_thread_id": self.video_feed_thread_id,
                     "camera_index": self.camera_index,
                     "initialization_attempts": self.initialization_attempts,
-                    "cleanup_in_progress": self.cleanup_in_progress
+                    "cleanup_in_progress": self.cleanup_in_progress,
+                    "sources": self.get_sources_status(),
+                    "motion_gates": get_motion_stats()
                 }
     
     def cleanup(self):
@@ -255,6 +440,12 @@ class CameraManager:
                 
                 self.in_use = False
                 self.initialization_attempts = 0
+
+                with self.sources_lock:
+                    sources = list(self.sources.values())
+                for source in sources:
+                    self._release_source(source)
+
                 self.cleanup_in_progress = False
                 print("Camera cleanup completed")
 
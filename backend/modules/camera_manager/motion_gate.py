@@ -0,0 +1,230 @@
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap change-detection stage placed in front of any frame consumer.
+    Frames are downscaled and compared against the recent background; only frames
+    whose changed area exceeds area_threshold (fraction of the ROI) are passed on.
+    Settings are validated up front (validate_settings), so a bad value is rejected
+    when it is configured rather than failing on every frame.
+    """
+
+    METHODS = ("diff", "mog2")
+    MIN_WORK_WIDTH = 16
+    MAX_WORK_WIDTH = 1920
+
+    def __init__(self, name, method="diff", area_threshold=0.01, work_width=160,
+                 pixel_threshold=25, roi=None, hold_frames=3, max_skip_seconds=None):
+        settings = self.validate_settings(
+            method=method, area_threshold=area_threshold, work_width=work_width, pixel_threshold=pixel_threshold,
+            roi=roi, hold_frames=hold_frames, max_skip_seconds=max_skip_seconds
+        )
+        self.name = name
+        self.method = settings["method"]
+        self.area_threshold = settings["area_threshold"]
+        self.work_width = settings["work_width"]
+        self.pixel_threshold = settings["pixel_threshold"]
+        self.roi = settings["roi"]  # list of polygons in normalized (x, y) coordinates
+        self.hold_frames = settings["hold_frames"]
+        self.max_skip_seconds = settings["max_skip_seconds"]
+
+        self.lock = threading.Lock()
+        self.background = None
+        self.subtractor = None
+        self.roi_mask = None
+        self.roi_area = 0
+        self.work_shape = None
+        self.hold_remaining = 0
+        self.last_processed = 0
+
+        self.frames = 0
+        self.skipped = 0
+        self.last_motion_ratio = 0.0
+        self.last_motion_time = None
+
+    @staticmethod
+    def _number(key, value, minimum, maximum, integer=False):
+        if isinstance(value, bool):
+            raise ValueError(f"{key} must be a number")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} must be a number")
+        if not math.isfinite(number) or not minimum <= number <= maximum:
+            raise ValueError(f"{key} must be between {minimum} and {maximum}")
+        if integer:
+            if number != int(number):
+                raise ValueError(f"{key} must be a whole number")
+            return int(number)
+        return number
+
+    @classmethod
+    def _roi(cls, roi):
+        if roi is None or (isinstance(roi, (list, tuple)) and len(roi) == 0):
+            return None
+        if not isinstance(roi, (list, tuple)):
+            raise ValueError("roi must be a list of polygons")
+        polygons = []
+        for polygon in roi:
+            if not isinstance(polygon, (list, tuple)) or len(polygon) < 3:
+                raise ValueError("each roi polygon needs at least 3 points")
+            points = []
+            for point in polygon:
+                if not isinstance(point, (list, tuple)) or len(point) != 2:
+                    raise ValueError("roi points must be [x, y] pairs")
+                points.append((cls._number("roi x", point[0], 0.0, 1.0), cls._number("roi y", point[1], 0.0, 1.0)))
+            polygons.append(points)
+        return polygons
+
+    @classmethod
+    def validate_settings(cls, **params):
+        """Checked and converted copy of gate settings; raises ValueError on an unknown key or bad value"""
+        settings = {}
+        for key, value in params.items():
+            if key == "method":
+                if value not in cls.METHODS:
+                    raise ValueError(f"Unknown motion detection method: {value}")
+                settings[key] = value
+            elif key == "area_threshold":
+                settings[key] = cls._number(key, value, 0.0, 1.0)
+            elif key == "work_width":
+                settings[key] = cls._number(key, value, cls.MIN_WORK_WIDTH, cls.MAX_WORK_WIDTH, integer=True)
+            elif key == "pixel_threshold":
+                settings[key] = cls._number(key, value, 0, 255, integer=True)
+            elif key == "hold_frames":
+                settings[key] = cls._number(key, value, 0, 1000, integer=True)
+            elif key == "max_skip_seconds":
+                settings[key] = None if value is None else cls._number(key, value, 0.0, 86400.0)
+            elif key == "roi":
+                settings[key] = cls._roi(value)
+            else:
+                raise ValueError(f"Unknown motion setting: {key}")
+        return settings
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        work_height = max(1, int(height * self.work_width / width))
+        small = cv2.resize(frame, (self.work_width, work_height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _build_roi_mask(self, shape):
+        height, width = shape
+        self.work_shape = shape
+        if not self.roi:
+            self.roi_mask = None
+            self.roi_area = height * width
+            return
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for polygon in self.roi:
+            points = np.array([[int(x * width), int(y * height)] for x, y in polygon], dtype=np.int32)
+            cv2.fillPoly(mask, [points], 255)
+        self.roi_mask = mask
+        self.roi_area = max(int(cv2.countNonZero(mask)), 1)
+
+    def _motion_ratio(self, gray):
+        if gray.shape != self.work_shape:
+            self._build_roi_mask(gray.shape)
+            self.background = None
+            self.subtractor = None
+
+        if self.method == "mog2":
+            if self.subtractor is None:
+                self.subtractor = cv2.createBackgroundSubtractorMOG2(history=500, detectShadows=True)
+            foreground = self.subtractor.apply(gray)
+            # Shadows are marked 127, keep only confident foreground
+            _, changed = cv2.threshold(foreground, 200, 255, cv2.THRESH_BINARY)
+        else:
+            if self.background is None:
+                self.background = gray.astype(np.float32)
+                return 1.0
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+            cv2.accumulateWeighted(gray, self.background, 0.1)
+            _, changed = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+
+        if self.roi_mask is not None:
+            changed = cv2.bitwise_and(changed, self.roi_mask)
+        changed = cv2.dilate(changed, None, iterations=1)
+        return cv2.countNonZero(changed) / self.roi_area
+
+    def should_process(self, frame):
+        """Return True if the frame has significant motion and should reach the model"""
+        with self.lock:
+            now = time.time()
+            self.frames += 1
+            ratio = self._motion_ratio(self._prepare(frame))
+            self.last_motion_ratio = ratio
+
+            if ratio >= self.area_threshold:
+                self.last_motion_time = now
+                self.hold_remaining = self.hold_frames
+                process = True
+            elif self.hold_remaining > 0:
+                self.hold_remaining -= 1
+                process = True
+            elif self.max_skip_seconds is not None and now - self.last_processed >= self.max_skip_seconds:
+                process = True
+            else:
+                process = False
+
+            if process:
+                self.last_processed = now
+            else:
+                self.skipped += 1
+            return process
+
+    def configure(self, **params):
+        """Update gate parameters all at once (nothing changes if any is invalid); background state is reset"""
+        settings = self.validate_settings(**params)
+        with self.lock:
+            for key, value in settings.items():
+                setattr(self, key, value)
+            self.background = None
+            self.subtractor = None
+            self.work_shape = None
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "method": self.method,
+                "area_threshold": self.area_threshold,
+                "frames": self.frames,
+                "skipped": self.skipped,
+                "processed": self.frames - self.skipped,
+                "skip_ratio": round(self.skipped / self.frames, 4) if self.frames else 0.0,
+                "last_motion_ratio": round(self.last_motion_ratio, 4),
+                "last_motion_time": self.last_motion_time
+            }
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+
+def get_motion_gate(name, **params):
+    """Get (or create) the shared motion gate registered under name"""
+    with _gates_lock:
+        gate = _gates.get(name)
+        if gate is None:
+            gate = MotionGate(name, **params)
+            _gates[name] = gate
+        return gate
+
+
+def remove_motion_gate(name):
+    with _gates_lock:
+        return _gates.pop(name, None) is not None
+
+
+def get_motion_stats():
+    """Skip statistics for every registered motion gate"""
+    with _gates_lock:
+        gates = list(_gates.items())
+    return {name: gate.get_stats() for name, gate in gates}
@@ -0,0 +1,199 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import bson
+from bson.errors import InvalidDocument
+from pymongo.errors import BulkWriteError, ConnectionFailure, ExecutionTimeout, WTimeoutError
+
+# Network errors, server selection timeouts and write timeouts are worth retrying
+TRANSIENT_ERRORS = (ConnectionFailure, ExecutionTimeout, WTimeoutError)
+DUPLICATE_KEY = 11000
+
+
+class BatchedWriter:
+    """
+    Bounded background queue that persists documents with insert_many.
+    submit() never blocks: when the queue is full it returns False so the
+    caller can apply backpressure (e.g. answer 503 with Retry-After).
+    On an unacknowledged (w=0) collection nothing is known about the outcome:
+    such batches are counted as "unacknowledged", never as "written", and
+    on_flush is not called for them.
+    Transient errors are retried with exponential backoff. Documents that still fail
+    are counted individually (an unordered insert_many stores the rest of the batch),
+    listed in get_stats() and, with dead_letter_dir set, appended to a .bson file there
+    that mongorestore can replay.
+    """
+
+    def __init__(self, collection, max_queue=1000, batch_size=50, flush_interval=0.2,
+                 on_flush=None, name="batched-writer", max_retries=3, retry_backoff=0.5,
+                 dead_letter_dir=None):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.name = name
+        self.acknowledged = collection.write_concern.acknowledged
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_dir = dead_letter_dir
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.thread_lock = threading.Lock()
+
+        self.stats_lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.unacknowledged = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.write_time = 0.0
+        self.recent_failures = deque(maxlen=50)
+
+    def _ensure_started(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.thread_lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.stop_event.clear()
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+
+    def submit(self, doc):
+        """Queue a document for persistence; returns False if the queue is full"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(doc)
+        except queue.Full:
+            with self.stats_lock:
+                self.rejected += 1
+            return False
+        with self.stats_lock:
+            self.accepted += 1
+        return True
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, batch):
+        """insert_many with retries; returns (written docs, [(doc, error)] that failed for good)"""
+        pending, written, failed = batch, [], []
+        attempt = 0
+        while pending:
+            try:
+                self.collection.insert_many(pending, ordered=False)
+                written.extend(pending)
+                pending = []
+            except BulkWriteError as e:
+                errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+                for index, doc in enumerate(pending):
+                    error = errors.get(index)
+                    # After a retry, a duplicate _id means an earlier attempt did store the document
+                    if error is None or (attempt and error.get("code") == DUPLICATE_KEY):
+                        written.append(doc)
+                    else:
+                        failed.append((doc, error.get("errmsg", "write error")))
+                pending = []
+            except TRANSIENT_ERRORS as e:
+                if attempt >= self.max_retries:
+                    failed.extend((doc, str(e)) for doc in pending)
+                    pending = []
+                    continue
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                with self.stats_lock:
+                    self.retries += 1
+                print(f"{self.name}: transient error writing {len(pending)} documents, retry {attempt} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+            except Exception as e:
+                failed.extend((doc, str(e)) for doc in pending)
+                pending = []
+        return written, failed
+
+    def _dead_letter(self, failed):
+        print(f"{self.name}: {len(failed)} documents could not be written: {failed[0][1]}")
+        now = time.time()
+        with self.stats_lock:
+            for doc, error in failed:
+                self.recent_failures.append({"id": str(doc.get("_id")), "error": error, "failed_at": now})
+        if not self.dead_letter_dir:
+            return
+        path = os.path.join(self.dead_letter_dir, f"{self.name}-{time.time_ns()}.bson")
+        try:
+            os.makedirs(self.dead_letter_dir, exist_ok=True)
+            with open(path, "wb") as handle:
+                for doc, _ in failed:
+                    handle.write(bson.encode(doc))
+        except (OSError, InvalidDocument) as e:
+            print(f"{self.name}: could not write dead letters to {path}: {e}")
+
+    def _write(self, batch):
+        started = time.time()
+        written, failed = self._insert(batch)
+        with self.stats_lock:
+            if self.acknowledged:
+                self.written += len(written)
+            else:
+                self.unacknowledged += len(written)
+            self.failed += len(failed)
+            self.batches += 1
+            self.write_time += time.time() - started
+        if failed:
+            self._dead_letter(failed)
+        if written and self.on_flush is not None and self.acknowledged:
+            try:
+                self.on_flush(written)
+            except Exception as e:
+                print(f"{self.name}: on_flush callback failed: {e}")
+
+    def _run(self):
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def stop(self, timeout=5.0):
+        """Flush queued documents and stop the writer thread"""
+        self.stop_event.set()
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+        self.thread = None
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "acknowledged": self.acknowledged,
+                "written": self.written,
+                "unacknowledged": self.unacknowledged,
+                "failed": self.failed,
+                "retries": self.retries,
+                "recent_failures": list(self.recent_failures)[-10:],
+                "dead_letter_dir": self.dead_letter_dir,
+                "batches": self.batches,
+                "avg_batch_size": round((self.written + self.unacknowledged) / self.batches, 2) if self.batches else 0,
+                "avg_batch_write_ms": round(1000 * self.write_time / self.batches, 2) if self.batches else 0
+            }
@@ -0,0 +1,174 @@
+"""
+Shared MongoDB access: one MongoClient per process, tuned from the environment,
+with collection handles that carry an explicit write/read concern and command /
+connection-pool monitoring for latency metrics.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from pymongo import MongoClient, monitoring
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
+MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'Smart_Surveillance')
+
+# Write concern per kind of data
+ACKNOWLEDGED = WriteConcern(w=1)      # registrations, audit logs, rollups
+FIRE_AND_FORGET = WriteConcern(w=0)   # high-rate detection ingest
+LOCAL_READS = ReadConcern('local')
+
+
+class MongoMetrics(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """Per-command latency and connection-pool checkout wait, from pymongo monitoring events"""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.window = window
+        self.commands = {}  # command name -> {"count", "failed", "latency": deque of ms}
+        self.pool_waits = deque(maxlen=window)
+        self.checkout_failures = 0
+        self.connections_created = 0
+        self.pool_clears = 0
+        self.checkout_started = threading.local()
+
+    def _command(self, name):
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = {"count": 0, "failed": 0, "latency": deque(maxlen=self.window)}
+            self.commands[name] = stats
+        return stats
+
+    # Command events
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        with self.lock:
+            stats = self._command(event.command_name)
+            stats["count"] += 1
+            stats["latency"].append(event.duration_micros / 1000)
+
+    def failed(self, event):
+        with self.lock:
+            stats = self._command(event.command_name)
+            stats["count"] += 1
+            stats["failed"] += 1
+            stats["latency"].append(event.duration_micros / 1000)
+
+    # Connection pool events; a checkout starts and completes on the same thread
+    def connection_check_out_started(self, event):
+        self.checkout_started.value = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self.checkout_started, "value", None)
+        self.checkout_started.value = None
+        if started is not None:
+            with self.lock:
+                self.pool_waits.append(1000 * (time.perf_counter() - started))
+
+    def connection_check_out_failed(self, event):
+        self.checkout_started.value = None
+        with self.lock:
+            self.checkout_failures += 1
+
+    def connection_created(self, event):
+        with self.lock:
+            self.connections_created += 1
+
+    def pool_cleared(self, event):
+        with self.lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    @staticmethod
+    def _summarize(samples):
+        if not samples:
+            return {"avg_ms": 0, "p95_ms": 0, "max_ms": 0}
+        ordered = sorted(samples)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered), 3),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+            "max_ms": round(ordered[-1], 3)
+        }
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "pool_wait": self._summarize(self.pool_waits),
+                "checkout_failures": self.checkout_failures,
+                "connections_created": self.connections_created,
+                "pool_clears": self.pool_clears,
+                "commands": {
+                    name: {"count": stats["count"], "failed": stats["failed"], **self._summarize(stats["latency"])}
+                    for name, stats in self.commands.items()
+                }
+            }
+
+
+mongo_metrics = MongoMetrics()
+
+
+def _client_options():
+    options = {
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', 50)),
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)),
+        "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000)),
+        "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        "socketTimeoutMS": int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 30000)),
+        "event_listeners": [mongo_metrics],
+    }
+    # e.g. "zstd,snappy,zlib"; zstd and snappy need the zstandard / python-snappy packages
+    compressors = os.environ.get('MONGO_COMPRESSORS')
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+CLIENT_OPTIONS = _client_options()
+client = MongoClient(MONGO_URI, **CLIENT_OPTIONS)
+db = client[MONGO_DB_NAME]
+
+
+def get_collection(name, write_concern=ACKNOWLEDGED, read_concern=LOCAL_READS):
+    return db.get_collection(name, write_concern=write_concern, read_concern=read_concern)
+
+
+def get_log_collection(name, write_concern=ACKNOWLEDGED):
+    """
+    Handle for an append-only log collection; audit logs are always acknowledged.
+    Nothing is sent to MongoDB here: LogRollups.prepare() creates the collection as
+    time-series (where supported) before the first write.
+    """
+    return get_collection(name, write_concern=write_concern)
+
+
+def get_db_stats():
+    return {
+        "database": MONGO_DB_NAME,
+        "max_pool_size": CLIENT_OPTIONS["maxPoolSize"],
+        "min_pool_size": CLIENT_OPTIONS["minPoolSize"],
+        "wait_queue_timeout_ms": CLIENT_OPTIONS["waitQueueTimeoutMS"],
+        "compressors": CLIENT_OPTIONS.get("compressors"),
+        **mongo_metrics.get_stats()
+    }
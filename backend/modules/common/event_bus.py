@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class EventBus:
+    """
+    In-process publish/subscribe channel for change notifications
+    Keeps a short history so reconnecting clients can resume from their last event id.
+    SSE ids are "<epoch>-<sequence>" with a per-boot epoch, so an id from before a
+    restart is recognised as stale instead of hiding all the new, lower sequences.
+    """
+
+    def __init__(self, history_size=500):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=history_size)
+        self._sequence = 0
+        self.epoch = format(int(time.time() * 1000), "x")
+
+    def parse_last_id(self, value):
+        """Sequence to resume after from a Last-Event-ID, 0 when it is missing, malformed or from another boot"""
+        epoch, _, sequence = str(value or "").rpartition("-")
+        if epoch != self.epoch:
+            return 0
+        try:
+            sequence = int(sequence)
+        except ValueError:
+            return 0
+        with self._condition:
+            return sequence if 0 <= sequence <= self._sequence else 0
+
+    def publish(self, channel, event_type, payload=None):
+        """Publish one event on a channel and wake up all waiting subscribers"""
+        with self._condition:
+            self._sequence += 1
+            event = {
+                "id": self._sequence,
+                "channel": channel,
+                "type": event_type,
+                "timestamp": time.time(),
+                "payload": payload or {}
+            }
+            self._events.append(event)
+            self._condition.notify_all()
+            return event
+
+    def events_since(self, last_id, channels=None, timeout=None):
+        """Return events newer than last_id, blocking up to timeout seconds if there are none"""
+        with self._condition:
+            pending = self._collect(last_id, channels)
+            if pending or timeout is None:
+                return pending
+
+            deadline = time.time() + timeout
+            while not pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+                pending = self._collect(last_id, channels)
+            return pending
+
+    def _collect(self, last_id, channels):
+        return [
+            event for event in self._events
+            if event["id"] > last_id and (channels is None or event["channel"] in channels)
+        ]
+
+    def stream(self, channels=None, last_id=0, heartbeat=15, stop_event=None):
+        """Generator yielding Server-Sent Events for the given channels"""
+        while stop_event is None or not stop_event.is_set():
+            events = self.events_since(last_id, channels, timeout=heartbeat)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                last_id = event["id"]
+                yield f"id: {self.epoch}-{event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+event_bus = EventBus()
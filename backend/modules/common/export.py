@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+from flask import Response, stream_with_context
+
+# Documents fetched per MongoDB round trip while exporting
+EXPORT_BATCH_SIZE = 500
+# Rows buffered before each chunk is sent to the client
+ROWS_PER_CHUNK = 200
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+def _ndjson_rows(cursor, formatter):
+    chunk = []
+    for doc in cursor:
+        chunk.append(json.dumps(formatter(doc)))
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def _csv_rows(cursor, formatter, fields):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+    for doc in cursor:
+        writer.writerow(formatter(doc))
+        rows += 1
+        if rows % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def export_response(cursor, formatter, fields, export_format, filename):
+    """
+    Stream a MongoDB cursor as NDJSON or CSV without materializing the result set.
+    Memory use is bounded by the cursor batch size and ROWS_PER_CHUNK.
+    """
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    cursor = cursor.batch_size(EXPORT_BATCH_SIZE)
+    if export_format == "csv":
+        body = _csv_rows(cursor, formatter, fields)
+    else:
+        body = _ndjson_rows(cursor, formatter)
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}.{extension}"}
+    )
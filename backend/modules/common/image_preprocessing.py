@@ -0,0 +1,158 @@
+import io
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# ID-1 card (85.6 x 54 mm) at 300 DPI
+CARD_CANONICAL_SIZE = (1011, 638)
+# Plates are rectified to this height (two rows of the 48 px recognizer height)
+PLATE_CANONICAL_HEIGHT = 96
+# Quad detection runs on a copy whose longest side is at most this many pixels
+QUAD_WORK_DIM = 640
+
+
+class StageTimer:
+    """Collects per-stage wall-clock timings in milliseconds"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 2)
+
+
+@contextmanager
+def timed_stage(timer, name):
+    """timer.stage(name), or a no-op when no timer is passed"""
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
+
+
+def decode_image(data, max_dim=None, timer=None):
+    """
+    Decode encoded image bytes to BGR. When max_dim is given and the image is much
+    larger, libjpeg decodes directly at 1/2, 1/4 or 1/8 scale instead of full size.
+    """
+    with timed_stage(timer, "decode"):
+        flags = cv2.IMREAD_COLOR
+        if max_dim:
+            try:
+                # Header-only parse to learn the dimensions
+                with Image.open(io.BytesIO(data)) as header:
+                    largest_side = max(header.size)
+                    is_jpeg = header.format == "JPEG"
+            except Exception:
+                largest_side, is_jpeg = 0, False
+            if is_jpeg:
+                for factor, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                                             (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                             (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                    if largest_side / factor >= max_dim:
+                        flags = reduced_flag
+                        break
+        return cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+
+
+def order_quad(points):
+    """Order four points as top-left, top-right, bottom-right, bottom-left"""
+    points = np.asarray(points, dtype=np.float32).reshape(4, 2)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)]
+    ], dtype=np.float32)
+
+
+def find_quad(image, work_dim=QUAD_WORK_DIM, min_area_ratio=0.1, canny=(20, 80)):
+    """
+    Locate the dominant quadrilateral (card or plate border) on a downscaled copy.
+    Returns the 4 corners in full-resolution coordinates, or None.
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, work_dim / max(height, width))
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else image
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edged = cv2.dilate(cv2.Canny(blurred, *canny), None, iterations=1)
+
+    contours, _ = cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_area_ratio * gray.shape[0] * gray.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(contour) < min_area:
+            break
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4:
+            quad = approx.reshape(4, 2)
+        else:
+            quad = cv2.boxPoints(cv2.minAreaRect(contour))
+        return order_quad(quad / scale)
+    return None
+
+
+def warp_quad(image, quad, size):
+    """Perspective-warp the quad region to an axis-aligned (width, height) image"""
+    width, height = size
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(order_quad(quad), target)
+    return cv2.warpPerspective(image, matrix, (width, height), flags=cv2.INTER_LINEAR)
+
+
+def _quad_size(quad):
+    top_left, top_right, bottom_right, bottom_left = quad
+    width = max(np.linalg.norm(top_right - top_left), np.linalg.norm(bottom_right - bottom_left))
+    height = max(np.linalg.norm(bottom_left - top_left), np.linalg.norm(bottom_right - top_right))
+    return width, height
+
+
+def canonical_card(image, timer=None):
+    """
+    Detect the ID card on a downscaled copy and warp only that region to the
+    canonical 300 DPI card size. Falls back to the whole image at its original resolution
+    if no card is found: the card may fill only part of the frame, and shrinking the frame
+    to the card width would shrink its text below what full-frame OCR needs. Callers bound
+    the size at decode time (see ID_DECODE_MAX_DIM).
+    """
+    with timed_stage(timer, "card_detect"):
+        quad = find_quad(image, min_area_ratio=0.1)
+    with timed_stage(timer, "card_warp"):
+        width, height = CARD_CANONICAL_SIZE
+        if quad is None:
+            return image
+        quad_width, quad_height = _quad_size(quad)
+        if quad_height > quad_width:
+            # Portrait cards (e.g. vertical college IDs) keep their orientation
+            width, height = height, width
+        return warp_quad(image, quad, (width, height))
+
+
+def canonical_plate(crop, timer=None, height=PLATE_CANONICAL_HEIGHT):
+    """
+    Rectify a detector plate crop: find the plate border on a small copy and warp it
+    to a fixed height, or just resize the crop when no border is found.
+    """
+    with timed_stage(timer, "plate_rectify"):
+        quad = find_quad(crop, work_dim=256, min_area_ratio=0.4, canny=(50, 150))
+        if quad is not None:
+            quad_width, quad_height = _quad_size(quad)
+            if quad_height >= 8:
+                width = max(int(height * quad_width / quad_height), 1)
+                return warp_quad(crop, quad, (width, height))
+        crop_height, crop_width = crop.shape[:2]
+        width = max(int(crop_width * height / crop_height), 1)
+        interpolation = cv2.INTER_CUBIC if height > crop_height else cv2.INTER_AREA
+        return cv2.resize(crop, (width, height), interpolation=interpolation)
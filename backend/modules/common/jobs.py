@@ -0,0 +1,186 @@
+import os
+import secrets
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify
+
+from modules.common.event_bus import event_bus
+
+JOB_EVENTS_CHANNEL = "jobs"
+
+
+class JobManager:
+    """
+    Runs long inference requests on a bounded worker pool.
+    submit() never blocks: when max_queue jobs are already waiting it returns None so the
+    route can answer 503. Finished jobs are kept for result_ttl seconds, then evicted.
+    Every state change is published on the "jobs" event channel. The channel is shared by
+    all subscribers, so events carry only the job id and status; results (which may hold
+    OCR'd personal data) and errors are fetched by the job's owner from /jobs/<id>.
+    """
+
+    def __init__(self, max_workers=4, max_queue=64, result_ttl=600, name="jobs"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.name = name
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+        self.lock = threading.Lock()
+        self.jobs = {}  # job_id -> job dict
+        self.queued = 0
+        self.running = 0
+
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.expired = 0
+        self.latencies = {}  # kind -> {"wait": deque, "run": deque} in ms
+
+    def _expire(self, now):
+        stale = [job_id for job_id, job in self.jobs.items()
+                 if job["finished_at"] is not None and job["finished_at"] + self.result_ttl <= now]
+        for job_id in stale:
+            del self.jobs[job_id]
+        self.expired += len(stale)
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); returns the job id, or None if the queue is full"""
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                return None
+            job = {
+                "id": secrets.token_urlsafe(12),
+                "kind": kind,
+                "status": "queued",
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self.jobs[job["id"]] = job
+            self.queued += 1
+            self.submitted += 1
+        self._publish(job)
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job["id"]
+
+    def _run(self, job, fn, args, kwargs):
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        self._publish(job)
+
+        try:
+            result, error, status = fn(*args, **kwargs), None, "succeeded"
+        except Exception as e:
+            traceback.print_exc()
+            result, error, status = None, str(e), "failed"
+
+        with self.lock:
+            self.running -= 1
+            job.update(status=status, result=result, error=error, finished_at=time.time())
+            if status == "succeeded":
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            latencies = self.latencies.setdefault(job["kind"], {"wait": deque(maxlen=200), "run": deque(maxlen=200)})
+            latencies["wait"].append(1000 * (job["started_at"] - job["created_at"]))
+            latencies["run"].append(1000 * (job["finished_at"] - job["started_at"]))
+        self._publish(job)
+
+    def _publish(self, job):
+        payload = {"job_id": job["id"], "kind": job["kind"], "status": job["status"]}
+        event_bus.publish(JOB_EVENTS_CHANNEL, f"job_{job['status']}", payload)
+
+    def get(self, job_id):
+        """Public view of a job, or None if it is unknown or expired"""
+        with self.lock:
+            self._expire(time.time())
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            view = {
+                "job_id": job["id"],
+                "kind": job["kind"],
+                "status": job["status"],
+                "created_at": job["created_at"]
+            }
+            if job["started_at"] is not None:
+                view["queue_ms"] = round(1000 * (job["started_at"] - job["created_at"]), 2)
+            if job["finished_at"] is not None:
+                view["run_ms"] = round(1000 * (job["finished_at"] - job["started_at"]), 2)
+                view["result"] = job["result"]
+                view["error"] = job["error"]
+            return view
+
+    @staticmethod
+    def _summarize(samples):
+        if not samples:
+            return {"avg_ms": 0, "p95_ms": 0}
+        ordered = sorted(samples)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered), 2),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 2)
+        }
+
+    def get_stats(self):
+        with self.lock:
+            self._expire(time.time())
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self.queued,
+                "queue_capacity": self.max_queue,
+                "running": self.running,
+                "stored_jobs": len(self.jobs),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "expired": self.expired,
+                "latency": {
+                    kind: {"wait": self._summarize(samples["wait"]), "run": self._summarize(samples["run"])}
+                    for kind, samples in self.latencies.items()
+                }
+            }
+
+    def stop(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_manager = JobManager(
+    max_workers=int(os.environ.get("JOB_WORKERS", 4)),
+    max_queue=int(os.environ.get("JOB_MAX_QUEUE", 64)),
+    result_ttl=float(os.environ.get("JOB_RESULT_TTL_SECONDS", 600))
+)
+
+
+def is_async_request(request):
+    return request.args.get("async", "").lower() in ("1", "true", "yes")
+
+
+def run_or_enqueue(request, kind, fn, *args, **kwargs):
+    """
+    Run fn synchronously and return its JSON, or with ?async=1 enqueue it and
+    answer 202 with the job id (503 with Retry-After when the queue is full).
+    fn must not touch the request context, it may run on a worker thread.
+    """
+    if not is_async_request(request):
+        return jsonify(fn(*args, **kwargs))
+    job_id = job_manager.submit(kind, fn, *args, **kwargs)
+    if job_id is None:
+        response = jsonify({"success": False, "message": "Job queue is full, retry shortly"})
+        response.headers["Retry-After"] = "2"
+        return response, 503
+    return jsonify({"success": True, "job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
@@ -0,0 +1,43 @@
+import threading
+import time
+
+# name -> LazyResource, for the startup/warm-up report
+lazy_resources = {}
+
+
+class LazyResource:
+    """
+    Loads an expensive object (model weights, index) on first get() instead of at import.
+    Loading happens once even when several request threads ask for it concurrently.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.value = None
+        self.loaded = False
+        self.load_seconds = None
+        lazy_resources[name] = self
+
+    def get(self):
+        if self.loaded:
+            return self.value
+        with self.lock:
+            if not self.loaded:
+                started = time.perf_counter()
+                self.value = self.loader()
+                self.load_seconds = time.perf_counter() - started
+                self.loaded = True
+                print(f"Loaded {self.name} in {self.load_seconds:.2f}s")
+        return self.value
+
+    def get_stats(self):
+        return {
+            "loaded": self.loaded,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None
+        }
+
+
+def get_lazy_stats():
+    return {name: resource.get_stats() for name, resource in lazy_resources.items()}
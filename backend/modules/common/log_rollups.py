@@ -0,0 +1,308 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+# Rollup _id marking that the full backfill from raw logs has run ("_" sorts after every date key)
+BACKFILL_MARKER = "_backfilled"
+
+
+def ensure_log_collection(collection, time_field="timestamp"):
+    """
+    Create a log collection as a MongoDB time-series collection on fresh deployments.
+    Existing (flat) collections are kept as they are and just get a time index.
+    """
+    db, name = collection.database, collection.name
+    try:
+        if name not in db.list_collection_names():
+            db.create_collection(name, timeseries={"timeField": time_field, "granularity": "minutes"})
+            print(f"Created time-series collection {name}")
+        else:
+            db[name].create_index(time_field)
+    except Exception as e:
+        # Servers older than MongoDB 5.0 do not support time-series collections
+        print(f"Could not prepare log collection {name}: {e}")
+
+
+class LogRollups:
+    """
+    Per-day documents with embedded per-hour buckets for an append-only log collection:
+    event count, granted/denied counts and the set of unique identities.
+    insert() writes a log and keeps its rollup current; a day whose rollup update failed
+    is rebuilt from the raw logs instead of being left to drift. Existing logs are rolled up
+    once, before the first read (ensure_backfilled). backfill() rebuilds
+    rollups from raw logs; rebuild() does the same behind a single-writer guard (a lease
+    document in lock_collection) so only one worker rebuilds at a time.
+    The log collection is prepared (time-series / time index) on first use, never at import,
+    so a cold start does not wait on MongoDB.
+    """
+
+    def __init__(self, rollup_collection, log_collection, identity_field, granted_field=None,
+                 time_field="timestamp", lock_collection=None, lock_seconds=600):
+        self.rollups = rollup_collection
+        self.logs = log_collection
+        self.identity_field = identity_field
+        self.granted_field = granted_field
+        self.time_field = time_field
+        self.lock_collection = lock_collection
+        self.lock_seconds = lock_seconds
+        self.lock_id = f"rollup_backfill:{rollup_collection.name}"
+        self.local_lock = threading.Lock()
+        self.lease_holder = None
+        self.dirty_days = set()
+        self.dirty_lock = threading.Lock()
+        self.prepared = False
+        self.prepare_lock = threading.Lock()
+        self.backfilled = False
+
+    @staticmethod
+    def day_key(timestamp):
+        return timestamp.strftime("%Y-%m-%d")
+
+    def prepare(self):
+        """Create the log collection before its first write (it must exist before inserts to be time-series)"""
+        if self.prepared:
+            return
+        with self.prepare_lock:
+            if not self.prepared:
+                ensure_log_collection(self.logs, self.time_field)
+                self.prepared = True
+
+    def insert(self, log):
+        """Write one log document and fold it into its rollup"""
+        self.prepare()
+        self.logs.insert_one(log)
+        self.record(log)
+
+    def record(self, log):
+        """Fold one (already stored) log document into its day/hour rollup"""
+        self.repair()
+        try:
+            self._increment(log)
+        except Exception as e:
+            # The log is stored but its rollup is not: rebuild that day from the raw logs
+            day = self.day_key(log[self.time_field])
+            print(f"Rollup update failed for {self.logs.name} on {day}, scheduling a rebuild: {e}")
+            with self.dirty_lock:
+                self.dirty_days.add(day)
+            self.repair()
+
+    def repair(self):
+        """Rebuild the days whose incremental rollup update failed"""
+        with self.dirty_lock:
+            days = sorted(self.dirty_days)
+        for day in days:
+            start = datetime.strptime(day, "%Y-%m-%d")
+            try:
+                rebuilt = self.rebuild(start, start + timedelta(days=1))
+            except Exception as e:
+                print(f"Rollup repair failed for {self.logs.name} on {day}: {e}")
+                continue
+            if rebuilt is not None:
+                with self.dirty_lock:
+                    self.dirty_days.discard(day)
+
+    def _increment(self, log):
+        timestamp = log[self.time_field]
+        hour = f"hours.{timestamp.hour}"
+        increments = {"count": 1, f"{hour}.count": 1}
+        if self.granted_field is not None:
+            outcome = "granted" if log.get(self.granted_field) else "denied"
+            increments[outcome] = 1
+            increments[f"{hour}.{outcome}"] = 1
+
+        update = {
+            "$inc": increments,
+            "$setOnInsert": {"date": self.day_key(timestamp)}
+        }
+        identity = log.get(self.identity_field)
+        if identity is not None:
+            update["$addToSet"] = {"identities": identity, f"{hour}.identities": identity}
+        self.rollups.update_one({"_id": self.day_key(timestamp)}, update, upsert=True)
+
+    @classmethod
+    def current_day_key(cls):
+        # Logs are stamped in local time by some modules and in UTC by others; a day is
+        # closed only once it has ended on both clocks
+        return cls.day_key(min(datetime.now(), datetime.utcnow()))
+
+    @staticmethod
+    def _merge_update(day):
+        """Fold a recomputed day into the live document without undoing concurrent $inc updates"""
+        maxima = {"count": day["count"]}
+        added = {"identities": {"$each": day["identities"]}}
+        for field in ("granted", "denied"):
+            if field in day:
+                maxima[field] = day[field]
+        for hour, bucket in day["hours"].items():
+            for field in ("count", "granted", "denied"):
+                if field in bucket:
+                    maxima[f"hours.{hour}.{field}"] = bucket[field]
+            added[f"hours.{hour}.identities"] = {"$each": bucket["identities"]}
+        return {"$max": maxima, "$addToSet": added, "$setOnInsert": {"date": day["date"]}}
+
+    def backfill(self, start=None, end=None):
+        """
+        Recompute rollups for [start, end) from the raw logs in a single aggregation.
+        Closed days are replaced outright; the current day still takes live increments,
+        so it is merged ($max / $addToSet) instead of replaced.
+        """
+        match = {}
+        if start or end:
+            match[self.time_field] = {}
+            if start:
+                match[self.time_field]["$gte"] = start
+            if end:
+                match[self.time_field]["$lt"] = end
+
+        group = {
+            "_id": {
+                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${self.time_field}"}},
+                "hour": {"$hour": f"${self.time_field}"}
+            },
+            "count": {"$sum": 1},
+            "identities": {"$addToSet": f"${self.identity_field}"}
+        }
+        if self.granted_field is not None:
+            group["granted"] = {"$sum": {"$cond": [{"$eq": [f"${self.granted_field}", True]}, 1, 0]}}
+
+        days = {}
+        for bucket in self.logs.aggregate([{"$match": match}, {"$group": group}], allowDiskUse=True):
+            date, hour = bucket["_id"]["date"], bucket["_id"]["hour"]
+            day = days.setdefault(date, {"_id": date, "date": date, "count": 0, "identities": set(), "hours": {}})
+            identities = [identity for identity in bucket["identities"] if identity is not None]
+            hour_doc = {"count": bucket["count"], "identities": identities}
+            day["count"] += bucket["count"]
+            day["identities"].update(identities)
+            if self.granted_field is not None:
+                hour_doc["granted"] = bucket["granted"]
+                hour_doc["denied"] = bucket["count"] - bucket["granted"]
+                day["granted"] = day.get("granted", 0) + hour_doc["granted"]
+                day["denied"] = day.get("denied", 0) + hour_doc["denied"]
+            day["hours"][str(hour)] = hour_doc
+
+        current_day = self.current_day_key()
+        for day in days.values():
+            day["identities"] = sorted(day["identities"])
+            if day["_id"] < current_day:
+                self.rollups.replace_one({"_id": day["_id"]}, day, upsert=True)
+            else:
+                self.rollups.update_one({"_id": day["_id"]}, self._merge_update(day), upsert=True)
+        return len(days)
+
+    def _acquire(self):
+        if not self.local_lock.acquire(blocking=False):
+            return False
+        if self.lock_collection is None:
+            return True
+        now = datetime.utcnow()
+        holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        try:
+            # Takes the lease if it is free or expired; a live lease held elsewhere makes the upsert collide
+            self.lock_collection.find_one_and_update(
+                {"_id": self.lock_id, "expires_at": {"$lt": now}},
+                {"$set": {
+                    "expires_at": now + timedelta(seconds=self.lock_seconds),
+                    "holder": holder
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            self.local_lock.release()
+            return False
+        except Exception:
+            self.local_lock.release()
+            raise
+        self.lease_holder = holder
+        return True
+
+    def _release(self):
+        try:
+            if self.lock_collection is not None:
+                # Only our own lease: if it expired mid-rebuild, another worker may hold it now
+                self.lock_collection.delete_one({"_id": self.lock_id, "holder": self.lease_holder})
+        finally:
+            self.lease_holder = None
+            self.local_lock.release()
+
+    def rebuild(self, start=None, end=None):
+        """backfill() behind the single-writer guard; None when another worker or thread is already rebuilding"""
+        if not self._acquire():
+            return None
+        try:
+            days = self.backfill(start, end)
+            if start is None and end is None:
+                self.rollups.update_one(
+                    {"_id": BACKFILL_MARKER},
+                    {"$set": {"completed_at": datetime.utcnow(), "days": days}},
+                    upsert=True
+                )
+            return days
+        finally:
+            self._release()
+
+    def ensure_backfilled(self):
+        """
+        Build rollups from the existing raw logs once per deployment, on the first summary or
+        trend read (or warm-up). Keyed on a marker document rather than on the rollups being
+        empty, since increments written before the first read would otherwise hide the gap.
+        """
+        if self.backfilled:
+            return
+        self.prepare()
+        try:
+            if self.rollups.find_one({"_id": BACKFILL_MARKER}, {"_id": 1}) is None:
+                days = self.rebuild()
+                if days is None:
+                    return  # Another worker is backfilling; check again on the next read
+                print(f"Backfilled {days} days of rollups for {self.logs.name}")
+            self.backfilled = True
+        except Exception as e:
+            print(f"Rollup backfill failed for {self.logs.name}: {e}")
+
+    def summary(self, day):
+        """Totals for one calendar day"""
+        self.ensure_backfilled()
+        doc = self.rollups.find_one({"_id": self.day_key(day)}, {"hours": 0}) or {}
+        result = {
+            "count": doc.get("count", 0),
+            "unique_identities": len(doc.get("identities", []))
+        }
+        if self.granted_field is not None:
+            result["granted"] = doc.get("granted", 0)
+            result["denied"] = doc.get("denied", 0)
+        return result
+
+    def trend(self, start, end, granularity="day"):
+        """Per-day or per-hour series between two dates (inclusive) read only from rollups"""
+        self.ensure_backfilled()
+        query = {"_id": {"$gte": self.day_key(start), "$lte": self.day_key(end)}}
+        projection = None if granularity == "hour" else {"hours": 0}
+        docs = {doc["_id"]: doc for doc in self.rollups.find(query, projection)}
+
+        series = []
+        day = datetime(start.year, start.month, start.day)
+        while day.date() <= end.date():
+            doc = docs.get(self.day_key(day), {})
+            if granularity == "hour":
+                for hour in range(24):
+                    bucket = doc.get("hours", {}).get(str(hour), {})
+                    series.append(self._point(day.replace(hour=hour).isoformat(), bucket))
+            else:
+                series.append(self._point(self.day_key(day), doc))
+            day += timedelta(days=1)
+        return series
+
+    def _point(self, label, doc):
+        point = {
+            "period": label,
+            "count": doc.get("count", 0),
+            "unique_identities": len(doc.get("identities", []))
+        }
+        if self.granted_field is not None:
+            point["granted"] = doc.get("granted", 0)
+            point["denied"] = doc.get("denied", 0)
+        return point
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class BoundedLRUCache:
+    """
+    Thread-safe LRU cache bounded by entry count and total byte size, with optional TTL.
+    Callers pass the size of each value on put(); evictions are counted per reason.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=None, name="cache"):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (value, size, expires_at)
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"capacity": 0, "expired": 0}
+
+    def _drop(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.current_bytes -= size
+
+    def _expire(self, now):
+        if self.ttl is None:
+            return
+        expired = [key for key, (_, _, expires_at) in self.entries.items() if expires_at <= now]
+        for key in expired:
+            self._drop(key)
+            self.evictions["expired"] += 1
+
+    def put(self, key, value, size=0, expires_at=None):
+        """
+        Insert a value; returns False if it alone is larger than max_bytes.
+        expires_at (a time.time() value) caps the TTL, for values that already aged elsewhere.
+        """
+        if size > self.max_bytes:
+            return False
+        with self.lock:
+            now = time.time()
+            self._expire(now)
+            if key in self.entries:
+                self._drop(key)
+            ttl_expiry = now + self.ttl if self.ttl is not None else float("inf")
+            expires_at = ttl_expiry if expires_at is None else min(expires_at, ttl_expiry)
+            self.entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            while len(self.entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._drop(oldest)
+                self.evictions["capacity"] += 1
+            return True
+
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[2] <= time.time():
+            self._drop(key)
+            self.evictions["expired"] += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self._lookup(key)
+            if entry is None:
+                return default
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def pop(self, key, default=None):
+        """Remove and return a value, for entries that are read once"""
+        with self.lock:
+            entry = self._lookup(key)
+            if entry is None:
+                return default
+            self._drop(key)
+            return entry[0]
+
+    def get_stats(self):
+        with self.lock:
+            self._expire(time.time())
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": dict(self.evictions)
+            }
@@ -0,0 +1,200 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+# Fastest available JPEG encoder: simplejpeg / PyTurboJPEG (libjpeg-turbo) before cv2.imencode
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+try:
+    from turbojpeg import TurboJPEG
+    _turbojpeg = TurboJPEG()
+except Exception:
+    _turbojpeg = None
+
+JPEG_ENCODER = "simplejpeg" if simplejpeg is not None else ("turbojpeg" if _turbojpeg is not None else "opencv")
+
+# Ordered best to worst; "auto" starts at the top and steps down/up with measured send throughput
+STREAM_TIERS = {
+    "high": {"width": 640, "quality": 80, "fps": 15},
+    "medium": {"width": 480, "quality": 65, "fps": 10},
+    "low": {"width": 320, "quality": 50, "fps": 5},
+}
+TIER_ORDER = list(STREAM_TIERS)
+
+PART_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+PART_TRAILER = b"\r\n"
+
+# stream id -> MJPEGStream, for /video_feed/stats
+active_streams = {}
+_active_streams_lock = threading.Lock()
+_stream_ids = itertools.count(1)
+
+
+def encode_jpeg(image, quality):
+    """
+    JPEG bytes for the image. None of the encoders' Python bindings can write into a caller's
+    buffer, so each frame gets a new output object; the OpenCV path copies it once more,
+    because WSGI servers only take bytes, not the numpy array imencode returns.
+    """
+    if simplejpeg is not None:
+        return simplejpeg.encode_jpeg(image, quality=quality, colorspace="BGR")
+    if _turbojpeg is not None:
+        return _turbojpeg.encode(image, quality=quality)
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else None
+
+
+class MJPEGStream:
+    """
+    Per-client MJPEG encoder with resolution/quality/FPS tiers.
+    A fixed tier comes from the client's query parameter; with "auto" the tier steps
+    down when sending a frame takes most of the frame interval (slow link backing up
+    the generator) and back up after a sustained stretch of fast sends.
+    encode() returns each part as separate chunks so the JPEG is never copied into a joined
+    part; the generator yields them in order and calls sent() right after the last one.
+    Counters and the send window are updated on the generator thread and read by
+    /video_feed/stats, so both sides hold stats_lock.
+    """
+
+    DOWNGRADE_RATIO = 0.8    # send time / frame interval above which the link cannot keep up
+    UPGRADE_RATIO = 0.25     # sustained below this -> try the next better tier
+    UPGRADE_AFTER = 5.0      # seconds of fast sends before upgrading
+    MIN_TIER_SECONDS = 3.0   # hold each tier at least this long
+
+    def __init__(self, name, tier="auto"):
+        self.id = next(_stream_ids)
+        self.name = name
+        self.adaptive = tier not in STREAM_TIERS
+        self.tier = TIER_ORDER[0] if self.adaptive else tier
+        self.tier_since = time.time()
+        self.fast_since = None
+
+        self.resize_buffer = None
+        self.last_frame_at = 0.0
+        self.yielded_at = None
+        self.send_ratio = 0.0  # EWMA of send time / frame interval
+
+        self.started_at = time.time()
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+        self.encode_time = 0.0
+        self.send_time = 0.0
+        self.tier_changes = 0
+        self.window = deque()  # (timestamp, bytes) over the last few seconds
+        self.stats_lock = threading.Lock()
+
+        with _active_streams_lock:
+            active_streams[self.id] = self
+
+    def _resize(self, frame, width):
+        height, frame_width = frame.shape[:2]
+        if frame_width <= width:
+            return frame
+        size = (width, int(height * width / frame_width))
+        if self.resize_buffer is None or self.resize_buffer.shape[:2] != (size[1], size[0]):
+            self.resize_buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        return cv2.resize(frame, size, dst=self.resize_buffer, interpolation=cv2.INTER_AREA)
+
+    def encode(self, frame):
+        """(header, jpeg, trailer) chunks of this frame's multipart part, or None if the tier's FPS cap says skip it"""
+        settings = STREAM_TIERS[self.tier]
+        now = time.time()
+        if now - self.last_frame_at < 1.0 / settings["fps"]:
+            with self.stats_lock:
+                self.frames_skipped += 1
+            return None
+        started = time.perf_counter()
+        jpeg = encode_jpeg(self._resize(frame, settings["width"]), settings["quality"])
+        with self.stats_lock:
+            self.encode_time += time.perf_counter() - started
+        if jpeg is None:
+            return None
+        self.last_frame_at = now
+        self.yielded_at = time.perf_counter()
+        return PART_HEADER, jpeg, PART_TRAILER
+
+    def sent(self, size):
+        """Account for the part just consumed by the server and adapt the tier"""
+        if self.yielded_at is None:
+            return
+        elapsed = time.perf_counter() - self.yielded_at
+        self.yielded_at = None
+        now = time.time()
+        with self.stats_lock:
+            self.frames_sent += 1
+            self.bytes_sent += size
+            self.send_time += elapsed
+            self.window.append((now, size))
+            while self.window and now - self.window[0][0] > 5.0:
+                self.window.popleft()
+
+            interval = 1.0 / STREAM_TIERS[self.tier]["fps"]
+            self.send_ratio = 0.8 * self.send_ratio + 0.2 * (elapsed / interval)
+            if self.adaptive:
+                self._adapt(now)
+
+    def _adapt(self, now):
+        if now - self.tier_since < self.MIN_TIER_SECONDS:
+            return
+        index = TIER_ORDER.index(self.tier)
+        if self.send_ratio > self.DOWNGRADE_RATIO and index < len(TIER_ORDER) - 1:
+            self._set_tier(TIER_ORDER[index + 1], now)
+        elif self.send_ratio < self.UPGRADE_RATIO and index > 0:
+            if self.fast_since is None:
+                self.fast_since = now
+            elif now - self.fast_since >= self.UPGRADE_AFTER:
+                self._set_tier(TIER_ORDER[index - 1], now)
+        else:
+            self.fast_since = None
+
+    def _set_tier(self, tier, now):
+        print(f"Stream {self.name}#{self.id}: {self.tier} -> {tier} (send ratio {self.send_ratio:.2f})")
+        self.tier = tier
+        self.tier_since = now
+        self.fast_since = None
+        self.send_ratio = 0.0
+        self.tier_changes += 1
+
+    def close(self):
+        with _active_streams_lock:
+            active_streams.pop(self.id, None)
+
+    def get_stats(self):
+        with self.stats_lock:
+            window = list(self.window)
+            tier = self.tier
+            frames_sent = self.frames_sent
+            frames_skipped = self.frames_skipped
+            bytes_sent = self.bytes_sent
+            encode_time = self.encode_time
+            send_time = self.send_time
+            tier_changes = self.tier_changes
+        window_bytes = sum(size for _, size in window)
+        window_span = (window[-1][0] - window[0][0]) if len(window) > 1 else 0
+        return {
+            "name": self.name,
+            "tier": tier,
+            "adaptive": self.adaptive,
+            "encoder": JPEG_ENCODER,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "frames_sent": frames_sent,
+            "frames_skipped": frames_skipped,
+            "bytes_sent": bytes_sent,
+            "bytes_per_second": round(window_bytes / window_span, 1) if window_span else 0,
+            "avg_encode_ms": round(1000 * encode_time / frames_sent, 2) if frames_sent else 0,
+            "avg_send_ms": round(1000 * send_time / frames_sent, 2) if frames_sent else 0,
+            "tier_changes": tier_changes
+        }
+
+
+def get_stream_stats():
+    with _active_streams_lock:
+        streams = list(active_streams.values())
+    return {"encoder": JPEG_ENCODER, "tiers": STREAM_TIERS, "streams": [stream.get_stats() for stream in streams]}
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from modules.common.lru_cache import BoundedLRUCache
+
+
+def content_key(image, **params):
+    """Hash of the decoded pixels plus the pipeline parameters that affect the result"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((image.shape, str(image.dtype), sorted(params.items()))).encode())
+    digest.update(memoryview(image if image.flags["C_CONTIGUOUS"] else image.copy()).cast("B"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Memoizes JSON-serializable pipeline results by content key.
+    An in-memory BoundedLRUCache serves hot entries; with spill_dir set, every result is
+    also written to disk (bounded by spill_max_bytes, oldest files evicted first) and
+    memory misses are served from there, surviving memory evictions and restarts.
+    Each spill file stores its own expiry, so the TTL holds on disk and across restarts.
+    """
+
+    def __init__(self, name, max_entries=512, max_bytes=32 * 1024 * 1024, ttl=None,
+                 spill_dir=None, spill_max_bytes=256 * 1024 * 1024):
+        self.name = name
+        self.memory = BoundedLRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, name=name)
+        self.spill_dir = os.path.join(spill_dir, name) if spill_dir else None
+        self.spill_max_bytes = spill_max_bytes
+        self.disk_lock = threading.Lock()
+        self.disk_files = {}  # key -> size, insertion (oldest first) order
+        self.disk_bytes = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.disk_evictions = 0
+        self.disk_expired = 0
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._scan_disk()
+
+    def _path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def _scan_disk(self):
+        entries = []
+        for filename in os.listdir(self.spill_dir):
+            if filename.endswith(".json"):
+                path = os.path.join(self.spill_dir, filename)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, filename[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.disk_files[key] = size
+            self.disk_bytes += size
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or not self.spill_dir:
+            return value
+        try:
+            with open(self._path(key), "rb") as handle:
+                encoded = handle.read()
+        except OSError:
+            return None
+        try:
+            # {"expires_at": time.time() value or null, "value": result}
+            entry = json.loads(encoded)
+            expires_at, value = entry["expires_at"], entry["value"]
+        except (ValueError, TypeError, KeyError):
+            # Truncated or corrupt spill file: a miss, and the file is dropped
+            self._remove_disk(key)
+            return None
+        if expires_at is not None and expires_at <= time.time():
+            self._remove_disk(key)
+            with self.disk_lock:
+                self.disk_expired += 1
+            return None
+        with self.disk_lock:
+            self.disk_hits += 1
+        self.memory.put(key, value, size=len(encoded), expires_at=expires_at)
+        return value
+
+    def put(self, key, value):
+        encoded = json.dumps(value).encode()
+        self.memory.put(key, value, size=len(encoded))
+        if self.spill_dir:
+            expires_at = time.time() + self.memory.ttl if self.memory.ttl is not None else None
+            self._write_disk(key, b'{"expires_at": %s, "value": %s}' % (json.dumps(expires_at).encode(), encoded))
+
+    def _write_disk(self, key, encoded):
+        if len(encoded) > self.spill_max_bytes:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as handle:
+                handle.write(encoded)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"{self.name}: could not spill result to disk: {e}")
+            return
+
+        stale = []
+        with self.disk_lock:
+            self.disk_bytes -= self.disk_files.pop(key, 0)
+            self.disk_files[key] = len(encoded)
+            self.disk_bytes += len(encoded)
+            self.disk_writes += 1
+            while self.disk_bytes > self.spill_max_bytes:
+                oldest = next(iter(self.disk_files))
+                self.disk_bytes -= self.disk_files.pop(oldest)
+                self.disk_evictions += 1
+                stale.append(oldest)
+        for oldest in stale:
+            try:
+                os.remove(self._path(oldest))
+            except OSError:
+                pass
+
+    def _remove_disk(self, key):
+        with self.disk_lock:
+            self.disk_bytes -= self.disk_files.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get_stats(self):
+        stats = self.memory.get_stats()
+        with self.disk_lock:
+            stats["disk"] = {
+                "enabled": bool(self.spill_dir),
+                "entries": len(self.disk_files),
+                "bytes": self.disk_bytes,
+                "max_bytes": self.spill_max_bytes,
+                "hits": self.disk_hits,
+                "writes": self.disk_writes,
+                "evictions": self.disk_evictions,
+                "expired": self.disk_expired
+            }
+        return stats
+
+
+def result_cache_from_env(name, spill=True):
+    """
+    ResultCache configured from RESULT_CACHE_* environment variables.
+    spill=False keeps the cache in memory only, for results that must not be written to disk.
+    """
+    return ResultCache(
+        name,
+        max_entries=int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 512)),
+        max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+        ttl=float(os.environ["RESULT_CACHE_TTL_SECONDS"]) if os.environ.get("RESULT_CACHE_TTL_SECONDS") else None,
+        spill_dir=(os.environ.get("RESULT_CACHE_DIR") or None) if spill else None,
+        spill_max_bytes=int(os.environ.get("RESULT_CACHE_DISK_MAX_BYTES", 256 * 1024 * 1024))
+    )
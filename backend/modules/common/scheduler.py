@@ -0,0 +1,232 @@
+import contextvars
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Lower value = served first. Gate decisions jump ahead of dashboard requests,
+# which jump ahead of batch/video and background detection work.
+PRIORITY_CLASSES = {"gate": 0, "interactive": 1, "batch": 2}
+DEFAULT_PRIORITY = "interactive"
+
+_current_priority = contextvars.ContextVar("inference_priority", default=DEFAULT_PRIORITY)
+
+
+@contextmanager
+def priority_class(name):
+    """Run model calls made inside this block under the given priority class"""
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {name}")
+    token = _current_priority.set(name)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class PrioritySemaphore:
+    """Counting semaphore whose waiters are woken by priority, then FIFO"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiters = []  # heap of (priority, sequence, Event)
+        self.sequence = itertools.count()
+
+    def acquire(self, priority):
+        with self.lock:
+            if self.active < self.capacity and not self.waiters:
+                self.active += 1
+                return
+            ready = threading.Event()
+            heapq.heappush(self.waiters, (priority, next(self.sequence), ready))
+        # release() hands the slot over directly, so active is already counted for us
+        ready.wait()
+
+    def release(self):
+        with self.lock:
+            if self.waiters:
+                _, _, ready = heapq.heappop(self.waiters)
+                ready.set()
+            else:
+                self.active -= 1
+
+    def get_stats(self):
+        with self.lock:
+            return {"capacity": self.capacity, "active": self.active, "waiting": len(self.waiters)}
+
+
+class InferenceScheduler:
+    """
+    Gates every in-process model call. A call first takes a slot of its model
+    (per-model concurrency cap), then a slot of the global budget shared by all
+    models. Waiters on either are served by priority class, so a queued gate
+    read starts before queued dashboard or batch work. Running calls are never
+    interrupted. Queue wait and run time are tracked per class.
+    """
+
+    def __init__(self, model_limits=None, default_limit=1, max_concurrent=2):
+        self.model_limits = model_limits or {}
+        self.default_limit = default_limit
+        self.global_slots = PrioritySemaphore(max_concurrent)
+        self.model_slots = {}
+        self.lock = threading.Lock()
+        self.class_stats = {
+            name: {"calls": 0, "wait": deque(maxlen=500), "run": deque(maxlen=500)}
+            for name in PRIORITY_CLASSES
+        }
+
+    def _model_slots(self, model):
+        with self.lock:
+            slots = self.model_slots.get(model)
+            if slots is None:
+                slots = PrioritySemaphore(self.model_limits.get(model, self.default_limit))
+                self.model_slots[model] = slots
+            return slots
+
+    @contextmanager
+    def slot(self, model, priority=None):
+        """Hold one execution slot for `model` while the block runs"""
+        name = priority or _current_priority.get()
+        rank = PRIORITY_CLASSES[name]
+        model_slots = self._model_slots(model)
+
+        queued_at = time.perf_counter()
+        model_slots.acquire(rank)
+        try:
+            self.global_slots.acquire(rank)
+            started_at = time.perf_counter()
+            try:
+                yield
+            finally:
+                finished_at = time.perf_counter()
+                self.global_slots.release()
+                with self.lock:
+                    stats = self.class_stats[name]
+                    stats["calls"] += 1
+                    stats["wait"].append(1000 * (started_at - queued_at))
+                    stats["run"].append(1000 * (finished_at - started_at))
+        finally:
+            model_slots.release()
+
+    def run(self, model, fn, *args, priority=None, **kwargs):
+        with self.slot(model, priority):
+            return fn(*args, **kwargs)
+
+    @staticmethod
+    def _summarize(samples):
+        if not samples:
+            return {"avg_ms": 0, "p95_ms": 0}
+        ordered = sorted(samples)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered), 2),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 2)
+        }
+
+    def get_stats(self):
+        with self.lock:
+            classes = {
+                name: {
+                    "calls": stats["calls"],
+                    "wait": self._summarize(stats["wait"]),
+                    "run": self._summarize(stats["run"])
+                }
+                for name, stats in self.class_stats.items()
+            }
+            models = dict(self.model_slots)
+        return {
+            "global": self.global_slots.get_stats(),
+            "models": {model: slots.get_stats() for model, slots in models.items()},
+            "classes": classes,
+            "thread_budget": thread_budget.get_stats()
+        }
+
+
+class ThreadBudget:
+    """
+    One CPU thread budget split across the frameworks that keep their own intra-op pools.
+    export_env() must run before the frameworks are imported; apply() sets the runtime
+    knobs of whichever frameworks have been imported since.
+    """
+
+    WEIGHTS = {"tensorflow": 3, "torch": 3, "paddle": 2, "opencv": 1, "faiss": 1}
+
+    def __init__(self, total):
+        # Every framework needs at least one thread, so that is the smallest possible budget
+        self.total = max(total, len(self.WEIGHTS))
+        self.shares = self.apportion(self.total, self.WEIGHTS)
+        self.applied = {}
+
+    @staticmethod
+    def apportion(total, weights):
+        """
+        Split total threads by weight with at least one each, summing exactly to total
+        (largest-remainder method over what is left after the minimum).
+        """
+        shares = {name: 1 for name in weights}
+        spare = total - len(weights)
+        weight_sum = sum(weights.values())
+        quotas = {name: spare * weight / weight_sum for name, weight in weights.items()}
+        for name, quota in quotas.items():
+            shares[name] += int(quota)
+        leftover = total - sum(shares.values())
+        # Largest fractional part first; ties go to the heavier framework, then declaration order
+        order = sorted(weights, key=lambda name: (-(quotas[name] - int(quotas[name])), -weights[name]))
+        for name in order[:leftover]:
+            shares[name] += 1
+        return shares
+
+    def export_env(self):
+        # Read by TensorFlow when its runtime initializes
+        os.environ.setdefault("TF_NUM_INTRAOP_THREADS", str(self.shares["tensorflow"]))
+        os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+
+    def apply(self):
+        if "tensorflow" in sys.modules:
+            import tensorflow as tf
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(self.shares["tensorflow"])
+                tf.config.threading.set_inter_op_parallelism_threads(1)
+                self.applied["tensorflow"] = self.shares["tensorflow"]
+            except RuntimeError as e:
+                # The runtime was already initialized, TF_NUM_*_THREADS from export_env() applies
+                print(f"TensorFlow thread budget not applied: {e}")
+        if "torch" in sys.modules:
+            import torch
+            torch.set_num_threads(self.shares["torch"])
+            self.applied["torch"] = self.shares["torch"]
+        if "cv2" in sys.modules:
+            import cv2
+            cv2.setNumThreads(self.shares["opencv"])
+            self.applied["opencv"] = self.shares["opencv"]
+        if "faiss" in sys.modules:
+            import faiss
+            faiss.omp_set_num_threads(self.shares["faiss"])
+            self.applied["faiss"] = self.shares["faiss"]
+        # PaddleOCR takes its share through cpu_threads when the model is loaded
+
+    def get_stats(self):
+        return {"total": self.total, "shares": dict(self.shares), "applied": dict(self.applied)}
+
+
+def _parse_limits(spec):
+    """'plate_detect=1,face_embed=2' -> {'plate_detect': 1, 'face_embed': 2}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, limit = item.partition("=")
+        limits[model.strip()] = int(limit)
+    return limits
+
+
+thread_budget = ThreadBudget(int(os.environ.get("INFERENCE_THREAD_BUDGET", os.cpu_count() or 4)))
+
+inference_scheduler = InferenceScheduler(
+    model_limits=_parse_limits(os.environ.get("INFERENCE_MODEL_CONCURRENCY", "")),
+    default_limit=int(os.environ.get("INFERENCE_DEFAULT_CONCURRENCY", 1)),
+    max_concurrent=int(os.environ.get("INFERENCE_MAX_CONCURRENT", 2))
+)
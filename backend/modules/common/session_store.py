@@ -0,0 +1,114 @@
+"""
+Short-lived key/value entries in a MongoDB collection, bounded like BoundedLRUCache
+(entry count, total bytes, TTL) but shared by every Gunicorn worker, so a follow-up
+request can read an entry written by another worker.
+Expired entries are removed and counted on put() and get_stats(); the TTL index only
+cleans up after long idle periods. Hits, misses and evictions are kept in a counters
+document so all workers report the same numbers.
+"""
+import threading
+from datetime import datetime, timedelta
+
+
+class MongoSessionStore:
+
+    # The TTL monitor deletes without telling anyone, so it only backstops the counted sweeps
+    TTL_INDEX_GRACE_SECONDS = 3600
+
+    def __init__(self, collection, counters_collection, max_entries=200, max_bytes=64 * 1024 * 1024,
+                 ttl=600, name="sessions"):
+        self.collection = collection
+        self.counters = counters_collection
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self.index_lock = threading.Lock()
+        self.index_ready = False
+
+    def _ensure_indexes(self):
+        # Created on first use, not at import, so a cold start never waits on MongoDB
+        if self.index_ready:
+            return
+        with self.index_lock:
+            if not self.index_ready:
+                self.collection.create_index('expires_at', expireAfterSeconds=self.TTL_INDEX_GRACE_SECONDS)
+                self.collection.create_index('created_at')
+                self.index_ready = True
+
+    def _count(self, field, amount=1):
+        if amount:
+            self.counters.update_one({'_id': self.name}, {'$inc': {field: amount}}, upsert=True)
+
+    def _expire(self, now):
+        deleted = self.collection.delete_many({'expires_at': {'$lte': now}}).deleted_count
+        self._count('evictions.expired', deleted)
+
+    def _usage(self):
+        totals = list(self.collection.aggregate([
+            {'$group': {'_id': None, 'entries': {'$sum': 1}, 'bytes': {'$sum': '$size'}}}
+        ]))
+        return (totals[0]['entries'], totals[0]['bytes']) if totals else (0, 0)
+
+    def _enforce_limits(self):
+        """Evict the oldest entries until both caps hold again"""
+        entries, total_bytes = self._usage()
+        evicted = 0
+        if entries > self.max_entries or total_bytes > self.max_bytes:
+            for doc in self.collection.find({}, {'size': 1}).sort('created_at', 1):
+                if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                # Another worker may have evicted it already; either way it no longer counts
+                evicted += self.collection.delete_one({'_id': doc['_id']}).deleted_count
+                entries -= 1
+                total_bytes -= doc.get('size', 0)
+        self._count('evictions.capacity', evicted)
+
+    def put(self, key, fields, size):
+        """Store a new entry; returns False if it alone is larger than max_bytes"""
+        if size > self.max_bytes:
+            self._count('rejected')
+            return False
+        self._ensure_indexes()
+        now = datetime.utcnow()
+        self._expire(now)
+        self.collection.insert_one({
+            '_id': key,
+            **fields,
+            'size': size,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=self.ttl)
+        })
+        self._enforce_limits()
+        return True
+
+    def get(self, key):
+        """The entry's document, or None if it is unknown, expired or evicted"""
+        if not isinstance(key, str):
+            return None
+        doc = self.collection.find_one({'_id': key, 'expires_at': {'$gt': datetime.utcnow()}})
+        self._count('hits' if doc is not None else 'misses')
+        return doc
+
+    def delete(self, key):
+        self.collection.delete_one({'_id': key})
+
+    def get_stats(self):
+        self._expire(datetime.utcnow())
+        entries, total_bytes = self._usage()
+        counters = self.counters.find_one({'_id': self.name}) or {}
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        evictions = counters.get('evictions', {})
+        return {
+            "name": self.name,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "rejected": counters.get('rejected', 0),
+            "evictions": {"capacity": evictions.get('capacity', 0), "expired": evictions.get('expired', 0)}
+        }
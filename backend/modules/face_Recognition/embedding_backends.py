@@ -0,0 +1,160 @@
+"""
+ArcFace embedding backends behind one interface: represent(image) returns an
+L2-normalized 512-D float32 vector (raising ValueError when no face is found),
+embed_batch(images) returns one vector or None per image, and embed_crops(faces)
+embeds already detected and aligned face crops without running a detector.
+
+FACE_EMBEDDING_BACKEND selects the backend:
+    deepface   - DeepFace ArcFace on TensorFlow (default)
+    onnx       - exported ArcFace graph on ONNX Runtime (CPU)
+    onnx-int8  - the same graph with dynamically quantized int8 weights
+Export the graph with scripts/export_arcface_onnx.py.
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from modules.common.scheduler import thread_budget
+
+FACE_EMBEDDING_BACKEND = os.environ.get('FACE_EMBEDDING_BACKEND', 'deepface')
+ARCFACE_ONNX_PATH = os.environ.get('ARCFACE_ONNX_PATH', 'modules/face_Recognition/models/arcface.onnx')
+ARCFACE_ONNX_INT8_PATH = os.environ.get(
+    'ARCFACE_ONNX_INT8_PATH', 'modules/face_Recognition/models/arcface.int8.onnx'
+)
+ARCFACE_INPUT_SIZE = 112
+
+
+def l2_normalize(embedding):
+    embedding = np.asarray(embedding, dtype=np.float32)
+    return embedding / np.linalg.norm(embedding)
+
+
+class DeepFaceBackend:
+    name = "deepface"
+
+    def __init__(self):
+        from deepface import DeepFace
+        DeepFace.build_model("ArcFace")
+        self.deepface = DeepFace
+
+    def represent(self, image, enforce_detection=True):
+        result = self.deepface.represent(image, model_name="ArcFace", enforce_detection=enforce_detection)
+        return l2_normalize(result[0]["embedding"])
+
+    def embed_batch(self, images, enforce_detection=True):
+        embeddings = []
+        for image in images:
+            try:
+                embeddings.append(self.represent(image, enforce_detection))
+            except Exception as e:
+                print(f"Face embedding failed: {e}")
+                embeddings.append(None)
+        return embeddings
+
+    def embed_crops(self, faces):
+        return [
+            l2_normalize(self.deepface.represent(
+                face, model_name="ArcFace", detector_backend="skip", enforce_detection=False
+            )[0]["embedding"])
+            for face in faces
+        ]
+
+
+class OnnxArcFaceBackend:
+    """
+    ArcFace exported from DeepFace's Keras model, run with ONNX Runtime.
+    Faces are found with OpenCV's Haar cascade (DeepFace's default "opencv" detector)
+    and letterboxed to 112x112 BGR in [0, 1], matching DeepFace's preprocessing.
+    """
+
+    def __init__(self, model_path=ARCFACE_ONNX_PATH, quantized=False):
+        import onnxruntime as ort
+
+        if quantized:
+            model_path = ensure_quantized_model(model_path, ARCFACE_ONNX_INT8_PATH)
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.model_path = model_path
+
+        options = ort.SessionOptions()
+        # Replaces TensorFlow, so it takes TensorFlow's share of the thread budget
+        options.intra_op_num_threads = thread_budget.shares["tensorflow"]
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.channels_first = len(model_input.shape) == 4 and model_input.shape[1] == 3
+
+        self.detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        # CascadeClassifier.detectMultiScale is not safe to call from several threads at once
+        self.detector_lock = threading.Lock()
+
+    def _detect(self, image, enforce_detection):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        with self.detector_lock:
+            faces = self.detector.detectMultiScale(gray, 1.1, 10)
+        if len(faces) == 0:
+            if enforce_detection:
+                raise ValueError("Face could not be detected")
+            return image
+        x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+        return image[y:y + h, x:x + w]
+
+    @staticmethod
+    def _letterbox(face):
+        height, width = face.shape[:2]
+        scale = ARCFACE_INPUT_SIZE / max(height, width)
+        resized = cv2.resize(face, (max(int(width * scale), 1), max(int(height * scale), 1)))
+        canvas = np.zeros((ARCFACE_INPUT_SIZE, ARCFACE_INPUT_SIZE, 3), dtype=np.float32)
+        top = (ARCFACE_INPUT_SIZE - resized.shape[0]) // 2
+        left = (ARCFACE_INPUT_SIZE - resized.shape[1]) // 2
+        canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized / 255.0
+        return canvas
+
+    def _run(self, faces):
+        batch = np.stack([self._letterbox(face) for face in faces])
+        if self.channels_first:
+            batch = batch.transpose(0, 3, 1, 2)
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+        return [l2_normalize(output) for output in outputs]
+
+    def represent(self, image, enforce_detection=True):
+        return self._run([self._detect(image, enforce_detection)])[0]
+
+    def embed_batch(self, images, enforce_detection=True):
+        faces = []
+        for image in images:
+            try:
+                faces.append(self._detect(image, enforce_detection))
+            except ValueError as e:
+                print(f"Face embedding failed: {e}")
+                faces.append(None)
+        detected = [face for face in faces if face is not None]
+        outputs = iter(self._run(detected) if detected else [])
+        return [next(outputs) if face is not None else None for face in faces]
+
+    def embed_crops(self, faces):
+        return self._run(faces) if faces else []
+
+
+def ensure_quantized_model(model_path, quantized_path):
+    """Create the dynamically quantized (int8 weights) copy of an ONNX graph if it does not exist yet"""
+    if not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f"Quantizing {model_path} -> {quantized_path}...")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+def create_embedding_backend(name=FACE_EMBEDDING_BACKEND):
+    """Build the configured backend, falling back to DeepFace if the ONNX one cannot be loaded"""
+    if name in ("onnx", "onnx-int8"):
+        try:
+            return OnnxArcFaceBackend(quantized=name == "onnx-int8")
+        except Exception as e:
+            print(f"ONNX ArcFace backend unavailable ({e}), falling back to DeepFace")
+    elif name != "deepface":
+        print(f"Unknown FACE_EMBEDDING_BACKEND '{name}', using DeepFace")
+    return DeepFaceBackend()
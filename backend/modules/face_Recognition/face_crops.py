@@ -0,0 +1,119 @@
+"""
+Face detection for live frames and a cheap quality gate for the crops it produces.
+Crops that are too small, blurred or turned too far to the side are rejected before
+any model runs. Crops that pass are roll-aligned on the eye line and go straight to
+ArcFace, without a second detector pass.
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+FACE_MIN_SIZE = int(os.environ.get("FACE_MIN_SIZE", 80))
+# Variance of the Laplacian on the grayscale crop; lower means blurrier
+FACE_MIN_SHARPNESS = float(os.environ.get("FACE_MIN_SHARPNESS", 60))
+# Horizontal offset of the eye midpoint from the crop centre, as a fraction of crop width
+FACE_MAX_YAW_OFFSET = float(os.environ.get("FACE_MAX_YAW_OFFSET", 0.2))
+# "crop": embed the aligned Haar crop directly, skipping the embedding backend's own face detector.
+# "frame": re-detect and align inside the padded face region, the same geometry as registration;
+# for deployments whose templates fail the crop path in tests/test_embedding_parity.py.
+FACE_LIVE_EMBEDDING = os.environ.get("FACE_LIVE_EMBEDDING", "crop")
+if FACE_LIVE_EMBEDDING not in ("crop", "frame"):
+    raise ValueError(f"FACE_LIVE_EMBEDDING must be 'crop' or 'frame', not {FACE_LIVE_EMBEDDING!r}")
+# Context kept around a Haar box for the re-detection, as a fraction of the box size
+FACE_REGION_MARGIN = 0.25
+
+# CascadeClassifier objects are expensive to build and not safe to share between threads
+face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml")
+face_cascade_lock = threading.Lock()
+eye_cascade_lock = threading.Lock()
+
+quality_stats_lock = threading.Lock()
+quality_stats = {"accepted": 0, "aligned": 0, "too_small": 0, "blurry": 0, "pose": 0}
+
+
+def detect_faces(gray, scale_factor=1.3, min_neighbors=5):
+    with face_cascade_lock:
+        return face_cascade.detectMultiScale(gray, scale_factor, min_neighbors)
+
+
+def _find_eyes(gray_face):
+    """Centres of the two largest eyes in the upper half of the crop, left to right, or None"""
+    upper = gray_face[:gray_face.shape[0] // 2]
+    with eye_cascade_lock:
+        eyes = eye_cascade.detectMultiScale(upper, 1.1, 5)
+    if len(eyes) < 2:
+        return None
+    eyes = sorted(eyes, key=lambda eye: eye[2] * eye[3], reverse=True)[:2]
+    centres = sorted((x + w / 2, y + h / 2) for x, y, w, h in eyes)
+    return centres[0], centres[1]
+
+
+def _align(face, left_eye, right_eye):
+    """Rotate the crop about the eye midpoint so the eye line is horizontal"""
+    angle = np.degrees(np.arctan2(right_eye[1] - left_eye[1], right_eye[0] - left_eye[0]))
+    centre = ((left_eye[0] + right_eye[0]) / 2, (left_eye[1] + right_eye[1]) / 2)
+    matrix = cv2.getRotationMatrix2D(centre, angle, 1.0)
+    return cv2.warpAffine(face, matrix, (face.shape[1], face.shape[0]), borderMode=cv2.BORDER_REPLICATE)
+
+
+def face_region(frame, box, margin=FACE_REGION_MARGIN):
+    """The Haar box widened by margin on each side, clipped to the frame"""
+    x, y, w, h = box
+    pad_x, pad_y = int(w * margin), int(h * margin)
+    return frame[max(0, y - pad_y):min(frame.shape[0], y + h + pad_y),
+                 max(0, x - pad_x):min(frame.shape[1], x + w + pad_x)]
+
+
+def largest_face(image):
+    """Haar box (x, y, w, h) of the largest face in a BGR image, or None"""
+    faces = detect_faces(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+    if len(faces) == 0:
+        return None
+    return tuple(max(faces, key=lambda face: face[2] * face[3]))
+
+
+def _count(outcome):
+    with quality_stats_lock:
+        quality_stats[outcome] += 1
+
+
+def prepare_face_crop(face):
+    """
+    (aligned crop, None) for a usable face crop, or (None, reason) where reason is
+    "too_small", "blurry" or "pose". Without two visible eyes the crop is passed on
+    unaligned, since the frontal-face cascade already implies a roughly frontal pose.
+    """
+    height, width = face.shape[:2]
+    if width < FACE_MIN_SIZE or height < FACE_MIN_SIZE:
+        _count("too_small")
+        return None, "too_small"
+
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    if cv2.Laplacian(gray, cv2.CV_64F).var() < FACE_MIN_SHARPNESS:
+        _count("blurry")
+        return None, "blurry"
+
+    eyes = _find_eyes(gray)
+    if eyes is not None:
+        left_eye, right_eye = eyes
+        if abs((left_eye[0] + right_eye[0]) / 2 - width / 2) > FACE_MAX_YAW_OFFSET * width:
+            _count("pose")
+            return None, "pose"
+        face = _align(face, left_eye, right_eye)
+        _count("aligned")
+    _count("accepted")
+    return face, None
+
+
+def get_quality_stats():
+    with quality_stats_lock:
+        return {
+            "min_size": FACE_MIN_SIZE,
+            "min_sharpness": FACE_MIN_SHARPNESS,
+            "max_yaw_offset": FACE_MAX_YAW_OFFSET,
+            "live_embedding": FACE_LIVE_EMBEDDING,
+            **quality_stats
+        }
@@ -4,8 +4,6 @@ import faiss
 import numpy as np
 import os
 import json
-import pandas as pd
-import requests
 from datetime import datetime, timedelta
 import threading
 import time
@@ -15,12 +13,25 @@ import weakref
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
 
 # Import dependencies after environment variables are set
-from deepface import DeepFace
-from modules.face_Recognition.ocr_service import extract_ocr_data
+from modules.inference_server.client import inference_client
+from modules.inference_server.models import load_face_embedder
+from modules.face_Recognition.ocr_service import extract_ocr_data, id_result_cache
+from modules.face_Recognition.ocr_engine import ocr_pool
+from modules.face_Recognition.face_crops import (
+    FACE_LIVE_EMBEDDING, detect_faces, face_region, get_quality_stats, prepare_face_crop
+)
 from modules.camera_manager.camera_manager import camera_manager
+from modules.camera_manager.motion_gate import get_motion_gate
+from modules.common.log_rollups import LogRollups
+from modules.common.db import get_collection, get_log_collection
+from modules.common.export import EXPORT_FORMATS, export_response
+from modules.common.image_preprocessing import StageTimer, decode_image
+from modules.common.jobs import run_or_enqueue
+from modules.common.scheduler import inference_scheduler
+from modules.common.lazy import LazyResource
+from modules.common.mjpeg import STREAM_TIERS, MJPEGStream, get_stream_stats
 
 # MongoDB Connection
-from pymongo import MongoClient
 from bson.binary import Binary
 from bson.objectid import ObjectId
 import base64
@@ -29,25 +40,35 @@ from PIL import Image
 
 face_recognition_bp = Blueprint("face_recognition", __name__)
 
-MONGO_URI = "mongodb://localhost:27017" 
-client = MongoClient(MONGO_URI)
-db = client["Smart_Surveillance"]
-face_collection = db["face_metadata"]
-embeddings_collection = db["face_embeddings"]
-attendance_collection = db["User_Logs"]
+face_collection = get_collection("face_metadata")
+embeddings_collection = get_collection("face_embeddings")
+attendance_collection = get_log_collection("User_Logs")
+# Per-day/per-hour aggregates of User_Logs for dashboard stats and trends
+attendance_rollups = LogRollups(get_collection("attendance_rollups"), attendance_collection, identity_field="roll",
+                                lock_collection=get_collection("maintenance_locks"))
+
+# ID photos larger than this (longest side) are decoded at reduced resolution
+ID_DECODE_MAX_DIM = int(os.environ.get("ID_DECODE_MAX_DIM", 2400))
+# Cosine similarity the probe needs against the claimed identity's template in /Authenticate
+FACE_VERIFY_THRESHOLD = float(os.environ.get("FACE_VERIFY_THRESHOLD", 0.6))
+
+# ArcFace is loaded in-process, on first use, only when there is no shared inference server
+face_embedder = LazyResource("face_embedder", load_face_embedder)
 
 # Initialize FAISS with 512D embeddings
 embedding_dim = 512
 faiss_index = faiss.IndexFlatIP(embedding_dim)
 embeddings_db = {}
+# FAISS row i is list(embeddings_db)[i]: every read or write of the pair holds this lock
+face_index_lock = threading.RLock()
 
 def load_embeddings_from_mongodb():
     """Load stored embeddings from MongoDB into FAISS index"""
     global embeddings_db, faiss_index
     
-    # Reset the FAISS index
-    faiss_index = faiss.IndexFlatIP(embedding_dim)
-    embeddings_db = {}
+    # Build a fresh index off to the side, then swap it in
+    new_index = faiss.IndexFlatIP(embedding_dim)
+    new_embeddings = {}
     
     # Fetch all embeddings from MongoDB
     all_embeddings = list(embeddings_collection.find())
@@ -56,16 +77,29 @@ def load_embeddings_from_mongodb():
         for embed_doc in all_embeddings:
             user_key = f"{embed_doc['name']}_{embed_doc['face_id']}"
             embedding = np.array(embed_doc['embedding'], dtype=np.float32)
-            embeddings_db[user_key] = embedding.tolist()
+            new_embeddings[user_key] = embedding.tolist()
         
         # Add embeddings to FAISS index
-        stored_embeddings = np.array(list(embeddings_db.values()), dtype=np.float32)
-        faiss_index.add(stored_embeddings)
+        stored_embeddings = np.array(list(new_embeddings.values()), dtype=np.float32)
+        new_index.add(stored_embeddings)
     
-    print(f"Loaded {len(embeddings_db)} embeddings from MongoDB into FAISS.")
+    with face_index_lock:
+        faiss_index = new_index
+        embeddings_db = new_embeddings
+    print(f"Loaded {len(new_embeddings)} embeddings from MongoDB into FAISS.")
 
-# Load embeddings at startup
-load_embeddings_from_mongodb()
+# Embeddings are read from MongoDB on first use (or warm_up), not at import
+face_index_resource = LazyResource("face_embeddings", load_embeddings_from_mongodb)
+
+def warm_up():
+    """Backfill attendance rollups if needed, load the face index and, without an inference server, the ArcFace model"""
+    attendance_rollups.ensure_backfilled()
+    face_index_resource.get()
+    if inference_client is None:
+        face_embedder.get()
+
+def shutdown():
+    video_feed_stop_event.set()
 
 # Thread-safe video feed management
 video_feed_lock = threading.Lock()
@@ -77,130 +111,156 @@ def get_date_today():
 
 def save_attendance(name, roll):
     """Save attendance to MongoDB"""
-    attendance_collection.insert_one({
+    record = {
         "name": name,
         "roll": roll,
         "timestamp": datetime.now(),
         "date": get_date_today()
-    })
+    }
+    attendance_rollups.insert(record)
+
+def represent_face(image):
+    """Raw ArcFace embedding, computed by the inference server when one is configured"""
+    if inference_client is not None:
+        embedding = inference_client.call("face_embed", [image], enforce_detection=True)[0]
+        if embedding is None:
+            raise ValueError("Face could not be detected")
+        return embedding
+    with inference_scheduler.slot("face_embed"):
+        return face_embedder.get().represent(image, enforce_detection=True)
+
+def represent_face_crop(face):
+    """ArcFace embedding of an already detected and aligned face crop, no detector pass"""
+    if inference_client is not None:
+        return inference_client.call("face_embed", [face], detected=True)[0]
+    with inference_scheduler.slot("face_embed"):
+        return face_embedder.get().embed_crops([face])[0]
 
 def extract_face_embedding(image):
-    """Extract face embedding with retry mechanism for reliability"""
+    """Detect the face in a raw camera frame and embed it, or None if there is no usable face"""
+    # One attempt: the model is deterministic, so retrying the same frame only adds latency
     try:
-        for attempt in range(3):
-            try:
-                embedding = DeepFace.represent(image, model_name="ArcFace", enforce_detection=True)[0]["embedding"]
-                embedding = np.array(embedding, dtype=np.float32)
-                embedding = embedding / np.linalg.norm(embedding)  # Normalize the embedding
-                return embedding
-            except Exception as e:
-                if attempt < 2:  # Try again if not the last attempt
-                    print(f"Face embedding extraction attempt {attempt+1} failed: {e}")
-                    time.sleep(0.5)
-                else:
-                    raise e
+        embedding = np.array(represent_face(image), dtype=np.float32)
+        return embedding / np.linalg.norm(embedding)  # Normalize the embedding
     except Exception as e:
-        print(f"Face embedding extraction error after all attempts: {e}")
+        print(f"Face embedding extraction error: {e}")
         return None
 
-@face_recognition_bp.route("/extract-id", methods=["POST"])
-def extract_id():
-    """Extract OCR data from ID card image"""
+def embed_face_crop(frame, box):
+    """
+    Embed a Haar face box from a live frame after the quality gate, or None if it is rejected.
+    The aligned crop is embedded directly; with FACE_LIVE_EMBEDDING=frame the padded region is
+    re-detected and aligned by the embedding backend instead, exactly as at registration.
+    """
+    x, y, w, h = box
+    face, rejected = prepare_face_crop(frame[y:y+h, x:x+w])
+    if rejected:
+        return None
+    if FACE_LIVE_EMBEDDING == "frame":
+        return extract_face_embedding(face_region(frame, box))
     try:
-        data = request.json
-        id_type = data.get("id_type")
-        id_image_base64 = data.get("id_image")
-
-        # Validate input
-        if not id_type or not id_image_base64:
-            return jsonify({
-                'success': False, 
-                'message': 'Missing id_type or id_image'
-            })
+        embedding = np.array(represent_face_crop(face), dtype=np.float32)
+        return embedding / np.linalg.norm(embedding)
+    except Exception as e:
+        print(f"Face crop embedding error: {e}")
+        return None
 
+def extract_id_data(id_type, id_image_base64):
+    """Decode an ID card image and OCR its name/ID fields; returns the response body"""
+    try:
         # Decode Base64 ID Image
+        timer = StageTimer()
         try:
             img_data = base64.b64decode(id_image_base64)
-            nparr = np.frombuffer(img_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = decode_image(img_data, max_dim=ID_DECODE_MAX_DIM, timer=timer)
             
             if frame is None:
-                return jsonify({
+                return {
                     'success': False, 
                     'message': 'Failed to decode image'
-                })
+                }
                 
         except Exception as e:
-            return jsonify({
+            return {
                 'success': False, 
                 'message': f'Image decoding error: {str(e)}'
-            })
+            }
 
         # Extract OCR data
         try:
-            ocr_data = extract_ocr_data(frame, id_type)
+            ocr_data = extract_ocr_data(frame, id_type, timer)
             
             if not ocr_data or not ocr_data.get("name") or not ocr_data.get("id"):
-                return jsonify({
+                return {
                     'success': False, 
                     'message': 'Failed to extract data from ID card'
-                })
+                }
                 
             new_username = ocr_data["name"]
             new_userid = str(ocr_data["id"])
             
-            return jsonify({
+            return {
                 "success": True, 
                 "name": new_username, 
-                "roll": new_userid
-            })
+                "roll": new_userid,
+                "timings": timer.timings
+            }
             
         except Exception as e:
-            return jsonify({
+            return {
                 'success': False, 
                 'message': f'OCR extraction failed: {str(e)}'
-            })
+            }
             
     except Exception as e:
-        return jsonify({
+        return {
             'success': False, 
             'message': f'Server error: {str(e)}'
-        })
+        }
 
-@face_recognition_bp.route('/register-face', methods=['POST'])
-def register_face():
-    data = request.json
-    new_username = data.get("name", "").upper()  
-    new_userid = data.get("roll", "")  
-    id_type = data.get("id_type", "")
-    
-    if not new_username or not new_userid:
-        return jsonify({'success': False, 'message': 'Invalid user during face details'})
+@face_recognition_bp.route("/extract-id", methods=["POST"])
+def extract_id():
+    """Extract OCR data from ID card image (?async=1 returns a job id)"""
+    data = request.json or {}
+    id_type = data.get("id_type")
+    id_image_base64 = data.get("id_image")
 
+    # Validate input
+    if not id_type or not id_image_base64:
+        return jsonify({
+            'success': False, 
+            'message': 'Missing id_type or id_image'
+        })
+    return run_or_enqueue(request, "extract_id", extract_id_data, id_type, id_image_base64)
+
+def register_face_capture(new_username, new_userid, id_type):
+    """Capture a frame, embed the face and store the new user; returns the response body"""
+    face_index_resource.get()
     # Check if video feed is active before attempting single capture
     camera_status = camera_manager.get_camera_status()
     if camera_status["video_feed_active"]:
-        return jsonify({'success': False, 'message': 'Cannot register face while video feed is active. Please stop the video feed first.'})
+        return {'success': False, 'message': 'Cannot register face while video feed is active. Please stop the video feed first.'}
 
     # Single frame capture attempt
     ret, frame = camera_manager.capture_frame()
     
     if not ret or frame is None:
-        return jsonify({'success': False, 'message': 'Camera error - could not capture frame'})
+        return {'success': False, 'message': 'Camera error - could not capture frame'}
 
     # Extract face embedding
     embedding = extract_face_embedding(frame)
     if embedding is None:
-        return jsonify({'success': False, 'message': 'No face detected'})
+        return {'success': False, 'message': 'No face detected'}
 
     # Check if user already exists
     user_key = f"{new_username}_{new_userid}"
-    if user_key in embeddings_db:
-        return jsonify({'success': False, 'message': 'User already registered'})
+    with face_index_lock:
+        if user_key in embeddings_db:
+            return {'success': False, 'message': 'User already registered'}
 
-    # Update FAISS index
-    faiss_index.add(np.array([embedding], dtype=np.float32))
-    embeddings_db[user_key] = embedding.tolist()
+        # Update FAISS index
+        faiss_index.add(np.array([embedding], dtype=np.float32))
+        embeddings_db[user_key] = embedding.tolist()
     
     # Store embedding in MongoDB
     embeddings_collection.insert_one({
@@ -223,61 +283,111 @@ def register_face():
     })
 
     print(f"Registered {new_username} successfully.")
-    return jsonify({'success': True, 'userName': new_username})
-
-
-@face_recognition_bp.route("/Authenticate", methods=["POST"])
-def authenticate():
-    data = request.json
-    new_username = data.get("name", "")
-    new_username = new_username.strip().upper().replace("  ", " ")
+    return {'success': True, 'userName': new_username}
 
-    new_userid = data.get("roll", "").strip()
-    id_type = data.get("id_type", "")   
 
+@face_recognition_bp.route('/register-face', methods=['POST'])
+def register_face():
+    """Capture-and-register (?async=1 returns a job id)"""
+    data = request.json or {}
+    new_username = data.get("name", "").upper()  
+    new_userid = data.get("roll", "")  
+    id_type = data.get("id_type", "")
+    
+    if not new_username or not new_userid:
+        return jsonify({'success': False, 'message': 'Invalid user during face details'})
+    return run_or_enqueue(request, "register_face", register_face_capture, new_username, new_userid, id_type)
+
+
+def find_better_match(embedding, key, claimed_score):
+    """Another registered identity that matches the probe better than the claimed one, as (key, score), or None"""
+    with face_index_lock:
+        D, I = faiss_index.search(np.array([embedding], dtype=np.float32), k=min(2, faiss_index.ntotal))
+        keys = list(embeddings_db.keys())
+    for score, index in zip(D[0], I[0]):
+        if index >= 0 and keys[index] != key and score > claimed_score:
+            return keys[index], float(score)
+    return None
+
+def authenticate_capture(new_username, new_userid, id_type, impostor_check=False):
+    """
+    Capture a frame and verify it 1:1 against the claimed identity's template; returns
+    the response body. With impostor_check the probe is also searched 1:N and rejected
+    when another registered identity matches it better.
+    """
+    face_index_resource.get()
+    timer = StageTimer()
     key = f"{new_username}_{new_userid}"
     # Check if the name and roll combination exists in the database
-    if key not in embeddings_db:
-        return jsonify({"success": False, "message": "User not found"})
+    with face_index_lock:
+        template = embeddings_db.get(key)
+    if template is None:
+        return {"success": False, "message": "User not found"}
 
     # Check if video feed is active before attempting single capture
     camera_status = camera_manager.get_camera_status()
     if camera_status["video_feed_active"]:
-        return jsonify({"success": False, "message": "Cannot authenticate while video feed is active. Please stop the video feed first."})
+        return {"success": False, "message": "Cannot authenticate while video feed is active. Please stop the video feed first."}
 
     # Single frame capture attempt
-    ret, frame = camera_manager.capture_frame()
+    with timer.stage("capture"):
+        ret, frame = camera_manager.capture_frame()
     
     if not ret or frame is None:
-        return jsonify({"success": False, "message": "Camera error - could not capture frame"})
+        return {"success": False, "message": "Camera error - could not capture frame"}
 
     # Extract face embedding
-    embedding = extract_face_embedding(frame)
+    with timer.stage("embed"):
+        embedding = extract_face_embedding(frame)
     if embedding is None:
-        return jsonify({"success": False, "message": "No face detected"})
-
-    # Check FAISS index size
-    if faiss_index.ntotal == 0:
-        return jsonify({"success": False, "message": "No registered faces"})
-
-    # Perform FAISS search
-    D, I = faiss_index.search(np.array([embedding], dtype=np.float32), k=1)
-    
-    if D[0][0] > 0.6:  # Threshold for face recognition
-        recognized_key = list(embeddings_db.keys())[I[0][0]]
-        name, roll = recognized_key.split("_")
+        return {"success": False, "message": "No face detected", "timings": timer.timings}
+
+    # 1:1 verification: one dot product against the claimed template, independent of gallery size
+    with timer.stage("verify"):
+        score = float(np.dot(np.asarray(template, dtype=np.float32), embedding))
+    if score <= FACE_VERIFY_THRESHOLD:
+        return {"success": False, "message": "Face not recognized", "score": round(score, 4), "timings": timer.timings}
+
+    if impostor_check:
+        with timer.stage("impostor_check"):
+            better_match = find_better_match(embedding, key, score)
+        if better_match is not None:
+            print(f"Authentication as {key} rejected: probe matches {better_match[0]} better")
+            return {
+                "success": False,
+                "message": "Face matches another registered user better",
+                "score": round(score, 4),
+                "other_score": round(better_match[1], 4),
+                "timings": timer.timings
+            }
+
+    # Save attendance to MongoDB
+    with timer.stage("save"):
+        save_attendance(new_username, new_userid)
+
+    return {
+        "success": True,
+        "status": "Face recognized",
+        "name": new_username,
+        "roll": new_userid,
+        "score": round(score, 4),
+        "timings": timer.timings
+    }
 
-        # Save attendance to MongoDB
-        save_attendance(name, roll)
 
-        return jsonify({
-            "success": True,
-            "status": "Face recognized",
-            "name": name,
-            "roll": roll,
-        })
+@face_recognition_bp.route("/Authenticate", methods=["POST"])
+def authenticate():
+    """Capture-and-verify authentication (?async=1 returns a job id, ?impostor_check=1 adds a 1:N check)"""
+    data = request.json or {}
+    new_username = data.get("name", "")
+    new_username = new_username.strip().upper().replace("  ", " ")
 
-    return jsonify({"success": False, "message": "Face not recognized"})
+    new_userid = data.get("roll", "").strip()
+    id_type = data.get("id_type", "")   
+    impostor_check = request.args.get("impostor_check", "").lower() in ("1", "true", "yes")
+    return run_or_enqueue(
+        request, "authenticate", authenticate_capture, new_username, new_userid, id_type, impostor_check
+    )
 
 
 @face_recognition_bp.route("/todayattendance", methods=["GET"])
@@ -323,7 +433,7 @@ def get_todays_attendance():
 recognized_faces = set()
 recognized_faces_lock = threading.Lock()  # Thread-safe access to recognized faces
 
-def generate_video_feed():
+def generate_video_feed(tier="auto"):
     """Robust video feed generator with proper error handling and cleanup"""
     global recognized_faces
     
@@ -343,6 +453,8 @@ def generate_video_feed():
 
     # Add this generator to the active set for tracking
     active_video_generators.add(generate_video_feed)
+    # Per-client resolution/quality/FPS tier, adapted to the client's link when "auto"
+    stream = MJPEGStream("group_feed", tier)
     
     try:
         # Ensure camera settings are optimal for streaming
@@ -353,6 +465,9 @@ def generate_video_feed():
     
         frame_skip = 2  # Process every 2nd frame to reduce lag
         frame_count = 0
+        # Skip Haar + ArcFace entirely while the scene is static
+        motion_gate = get_motion_gate("group_feed", max_skip_seconds=5)
+        face_index_resource.get()
         consecutive_failures = 0
         max_consecutive_failures = 10
     
@@ -374,52 +489,46 @@ def generate_video_feed():
                 consecutive_failures = 0
                 
                 frame_count += 1
-                if frame_count % frame_skip == 0:
+                if frame_count % frame_skip == 0 and motion_gate.should_process(frame):
                     try:
                         # Face detection and recognition logic
                         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-                        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+                        faces = detect_faces(gray, 1.3, 5)
         
                         for (x, y, w, h) in faces:
                             # Make sure face region is valid
                             if x >= 0 and y >= 0 and x+w <= frame.shape[1] and y+h <= frame.shape[0]:
-                                face = frame[y:y+h, x:x+w]
-                                
-                                # Skip small faces
-                                if w < 80 or h < 80:
-                                    continue
-                                
-                                # Extract embedding using existing method
-                                embedding = extract_face_embedding(face)
+                                # Quality gate, then a single embedding attempt, no retries
+                                embedding = embed_face_crop(frame, (x, y, w, h))
                                 if embedding is None:
-                                    continue  # Skip if face is not detected properly
+                                    continue  # Too small, blurred or turned away
         
                                 # Perform FAISS search
-                                if faiss_index.ntotal > 0:  # Make sure index is not empty
-                                    D, I = faiss_index.search(np.array([embedding], dtype=np.float32), k=1)
+                                recognized_key = None
+                                with face_index_lock:
+                                    if faiss_index.ntotal > 0:  # Make sure index is not empty
+                                        D, I = faiss_index.search(np.array([embedding], dtype=np.float32), k=1)
+                                        if D[0][0] > 0.5:  # Similarity threshold (adjustable)
+                                            recognized_key = list(embeddings_db.keys())[I[0][0]]
             
-                                    if D[0][0] > 0.5:  # Similarity threshold (adjustable)
-                                        recognized_key = list(embeddings_db.keys())[I[0][0]]
-                                        name, roll = recognized_key.split("_")
+                                if recognized_key is not None:
+                                    # Names may contain underscores, the roll number is after the last one
+                                    name, roll = recognized_key.rsplit("_", 1)
             
-                                        # Thread-safe access to recognized faces
-                                        with recognized_faces_lock:
-                                            recognized_faces.add((name, roll))
+                                    # Thread-safe access to recognized faces
+                                    with recognized_faces_lock:
+                                        recognized_faces.add((name, roll))
                                         
-                                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                                        cv2.putText(frame, name, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (36, 255, 12), 2)
+                                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                                    cv2.putText(frame, name, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (36, 255, 12), 2)
                     except Exception as e:
                         print(f"Error processing frame for face recognition: {e}")
         
-                # Compress frame for streaming
-                ret_encode, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                if ret_encode:
-                    yield (b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + 
-                           buffer.tobytes() + b"\r\n")
-                else:
-                    print("Failed to encode frame")
-                    time.sleep(0.1)
+                # Compress frame for streaming (None when the tier's FPS cap skips this frame)
+                chunks = stream.encode(frame)
+                if chunks is not None:
+                    yield from chunks
+                    stream.sent(sum(len(chunk) for chunk in chunks))
             
             except Exception as e:
                 print(f"Error in video feed generation loop: {e}")
@@ -430,6 +539,7 @@ def generate_video_feed():
     
     finally:
         print("Cleaning up video feed resources...")
+        stream.close()
         # Always clean up, even if an exception occurs
         try:
             camera_manager.stop_continuous_use()
@@ -455,17 +565,28 @@ def video_feed():
     if camera_status["cleanup_in_progress"]:
         return jsonify({"error": "Camera cleanup in progress"}), 503
     
+    # ?tier=high|medium|low pins the stream quality, default "auto" adapts to the link
+    tier = request.args.get("tier", "auto")
+    if tier != "auto" and tier not in STREAM_TIERS:
+        return jsonify({"error": f"Unknown tier, use auto or one of {', '.join(STREAM_TIERS)}"}), 400
+    
     # Clear the stop event for new video feed
     video_feed_stop_event.clear()
     
     try:
-        return Response(generate_video_feed(), 
+        return Response(generate_video_feed(tier), 
                        mimetype="multipart/x-mixed-replace; boundary=frame")
     except Exception as e:
         print(f"Error starting video feed: {e}")
         return jsonify({"error": "Failed to start video feed"}), 500
 
 
+@face_recognition_bp.route("/video_feed/stats", methods=["GET"])
+def video_feed_stats():
+    """Per-stream tier, encode time and bytes/s of the active MJPEG feeds, plus face crop rejections"""
+    return jsonify({**get_stream_stats(), "face_quality": get_quality_stats()})
+
+
 @face_recognition_bp.route("/stop_video", methods=["POST"])
 def stop_video():
     """Stop video feed with proper cleanup"""
@@ -563,13 +684,8 @@ def get_face_stats():
         # Get total records
         total_records = face_collection.count_documents({})
         
-        # Get attendance today (count unique users who attended today)
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        
-        attendance_today = attendance_collection.count_documents({
-            "timestamp": {"$gte": today_start, "$lt": today_end}
-        })
+        # Attendance today comes from the precomputed daily rollup
+        attendance_today = attendance_rollups.summary(datetime.now())
         
         # Count known faces (where name is not "Unknown")
         known_faces = face_collection.count_documents({
@@ -585,7 +701,8 @@ def get_face_stats():
         
         stats = {
             "totalRecords": total_records,
-            "attendanceToday": attendance_today,
+            "attendanceToday": attendance_today["count"],
+            "uniqueAttendeesToday": attendance_today["unique_identities"],
             "knownFaces": known_faces,
             "unknownFaces": unknown_faces
         }
@@ -594,27 +711,74 @@ def get_face_stats():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@face_recognition_bp.route("/id_cache/stats", methods=["GET"])
+def id_cache_stats():
+    return jsonify({**id_result_cache.get_stats(), "ocr_engine": ocr_pool.get_stats()}), 200
+
+
+@face_recognition_bp.route("/attendance/trend", methods=["GET"])
+def get_attendance_trend():
+    """Daily or hourly attendance counts, e.g. ?days=30&granularity=day"""
+    try:
+        days = min(max(int(request.args.get('days', 7)), 1), 366)
+    except ValueError:
+        return jsonify({"error": "Invalid days"}), 400
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('day', 'hour'):
+        return jsonify({"error": "granularity must be day or hour"}), 400
+    end = datetime.now()
+    start = end - timedelta(days=days - 1)
+    try:
+        return jsonify(attendance_rollups.trend(start, end, granularity)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@face_recognition_bp.route("/attendance/rollups/rebuild", methods=["POST"])
+def rebuild_attendance_rollups():
+    try:
+        days = attendance_rollups.rebuild()
+        if days is None:
+            return jsonify({"error": "A rollup rebuild is already running"}), 409
+        return jsonify({"days": days}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+ATTENDANCE_LOG_FIELDS = ["_id", "name", "roll", "timestamp", "date"]
+
+def parse_attendance_range(args):
+    """Inclusive (start, end) datetimes from ?start_date/&end_date (YYYY-MM-DD), defaulting to today"""
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
+
+    if start_date_str:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").replace(hour=0, minute=0, second=0)
+    else:
+        # Default to today
+        start_date = datetime.now().replace(hour=0, minute=0, second=0)
+
+    if end_date_str:
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    else:
+        # Default to today end
+        end_date = start_date.replace(hour=23, minute=59, second=59)
+    return start_date, end_date
+
+def format_attendance_log(log):
+    return {
+        "_id": str(log["_id"]),
+        "name": log["name"],
+        "roll": log["roll"],
+        "timestamp": log["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
+        "date": log["date"] if "date" in log else log["timestamp"].strftime("%Y-%m-%d")
+    }
+
 @face_recognition_bp.route("/attendance/logs", methods=["GET"])
 def get_attendance_logs():
     """Get attendance logs with date filtering"""
     try:
-        # Get date filter parameters
-        start_date_str = request.args.get('start_date')
-        end_date_str = request.args.get('end_date')
-        
         # Parse dates or use defaults
         try:
-            if start_date_str:
-                start_date = datetime.strptime(start_date_str, "%Y-%m-%d").replace(hour=0, minute=0, second=0)
-            else:
-                # Default to today
-                start_date = datetime.now().replace(hour=0, minute=0, second=0)
-                
-            if end_date_str:
-                end_date = datetime.strptime(end_date_str, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            else:
-                # Default to today end
-                end_date = start_date.replace(hour=23, minute=59, second=59)
+            start_date, end_date = parse_attendance_range(request.args)
         except ValueError:
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
             
@@ -625,15 +789,7 @@ def get_attendance_logs():
         logs = list(attendance_collection.find(query).sort("timestamp", -1))
         
         # Format the logs for the response
-        formatted_logs = []
-        for log in logs:
-            formatted_logs.append({
-                "_id": str(log["_id"]),
-                "name": log["name"],
-                "roll": log["roll"],
-                "timestamp": log["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
-                "date": log["date"] if "date" in log else log["timestamp"].strftime("%Y-%m-%d")
-            })
+        formatted_logs = [format_attendance_log(log) for log in logs]
         
         return jsonify({
             "success": True,
@@ -644,6 +800,21 @@ def get_attendance_logs():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@face_recognition_bp.route("/attendance/logs/export", methods=["GET"])
+def export_attendance_logs():
+    """Stream attendance logs as NDJSON (default) or CSV: ?format=csv&start_date=...&end_date=..."""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        start_date, end_date = parse_attendance_range(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+    query = {"timestamp": {"$gte": start_date, "$lte": end_date}}
+    cursor = attendance_collection.find(query, {field: 1 for field in ATTENDANCE_LOG_FIELDS}).sort("timestamp", -1)
+    return export_response(cursor, format_attendance_log, ATTENDANCE_LOG_FIELDS, export_format, "attendance_logs")
+
 @face_recognition_bp.route("/delete/<id>", methods=["DELETE"])
 def delete_face_record(id):
     """Delete a face record from database"""
@@ -0,0 +1,94 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from modules.face_Recognition.ocr_engine import ocr_pool, OCR_POOL_SIZE
+
+UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+NAME_CHARS = UPPER + UPPER.lower() + " ."
+DIGITS = "0123456789"
+
+# Standard ID-1 card aspect ratio (85.6 x 54 mm); template regions assume a crop of the whole card
+CARD_ASPECT_RATIO = 85.6 / 54.0
+CARD_ASPECT_TOLERANCE = 0.25
+
+# Region height (px) handed to Tesseract; single text lines read best at this size
+REGION_TARGET_HEIGHT = 64
+
+# --------------------------
+# Layout templates
+# Regions are (x1, y1, x2, y2) fractions of the card crop. Each field is OCR'd as a
+# single line (psm 7) restricted to its whitelist and must match its pattern.
+# --------------------------
+ID_TEMPLATES = {
+    "aadhar": {
+        "name": {"region": (0.28, 0.22, 0.98, 0.36), "whitelist": NAME_CHARS, "psm": 7,
+                 "pattern": r"[A-Za-z][A-Za-z .]{3,}"},
+        "id": {"region": (0.22, 0.76, 0.80, 0.92), "whitelist": DIGITS + " ", "psm": 7,
+               "pattern": r"\d{4}\s?\d{4}\s?\d{4}", "strip_spaces": True},
+    },
+    "license": {
+        "name": {"region": (0.30, 0.34, 0.98, 0.46), "whitelist": UPPER + " .", "psm": 7,
+                 "pattern": r"[A-Z][A-Z .]{3,}"},
+        "id": {"region": (0.05, 0.18, 0.70, 0.30), "whitelist": UPPER + DIGITS + " -", "psm": 7,
+               "pattern": r"[A-Z]{2}[-\s]?\d{2}[-\s]?\d{4,11}", "strip_spaces": True},
+    },
+    "college": {
+        "name": {"region": (0.05, 0.62, 0.95, 0.74), "whitelist": UPPER + " .", "psm": 7,
+                 "pattern": r"[A-Z]{2,}(\s+[A-Z]{2,}){1,3}"},
+        "id": {"region": (0.05, 0.74, 0.95, 0.86), "whitelist": UPPER + UPPER.lower() + DIGITS + " .:", "psm": 7,
+               "pattern": r"\d{9}"},
+    },
+}
+
+_region_executor = ThreadPoolExecutor(max_workers=OCR_POOL_SIZE, thread_name_prefix="id-roi-ocr")
+
+
+def looks_like_card(image):
+    height, width = image.shape[:2]
+    return abs(width / height - CARD_ASPECT_RATIO) <= CARD_ASPECT_TOLERANCE
+
+
+def prepare_region(card, region):
+    height, width = card.shape[:2]
+    x1, y1, x2, y2 = region
+    crop = card[int(y1 * height):int(y2 * height), int(x1 * width):int(x2 * width)]
+    if crop.size == 0:
+        return None
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    scale = REGION_TARGET_HEIGHT / gray.shape[0]
+    gray = cv2.resize(gray, None, fx=scale, fy=scale,
+                      interpolation=cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def read_field(card, spec):
+    region = prepare_region(card, spec["region"])
+    if region is None:
+        return None
+    text = ocr_pool.image_to_string(region, psm=spec["psm"], whitelist=spec["whitelist"])
+    match = re.search(spec["pattern"], text.strip())
+    if not match:
+        return None
+    value = match.group(0).strip()
+    if spec.get("strip_spaces"):
+        value = re.sub(r"[\s-]", "", value)
+    return value
+
+
+def extract_with_template(card, id_type):
+    """
+    OCR only the template regions of a cropped card, in parallel.
+    Returns {"name", "id"} when every field validates, otherwise None so the caller
+    can fall back to full-card OCR.
+    """
+    template = ID_TEMPLATES.get(id_type)
+    if template is None or not looks_like_card(card):
+        return None
+    futures = {field: _region_executor.submit(read_field, card, spec) for field, spec in template.items()}
+    values = {field: future.result() for field, future in futures.items()}
+    if not all(values.values()):
+        return None
+    return {"name": values["name"], "id": values["id"]}
@@ -0,0 +1,141 @@
+import os
+import queue
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from PIL import Image
+
+# Tesseract binary (pytesseract fallback) and tessdata location are configurable;
+# the Windows install path is only used when it actually exists
+WINDOWS_TESSERACT_PATH = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
+TESSERACT_CMD = os.environ.get('TESSERACT_CMD') or shutil.which('tesseract') or (
+    WINDOWS_TESSERACT_PATH if os.path.exists(WINDOWS_TESSERACT_PATH) else 'tesseract'
+)
+TESSDATA_PREFIX = os.environ.get('TESSDATA_PREFIX')
+TESSERACT_LANG = os.environ.get('TESSERACT_LANG', 'eng')
+OCR_POOL_SIZE = int(os.environ.get('OCR_POOL_SIZE', 2))
+
+try:
+    # Binds libtesseract directly: handles stay loaded and calls release the GIL
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+class TesseractEnginePool:
+    """
+    Pool of long-lived Tesseract API handles.
+    With tesserocr available, each handle keeps the language model loaded, so an OCR
+    call is a SetImage/GetUTF8Text on an in-process engine instead of a process spawn.
+    Without it (tesserocr is an optional dependency, it needs libtesseract to build),
+    every call falls back to pytesseract, which spawns the tesseract binary; the
+    warning at startup and get_stats()["backend"] make that visible.
+    """
+
+    def __init__(self, size=OCR_POOL_SIZE, lang=TESSERACT_LANG, tessdata=TESSDATA_PREFIX):
+        self.size = size
+        self.lang = lang
+        self.tessdata = tessdata
+        self.handles = queue.Queue()
+        self.created = 0
+        self.create_lock = threading.Lock()
+        self.backend = "tesserocr" if tesserocr is not None else "pytesseract"
+        self.calls = 0
+        self.create_failures = 0
+        self.ocr_time = 0.0
+        self.stats_lock = threading.Lock()
+
+        if tesserocr is None:
+            print("tesserocr is not installed: ID OCR falls back to pytesseract, one tesseract process per call")
+            import pytesseract
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+            self.pytesseract = pytesseract
+
+    def _create_handle(self):
+        kwargs = {"lang": self.lang}
+        if self.tessdata:
+            kwargs["path"] = self.tessdata
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    @contextmanager
+    def engine(self):
+        """Borrow a handle, creating up to `size` handles lazily"""
+        handle = None
+        try:
+            handle = self.handles.get_nowait()
+        except queue.Empty:
+            with self.create_lock:
+                if self.created < self.size:
+                    try:
+                        handle = self._create_handle()
+                    except Exception:
+                        with self.stats_lock:
+                            self.create_failures += 1
+                        raise
+                    # Only a handle that exists takes a slot, or failed creations would leak them all
+                    self.created += 1
+            if handle is None:
+                handle = self.handles.get()
+        try:
+            yield handle
+        finally:
+            self.handles.put(handle)
+
+    def image_to_string(self, image, psm=None, whitelist=None):
+        """OCR a numpy (grayscale or BGR) or PIL image"""
+        started = time.perf_counter()
+        try:
+            return self._image_to_string(image, psm, whitelist)
+        finally:
+            with self.stats_lock:
+                self.calls += 1
+                self.ocr_time += time.perf_counter() - started
+
+    def _image_to_string(self, image, psm, whitelist):
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(image[:, :, ::-1] if image.ndim == 3 else image)
+
+        if tesserocr is None:
+            config = []
+            if psm is not None:
+                config.append(f"--psm {int(psm)}")
+            if whitelist:
+                config.append(f"-c tessedit_char_whitelist={whitelist}")
+            if self.tessdata:
+                config.append(f'--tessdata-dir "{self.tessdata}"')
+            return self.pytesseract.image_to_string(image, lang=self.lang, config=" ".join(config))
+
+        with self.engine() as api:
+            api.SetPageSegMode(int(psm) if psm is not None else tesserocr.PSM.AUTO)
+            api.SetVariable("tessedit_char_whitelist", whitelist or "")
+            api.SetImage(image)
+            text = api.GetUTF8Text()
+            api.Clear()
+            return text
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {
+                "backend": self.backend,
+                # pytesseract starts a tesseract process for every call
+                "spawns_process_per_call": tesserocr is None,
+                "pool_size": self.size,
+                "handles_created": self.created,
+                "create_failures": self.create_failures,
+                "calls": self.calls,
+                "avg_call_ms": round(1000 * self.ocr_time / self.calls, 2) if self.calls else 0
+            }
+
+    def close(self):
+        while True:
+            try:
+                handle = self.handles.get_nowait()
+            except queue.Empty:
+                break
+            handle.End()
+        self.created = 0
+
+
+ocr_pool = TesseractEnginePool()
@@ -1,44 +1,54 @@
 import cv2
-import pytesseract
 import numpy as np
 import re
 
-# Configure Tesseract path
-tesseract_path = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
-pytesseract.pytesseract.tesseract_cmd = tesseract_path      
+# Pooled Tesseract engines; binary/tessdata come from TESSERACT_CMD / TESSDATA_PREFIX
+from modules.face_Recognition.ocr_engine import ocr_pool
+from modules.face_Recognition.id_templates import extract_with_template
+from modules.common.image_preprocessing import canonical_card, timed_stage
+from modules.common.result_cache import content_key, result_cache_from_env
 
-def crop_id_card(frame):
-    """Detect and crop the ID card from the image."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    edged = cv2.Canny(blurred, 20, 80)  
+# Resubmitted ID photos return the stored OCR result instead of re-running Tesseract.
+# Names and ID numbers are personal data: memory only, never spilled to RESULT_CACHE_DIR.
+id_result_cache = result_cache_from_env("id_ocr_results", spill=False)
 
-    # Find contours
-    contours, _ = cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    if not contours:
-        return frame 
+def crop_id_card(frame, timer=None):
+    """Detect the ID card on a downscaled copy and warp it to the canonical card size."""
+    return canonical_card(frame, timer)
 
-    largest_contour = max(contours, key=cv2.contourArea, default=None)
 
-    if largest_contour is not None and cv2.contourArea(largest_contour) > 5000:
-        x, y, w, h = cv2.boundingRect(largest_contour)
-        return frame[y:y+h, x:x+w]
-    else:
-        return frame  # Return original frame if no ID detected
+def extract_ocr_data(frame, id_type, timer=None):
+    """Extract text from the ID card based on the selected ID type."""
+    with timed_stage(timer, "cache_lookup"):
+        cache_key = content_key(frame, pipeline="id_ocr", id_type=id_type)
+        cached = id_result_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+    result = _extract_ocr_data(frame, id_type, timer)
+    # Failed reads are not cached, so a retry of the same photo runs OCR again
+    if result.get("name") and result.get("id"):
+        id_result_cache.put(cache_key, result)
+    return result
 
 
-def extract_ocr_data(frame, id_type):
-    """Extract text from the ID card based on the selected ID type."""
-    cropped_frame = crop_id_card(frame)
-    gray = cv2.cvtColor(cropped_frame, cv2.COLOR_BGR2GRAY)
-    gray = cv2.GaussianBlur(gray, (5, 5), 0)
-    gray = cv2.adaptiveThreshold(
-        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-    )
-    
-    ocr_text = pytesseract.image_to_string(gray)
-                
+def _extract_ocr_data(frame, id_type, timer=None):
+    cropped_frame = crop_id_card(frame, timer)
+
+    # Known layouts: OCR only the name/ID regions, fall back to full-card OCR below
+    with timed_stage(timer, "template_ocr"):
+        template_data = extract_with_template(cropped_frame, id_type)
+    if template_data:
+        return template_data
+
+    with timed_stage(timer, "threshold"):
+        gray = cv2.cvtColor(cropped_frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        gray = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+        )
+
+    with timed_stage(timer, "full_ocr"):
+        ocr_text = ocr_pool.image_to_string(gray)
 
     if id_type == "aadhar":
         return extract_aadhar_data(ocr_text)
@@ -1,28 +1,249 @@
 import os
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from pymongo import MongoClient
 from bson.binary import Binary
+from bson.errors import InvalidId
 from bson.objectid import ObjectId
+from PIL import Image
+import numpy as np
+import cv2
 import io
 
-# MongoDB setup
-MONGO_URI = "mongodb://localhost:27017"
-client = MongoClient(MONGO_URI)
-db = client["Smart_Surveillance"]
-human_images_collection = db["human_detection_images"]
+from modules.common.event_bus import event_bus
+from modules.common.batched_writer import BatchedWriter
+from modules.common.db import FIRE_AND_FORGET, get_collection
+from modules.camera_manager.camera_manager import camera_manager
+from modules.camera_manager.motion_gate import MotionGate
+from modules.human_Detection.person_detector import SOURCE_OWNER, PersonDetectionWorker
+
+# MongoDB setup (shared client, see modules/common/db.py)
+human_images_collection = get_collection("human_detection_images")
+# Unacknowledged handle for the person detector's high-rate background ingest only;
+# client uploads (which answer with an id) and the routes keep the acknowledged one
+human_images_ingest = get_collection("human_detection_images", write_concern=FIRE_AND_FORGET)
 
 human_detection_bp = Blueprint("human_detection", __name__)
 
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg'}
 
+# Upload limits - checked against Content-Length before the multipart body is parsed
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_DETECTION_UPLOAD_BYTES', 5 * 1024 * 1024))
+MAX_IMAGE_DIMENSION = int(os.environ.get('MAX_DETECTION_DIMENSION', 1920))
+REENCODE_UPLOADS = os.environ.get('REENCODE_DETECTION_UPLOADS', '0') == '1'
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # boundaries, headers and the location_id field
+
+DETECTION_EVENTS_CHANNEL = "human_detection"
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def publish_detection_change(action, count, **details):
+    """Publish a single change notification for one or many detection images"""
+    payload = {"action": action, "count": count}
+    payload.update(details)
+    event_bus.publish(DETECTION_EVENTS_CHANNEL, "detection_change", payload)
+
+def publish_written_detections(docs):
+    """Notify listeners once per persisted batch"""
+    publish_detection_change(
+        "created",
+        len(docs),
+        ids=[str(doc["_id"]) for doc in docs],
+        location_ids=sorted({doc["location_id"] for doc in docs})
+    )
+
+# Detection images are persisted in the background with insert_many batching.
+# Uploaded images are written acknowledged and announced as "created" once stored.
+detection_writer = BatchedWriter(
+    human_images_collection,
+    max_queue=int(os.environ.get('DETECTION_WRITE_QUEUE_SIZE', 500)),
+    batch_size=50,
+    flush_interval=0.2,
+    on_flush=publish_written_detections,
+    name="detection-writer",
+    # Upload ids were already returned with 202: documents that cannot be stored are kept for replay
+    dead_letter_dir=os.environ.get('DETECTION_DEAD_LETTER_DIR', 'dead_letter')
+)
+# The person detector's frames are fire-and-forget: no "created" events, since storage is never confirmed
+ingest_writer = BatchedWriter(
+    human_images_ingest,
+    max_queue=int(os.environ.get('DETECTION_WRITE_QUEUE_SIZE', 500)),
+    batch_size=50,
+    flush_interval=0.2,
+    name="detection-ingest-writer"
+)
+
+def store_detection_image(image_bytes, location_id, ts=None, writer=None):
+    """
+    Queue a detection JPEG with the standard schema for background persistence
+    (detection_writer unless another writer is given).
+    Returns (image_id, filename), or (None, None) if the write queue is full.
+    """
+    ts = ts or datetime.now()
+    filename = secure_filename(f"detection_{ts.strftime('%Y%m%d_%H%M%S_%f')}.jpg")
+    doc = {
+        "_id": ObjectId(),
+        "filename": filename,
+        "timestamp": ts,
+        "image_data": Binary(image_bytes),
+        "read": False,
+        "location_id": location_id
+    }
+    if not (writer or detection_writer).submit(doc):
+        return None, None
+    return str(doc["_id"]), filename
+
+def prepare_detection_image(image_bytes):
+    """
+    Cheaply validate a JPEG (markers + header) and downscale/re-encode it if it is
+    larger than MAX_IMAGE_DIMENSION. Raises ValueError for corrupt or non-JPEG data.
+    """
+    if not image_bytes.startswith(b"\xff\xd8\xff"):
+        raise ValueError("Not a JPEG image")
+    # Some encoders append data after the EOI marker, so it need not be the last bytes.
+    # 0xFF is byte-stuffed in scan data, so markers are unambiguous: the image is complete
+    # when an EOI follows the last start-of-scan (an EXIF thumbnail's EOI comes before it).
+    last_scan = image_bytes.rfind(b"\xff\xda")
+    if last_scan < 0 or image_bytes.rfind(b"\xff\xd9") < last_scan:
+        raise ValueError("Truncated JPEG image")
+
+    try:
+        # Only parses the header, pixel data is not decoded
+        with Image.open(io.BytesIO(image_bytes)) as header:
+            image_format = header.format
+            width, height = header.size
+    except Exception:
+        raise ValueError("Corrupt JPEG header")
+    if image_format != "JPEG" or width == 0 or height == 0:
+        raise ValueError("Not a JPEG image")
+
+    largest_side = max(width, height)
+    if largest_side <= MAX_IMAGE_DIMENSION and not REENCODE_UPLOADS:
+        return image_bytes
+
+    # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when the image is far too large
+    flags = cv2.IMREAD_COLOR
+    for factor, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                                 (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                 (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if largest_side / factor >= MAX_IMAGE_DIMENSION:
+            flags = reduced_flag
+            break
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags)
+    if image is None:
+        raise ValueError("Corrupt JPEG data")
+
+    scale = MAX_IMAGE_DIMENSION / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    if not ok:
+        raise ValueError("Failed to re-encode image")
+    return buffer.tobytes()
+
+# In-backend person detection over CameraManager named sources
+def store_background_detection(image_bytes, source_id):
+    return store_detection_image(image_bytes, source_id, writer=ingest_writer)
+
+person_detector = PersonDetectionWorker(store_background_detection)
+
+def warm_up():
+    person_detector.warm_up()
+
+def shutdown():
+    person_detector.stop()
+    detection_writer.stop()
+    ingest_writer.stop()
+
+def parse_timestamp(value):
+    """Parse an ISO date/datetime string, returning None for empty values; raises ValueError otherwise"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        # TypeError: a JSON body can carry a number, list or object instead of a string
+        raise ValueError(f"Invalid timestamp: {value!r}")
+
+def build_detection_filter(params):
+    """
+    Build a MongoDB filter from request parameters.
+    Supports id lists, location, time range and unread-only selection.
+    Raises ValueError on malformed ids or timestamps.
+    """
+    query = {}
+
+    ids = params.get("ids")
+    if ids:
+        if isinstance(ids, str):
+            ids = [i for i in ids.split(",") if i]
+        try:
+            query["_id"] = {"$in": [ObjectId(i) for i in ids]}
+        except (InvalidId, TypeError):
+            raise ValueError("Invalid image id in ids")
+
+    location_id = params.get("location_id")
+    if location_id:
+        # Plain strings only: a JSON object here would be taken as a query operator
+        if isinstance(location_id, list) and all(isinstance(i, str) for i in location_id):
+            query["location_id"] = {"$in": location_id}
+        elif isinstance(location_id, str):
+            query["location_id"] = location_id
+        else:
+            raise ValueError("location_id must be a string or a list of strings")
+
+    start = parse_timestamp(params.get("start"))
+    end = parse_timestamp(params.get("end"))
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lte"] = end
+
+    unread_only = params.get("all_unread") or params.get("unread_only")
+    if unread_only in (True, "true", "1"):
+        query["read"] = False
+
+    return query
+
+def describe_detection_filter(query):
+    """JSON-safe summary of a filter built by build_detection_filter, for change events"""
+    summary = {}
+    if "_id" in query:
+        summary["ids"] = [str(i) for i in query["_id"]["$in"]]
+    if "location_id" in query:
+        location_id = query["location_id"]
+        summary["location_ids"] = location_id["$in"] if isinstance(location_id, dict) else [location_id]
+    if "timestamp" in query:
+        if "$gte" in query["timestamp"]:
+            summary["start"] = query["timestamp"]["$gte"].isoformat()
+        if "$lte" in query["timestamp"]:
+            summary["end"] = query["timestamp"]["$lte"].isoformat()
+    return summary
+
+def format_detection_doc(doc, default_read):
+    return {
+        'id': str(doc['_id']),
+        'filename': doc.get('filename'),
+        'timestamp': doc.get('timestamp').isoformat() if doc.get('timestamp') else None,
+        'url': f"/detection_images/{doc['_id']}",
+        'read': doc.get('read', default_read),
+        'location_id': doc.get('location_id', 'N/A')
+    }
+
 # Route to handle human detection image uploads
 @human_detection_bp.route('/upload_detection', methods=['POST'])
 def upload_detection():
+    # Size is checked before request.files is touched: accessing it parses and spools the whole body.
+    # Chunked bodies have no declared length and would only be bounded by the app-wide MAX_CONTENT_LENGTH.
+    if request.content_length is None:
+        return jsonify({'error': 'Content-Length required'}), 411
+    if request.content_length > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        return jsonify({'error': 'Image too large'}), 413
     if 'image' not in request.files:
         return jsonify({'error': 'No image part'}), 400
     if 'location_id' not in request.form:
@@ -35,58 +256,53 @@ def upload_detection():
         return jsonify({'error': 'No selected file'}), 400
         
     if file and allowed_file(file.filename):
-        ts = datetime.now()
-        filename = secure_filename(f"detection_{ts.strftime('%Y%m%d_%H%M%S_%f')}.jpg")
         image_bytes = file.read()
-        
-        doc = {
-            "filename": filename,
-            "timestamp": ts,
-            "image_data": Binary(image_bytes),
-            "read": False,
-            "location_id": location_id
-        }
-        
-        result = human_images_collection.insert_one(doc)
+        if len(image_bytes) > MAX_UPLOAD_BYTES:
+            return jsonify({'error': 'Image too large'}), 413
+
+        try:
+            image_bytes = prepare_detection_image(image_bytes)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        image_id, filename = store_detection_image(image_bytes, location_id)
+        if image_id is None:
+            response = jsonify({'error': 'Detection queue full, retry later'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+
         return jsonify({
-            'message': 'Image uploaded successfully',
+            'message': 'Image accepted',
             'filename': filename,
-            'id': str(result.inserted_id),
+            'id': image_id,
             'location_id': location_id
-        }), 201
-        
+        }), 202
+
     return jsonify({'error': 'Invalid file type'}), 400
 
-# Route to list all detection images
+# Route to list all detection images (optionally filtered by location_id, start, end)
 @human_detection_bp.route('/detection_images', methods=['GET'])
 def list_detection_images():
-    images = []
-    for doc in human_images_collection.find({}, {"filename": 1, "timestamp": 1, "read": 1, "location_id": 1}):
-        images.append({
-            'id': str(doc['_id']),
-            'filename': doc.get('filename'),
-            'timestamp': doc.get('timestamp').isoformat() if doc.get('timestamp') else None,
-            'url': f"/detection_images/{doc['_id']}", 
-            'read': doc.get('read', True),
-            'location_id': doc.get('location_id', 'N/A')
-        })
-    images.sort(key=lambda x: x['timestamp'], reverse=True)
+    try:
+        query = build_detection_filter(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    projection = {"filename": 1, "timestamp": 1, "read": 1, "location_id": 1}
+    images = [format_detection_doc(doc, True)
+              for doc in human_images_collection.find(query, projection).sort("timestamp", -1)]
     return jsonify(images)
 
-# Route to list unread detection images
+# Route to list unread detection images (optionally filtered by location_id, start, end)
 @human_detection_bp.route('/unread_detection_images', methods=['GET'])
 def list_unread_detection_images():
-    images = []
-    for doc in human_images_collection.find({"read": False}, {"filename": 1, "timestamp": 1, "read": 1, "location_id": 1}):
-        images.append({
-            'id': str(doc['_id']),
-            'filename': doc.get('filename'),
-            'timestamp': doc.get('timestamp').isoformat() if doc.get('timestamp') else None,
-            'url': f"/detection_images/{doc['_id']}",  
-            'read': doc.get('read', False),
-            'location_id': doc.get('location_id', 'N/A')
-        })
-    images.sort(key=lambda x: x['timestamp'], reverse=True)
+    try:
+        query = build_detection_filter(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    query["read"] = False
+    projection = {"filename": 1, "timestamp": 1, "read": 1, "location_id": 1}
+    images = [format_detection_doc(doc, False)
+              for doc in human_images_collection.find(query, projection).sort("timestamp", -1)]
     return jsonify(images)
 
 # Route to serve detection images
@@ -112,6 +328,8 @@ def mark_image_read(image_id):
     )
     if result.matched_count == 0:
         return jsonify({"error": "Image not found"}), 404
+    if result.modified_count:
+        publish_detection_change("read", result.modified_count, ids=[image_id])
     return jsonify({"message": "Image marked as read"})
 
 # Route to delete a detection image
@@ -121,6 +339,136 @@ def delete_detection_image(image_id):
         result = human_images_collection.delete_one({"_id": ObjectId(image_id)})
         if result.deleted_count == 0:
             return jsonify({"error": "Image not found"}), 404
+        publish_detection_change("deleted", 1, ids=[image_id])
         return jsonify({"message": "Image deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+# Route to mark many images as read in one update_many
+# Body: {"ids": [...]} and/or {"location_id": ..., "start": ..., "end": ...} or {"all_unread": true}
+@human_detection_bp.route('/bulk_mark_read', methods=['POST'])
+def bulk_mark_read():
+    data = request.get_json(silent=True) or {}
+    try:
+        query = build_detection_filter(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not query:
+        return jsonify({"error": "Provide ids, location_id, start/end or all_unread"}), 400
+
+    # Subscribers get the normalized filter, never the raw request body
+    change_filter = describe_detection_filter(query)
+    query["read"] = False
+    result = human_images_collection.update_many(query, {"$set": {"read": True}})
+    if result.modified_count:
+        publish_detection_change("read", result.modified_count, filter=change_filter)
+    return jsonify({
+        "message": "Images marked as read",
+        "matched": result.matched_count,
+        "modified": result.modified_count
+    })
+
+# Route to delete many images in one delete_many, same body as /bulk_mark_read
+@human_detection_bp.route('/bulk_delete', methods=['POST'])
+def bulk_delete_detection_images():
+    data = request.get_json(silent=True) or {}
+    try:
+        query = build_detection_filter(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not query:
+        return jsonify({"error": "Provide ids, location_id, start/end or all_unread"}), 400
+
+    try:
+        result = human_images_collection.delete_many(query)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if result.deleted_count:
+        publish_detection_change("deleted", result.deleted_count, filter=describe_detection_filter(query))
+    return jsonify({
+        "message": "Images deleted successfully",
+        "deleted": result.deleted_count
+    })
+
+# Server-Sent Events stream of detection changes (created/read/deleted)
+@human_detection_bp.route('/detection_events')
+def detection_events():
+    last_id = event_bus.parse_last_id(request.headers.get('Last-Event-ID', request.args.get('last_id')))
+    return Response(
+        stream_with_context(event_bus.stream([DETECTION_EVENTS_CHANNEL], last_id=last_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+
+# Register a camera source for the in-backend person detector
+# Body: {"source_id": "gate_1", "uri": "rtsp://...", "max_fps": 2,
+#        "motion": {"method": "diff", "area_threshold": 0.01, "roi": [[[0, 0.5], [1, 0.5], [1, 1], [0, 1]]]}}
+@human_detection_bp.route('/sources', methods=['POST'])
+def add_detection_source():
+    data = request.get_json(silent=True) or {}
+    source_id = data.get('source_id')
+    uri = data.get('uri')
+    if not source_id or uri in (None, ''):
+        return jsonify({'error': 'Missing source_id or uri'}), 400
+    if isinstance(uri, str) and uri.isdigit():
+        uri = int(uri)
+
+    # Validate everything before the source is registered, so a bad request leaves nothing behind
+    max_fps = None
+    if 'max_fps' in data:
+        try:
+            max_fps = person_detector.validate_max_fps(data['max_fps'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid max_fps, must be a positive number'}), 400
+    motion = None
+    if data.get('motion'):
+        if not isinstance(data['motion'], dict):
+            return jsonify({'error': 'Invalid motion settings: must be an object'}), 400
+        try:
+            motion = MotionGate.validate_settings(**data['motion'])
+        except ValueError as e:
+            return jsonify({'error': f'Invalid motion settings: {str(e)}'}), 400
+
+    try:
+        camera_manager.add_source(source_id, uri, owner=SOURCE_OWNER)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    if motion is not None:
+        person_detector.motion_gate(source_id).configure(**motion)
+    if max_fps is not None:
+        person_detector.set_rate_limit(source_id, max_fps)
+    return jsonify({'message': 'Source registered', 'source_id': source_id}), 201
+
+@human_detection_bp.route('/sources', methods=['GET'])
+def list_detection_sources():
+    return jsonify(camera_manager.get_sources_status(owner=SOURCE_OWNER))
+
+@human_detection_bp.route('/sources/<source_id>', methods=['DELETE'])
+def remove_detection_source(source_id):
+    if not camera_manager.remove_source(source_id, owner=SOURCE_OWNER):
+        return jsonify({'error': 'Source not found'}), 404
+    person_detector.clear_source(source_id)
+    return jsonify({'message': 'Source removed'})
+
+@human_detection_bp.route('/detector/start', methods=['POST'])
+def start_person_detector():
+    try:
+        started = person_detector.start()
+    except Exception as e:
+        return jsonify({'error': f'Failed to start detector: {str(e)}'}), 500
+    message = 'Person detector started' if started else 'Person detector already running'
+    return jsonify({'message': message, 'running': True})
+
+@human_detection_bp.route('/detector/stop', methods=['POST'])
+def stop_person_detector():
+    person_detector.stop()
+    return jsonify({'message': 'Person detector stopped', 'running': False})
+
+@human_detection_bp.route('/ingest_stats', methods=['GET'])
+def detection_ingest_stats():
+    return jsonify({**detection_writer.get_stats(), "background_ingest": ingest_writer.get_stats()})
+
+@human_detection_bp.route('/detector/stats', methods=['GET'])
+def person_detector_stats():
+    return jsonify(person_detector.get_stats())
@@ -0,0 +1,235 @@
+import os
+import threading
+import time
+
+import cv2
+
+os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+
+from modules.camera_manager.camera_manager import camera_manager
+from modules.camera_manager.motion_gate import get_motion_gate, remove_motion_gate
+from modules.common.scheduler import inference_scheduler, thread_budget
+
+PERSON_CLASS_ID = 0  # COCO "person"
+# CameraManager owner tag of the sources added through /human_detection/sources; other
+# consumers' sources (e.g. gate cameras) are never person-detected
+SOURCE_OWNER = "human_detection"
+
+
+class PersonDetectionWorker:
+    """
+    Background worker that pulls frames from the CameraManager named sources it owns,
+    runs a CPU YOLO person model over micro-batches of frames from all cameras
+    and hands frames containing people to a store callback.
+    store_callback(jpeg_bytes, source_id) returns (image_id, filename), image_id is None when dropped.
+    """
+
+    def __init__(self, store_callback, model_path=None, batch_size=4, imgsz=640,
+                 conf=0.5, default_max_fps=2.0, alert_cooldown=5.0):
+        self.store_callback = store_callback
+        self.model_path = model_path or os.environ.get('PERSON_DETECTOR_MODEL', 'yolov8n.pt')
+        self.batch_size = batch_size
+        self.imgsz = imgsz
+        self.conf = conf
+        self.default_max_fps = default_max_fps
+        self.alert_cooldown = alert_cooldown
+
+        self.model = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        # Serializes start()/stop(); separate from self.lock, which the worker thread takes
+        self.lifecycle_lock = threading.Lock()
+
+        self.max_fps = {}
+        self.next_due = {}
+        self.last_alert = {}
+        self.camera_stats = {}
+        self.batches = 0
+        self.inference_time = 0.0
+        self.started_at = None
+
+    def _load_model(self):
+        if self.model is None:
+            from ultralytics import YOLO
+            print(f"Loading person detection model {self.model_path}...")
+            self.model = YOLO(self.model_path)
+            # Torch may only have been imported just now
+            thread_budget.apply()
+        return self.model
+
+    def warm_up(self):
+        """Load the YOLO model ahead of the first detection"""
+        self._load_model()
+
+    @staticmethod
+    def validate_max_fps(max_fps):
+        """max_fps as a positive float, ValueError otherwise"""
+        max_fps = float(max_fps)
+        if not 0 < max_fps < float("inf"):
+            raise ValueError("max_fps must be a positive number")
+        return max_fps
+
+    def set_rate_limit(self, source_id, max_fps):
+        """Limit how many frames per second are pulled from one camera"""
+        max_fps = self.validate_max_fps(max_fps)
+        with self.lock:
+            self.max_fps[source_id] = max_fps
+
+    def motion_gate(self, source_id):
+        """Motion gate placed in front of the model for one camera"""
+        return get_motion_gate(f"person:{source_id}")
+
+    def clear_source(self, source_id):
+        with self.lock:
+            self.max_fps.pop(source_id, None)
+            self.next_due.pop(source_id, None)
+            self.last_alert.pop(source_id, None)
+        remove_motion_gate(f"person:{source_id}")
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start the detection loop in a daemon thread"""
+        with self.lifecycle_lock:
+            if self.is_running():
+                return False
+            self._load_model()
+            self.stop_event.clear()
+            self.started_at = time.time()
+            self.thread = threading.Thread(target=self._run, name="person-detector", daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self, timeout=5.0):
+        """Signal the detection loop to stop and wait for it"""
+        with self.lifecycle_lock:
+            self.stop_event.set()
+            if self.thread is not None:
+                self.thread.join(timeout)
+            self.thread = None
+
+    def _camera_stats(self, source_id):
+        if source_id not in self.camera_stats:
+            self.camera_stats[source_id] = {
+                "frames_read": 0,
+                "read_failures": 0,
+                "frames_skipped_static": 0,
+                "frames_inferred": 0,
+                "frames_with_people": 0,
+                "detections_stored": 0,
+                "detections_dropped": 0,
+                "last_detection": None
+            }
+        return self.camera_stats[source_id]
+
+    def _collect_due_frames(self):
+        """Read one frame from every camera whose rate limit allows it"""
+        now = time.time()
+        frames = []
+        for source_id in camera_manager.list_sources(owner=SOURCE_OWNER):
+            with self.lock:
+                if now < self.next_due.get(source_id, 0):
+                    continue
+                interval = 1.0 / self.max_fps.get(source_id, self.default_max_fps)
+                self.next_due[source_id] = now + interval
+                stats = self._camera_stats(source_id)
+
+            ret, frame = camera_manager.read_source_frame(source_id)
+            if not ret:
+                stats["read_failures"] += 1
+                continue
+            stats["frames_read"] += 1
+            if not self.motion_gate(source_id).should_process(frame):
+                stats["frames_skipped_static"] += 1
+                continue
+            frames.append((source_id, frame, now))
+        return frames
+
+    def _run(self):
+        print("Person detection worker started")
+        while not self.stop_event.is_set():
+            try:
+                frames = self._collect_due_frames()
+                if not frames:
+                    time.sleep(0.05)
+                    continue
+
+                for start in range(0, len(frames), self.batch_size):
+                    self._process_batch(frames[start:start + self.batch_size])
+            except Exception as e:
+                print(f"Error in person detection loop: {e}")
+                time.sleep(0.5)
+        print("Person detection worker stopped")
+
+    def _process_batch(self, batch):
+        started = time.time()
+        # Background surveillance work: yields to gate and dashboard requests
+        with inference_scheduler.slot("person_detect", priority="batch"):
+            results = self.model.predict(
+                source=[frame for _, frame, _ in batch],
+                imgsz=self.imgsz,
+                conf=self.conf,
+                classes=[PERSON_CLASS_ID],
+                device='cpu',
+                verbose=False
+            )
+        elapsed = time.time() - started
+
+        with self.lock:
+            self.batches += 1
+            self.inference_time += elapsed
+
+        for (source_id, frame, captured_at), result in zip(batch, results):
+            stats = self._camera_stats(source_id)
+            stats["frames_inferred"] += 1
+            if len(result.boxes) == 0:
+                continue
+            stats["frames_with_people"] += 1
+
+            if captured_at - self.last_alert.get(source_id, 0) < self.alert_cooldown:
+                continue
+            self.last_alert[source_id] = captured_at
+
+            for box in result.boxes:
+                x1, y1, x2, y2 = map(int, box.xyxy[0])
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            if not ret:
+                continue
+            try:
+                image_id, _ = self.store_callback(buffer.tobytes(), source_id)
+                if image_id is None:
+                    stats["detections_dropped"] += 1
+                    continue
+                stats["detections_stored"] += 1
+                stats["last_detection"] = captured_at
+            except Exception as e:
+                print(f"Error storing detection from {source_id}: {e}")
+
+    def get_stats(self):
+        """Throughput and per-camera statistics"""
+        with self.lock:
+            running_for = time.time() - self.started_at if self.started_at and self.is_running() else 0
+            frames_inferred = sum(s["frames_inferred"] for s in self.camera_stats.values())
+            return {
+                "running": self.is_running(),
+                "model": self.model_path,
+                "batch_size": self.batch_size,
+                "batches": self.batches,
+                "frames_inferred": frames_inferred,
+                "avg_batch_latency_ms": round(1000 * self.inference_time / self.batches, 2) if self.batches else 0,
+                "inference_fps": round(frames_inferred / self.inference_time, 2) if self.inference_time else 0,
+                "overall_fps": round(frames_inferred / running_for, 2) if running_for else 0,
+                "cameras": {
+                    source_id: dict(
+                        stats,
+                        max_fps=self.max_fps.get(source_id, self.default_max_fps),
+                        motion_skip_ratio=round(stats["frames_skipped_static"] / stats["frames_read"], 4)
+                        if stats["frames_read"] else 0.0
+                    )
+                    for source_id, stats in self.camera_stats.items()
+                }
+            }
@@ -0,0 +1,111 @@
+import os
+import queue
+import secrets
+import stat
+from multiprocessing.connection import Client
+
+INFERENCE_SERVER_SOCKET = os.environ.get('INFERENCE_SERVER_SOCKET')
+
+
+class InferenceServerError(Exception):
+    pass
+
+
+def authkey_path(socket_path):
+    return os.environ.get('INFERENCE_SERVER_AUTHKEY_FILE') or f"{socket_path}.key"
+
+
+def load_authkey(socket_path, create=False):
+    """
+    Shared secret for the socket. The connection unpickles messages, so the key must not
+    be guessable: INFERENCE_SERVER_AUTHKEY if set, otherwise a random key the server
+    writes to a 0600 file next to the socket (INFERENCE_SERVER_AUTHKEY_FILE) on first start.
+    """
+    key = os.environ.get('INFERENCE_SERVER_AUTHKEY')
+    if key:
+        return key.encode()
+
+    path = authkey_path(socket_path)
+    if create:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w") as handle:
+                handle.write(secrets.token_hex(32))
+
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError as e:
+        raise InferenceServerError(
+            f"No inference server key: set INFERENCE_SERVER_AUTHKEY or start the server first ({e})"
+        )
+    with os.fdopen(fd) as handle:
+        info = os.fstat(handle.fileno())
+        # A key file someone else could have planted or read is as good as no key
+        if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+            raise InferenceServerError(f"{path} must be owned by this user with mode 0600")
+        key = handle.read().strip()
+    if not key:
+        raise InferenceServerError(f"{path} is empty")
+    return key.encode()
+
+
+class InferenceClient:
+    """
+    Thin client for the shared inference server.
+    Keeps a small pool of Unix-socket connections so concurrent request
+    threads in one worker do not serialize on a single connection.
+    """
+
+    def __init__(self, address, authkey=None, pool_size=4):
+        self.address = address
+        # Read on first connect, so workers may start before the server has written the key
+        self.authkey = authkey
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _acquire(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            if self.authkey is None:
+                self.authkey = load_authkey(self.address)
+            return Client(self.address, family='AF_UNIX', authkey=self.authkey)
+
+    def _release(self, connection):
+        try:
+            self.pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _request(self, message):
+        try:
+            connection = self._acquire()
+        except OSError as e:
+            raise InferenceServerError(f"Inference server unavailable: {e}")
+        try:
+            connection.send(message)
+            status, payload = connection.recv()
+        except (EOFError, OSError) as e:
+            connection.close()
+            raise InferenceServerError(f"Inference server unavailable: {e}")
+        self._release(connection)
+        if status != "ok":
+            raise InferenceServerError(payload)
+        return payload
+
+    def call(self, model, inputs, **params):
+        """Run a model on a list of inputs, returning one output per input"""
+        return self._request({"model": model, "inputs": list(inputs), "params": params})
+
+    def stats(self):
+        return self._request({"command": "stats"})
+
+    def info(self):
+        """Which model variants the server resolved at startup (e.g. the plate detector export)"""
+        return self._request({"command": "info"})
+
+
+# Set INFERENCE_SERVER_SOCKET to make this worker a thin client of the inference server
+inference_client = InferenceClient(INFERENCE_SERVER_SOCKET) if INFERENCE_SERVER_SOCKET else None
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+
+os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+
+from modules.common.scheduler import thread_budget
+
+PLATE_DETECTOR_PATH = os.environ.get(
+    'PLATE_DETECTOR_PATH', 'modules/vehicle_identification/license_plate_detector.pt'
+)
+# auto (fastest available), pt, onnx or openvino
+PLATE_DETECTOR_BACKEND = os.environ.get('PLATE_DETECTOR_BACKEND', 'auto')
+# Detector input size; gate cameras see close-range plates and can use a smaller one
+PLATE_DETECTOR_IMGSZ = int(os.environ.get('PLATE_DETECTOR_IMGSZ', 640))
+PLATE_GATE_IMGSZ = int(os.environ.get('PLATE_GATE_IMGSZ', PLATE_DETECTOR_IMGSZ))
+
+# Backend chosen at load time, reported by /vehicle_plate/detector/stats
+plate_detector_info = {}
+
+# --------------------------
+# License plate detector (YOLO)
+# --------------------------
+def plate_detector_candidates(path=PLATE_DETECTOR_PATH):
+    """
+    Existing detector exports next to the .pt weights, as written by
+    scripts/export_plate_detector.py: <stem>.onnx and <stem>_openvino_model/
+    """
+    stem = os.path.splitext(path)[0]
+    candidates = {
+        "openvino": f"{stem}_openvino_model",
+        "onnx": f"{stem}.onnx",
+        "pt": path,
+    }
+    return {backend: candidate for backend, candidate in candidates.items() if os.path.exists(candidate)}
+
+def time_plate_detector(model, imgsz, runs=3):
+    """Mean seconds per single-frame predict on a synthetic frame, after one warm-up call"""
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    model.predict(source=[frame], imgsz=imgsz, conf=0.5, verbose=False)
+    started = time.perf_counter()
+    for _ in range(runs):
+        model.predict(source=[frame], imgsz=imgsz, conf=0.5, verbose=False)
+    return (time.perf_counter() - started) / runs
+
+def load_plate_detector(backend=PLATE_DETECTOR_BACKEND, imgsz=PLATE_DETECTOR_IMGSZ):
+    """
+    Load the plate detector from the requested export. With "auto", every available
+    export is loaded and timed once and the fastest is kept.
+    """
+    from ultralytics import YOLO
+
+    candidates = plate_detector_candidates()
+    if backend != "auto":
+        path = candidates.get(backend, PLATE_DETECTOR_PATH)
+        plate_detector_info.update(backend=backend if backend in candidates else "pt", path=path, imgsz=imgsz)
+        return YOLO(path, task="detect")
+
+    best = None
+    timings = {}
+    for name, path in candidates.items():
+        try:
+            model = YOLO(path, task="detect")
+            timings[name] = time_plate_detector(model, imgsz)
+        except Exception as e:
+            print(f"Plate detector backend {name} unavailable: {e}")
+            continue
+        if best is None or timings[name] < timings[best[0]]:
+            best = (name, path, model)
+    if best is None:
+        plate_detector_info.update(backend="pt", path=PLATE_DETECTOR_PATH, imgsz=imgsz)
+        return YOLO(PLATE_DETECTOR_PATH, task="detect")
+
+    name, path, model = best
+    plate_detector_info.update(
+        backend=name, path=path, imgsz=imgsz,
+        startup_ms={backend: round(1000 * seconds, 1) for backend, seconds in timings.items()}
+    )
+    print(f"Plate detector: using {name} ({path}), startup timings {plate_detector_info['startup_ms']} ms")
+    return model
+
+def detect_plates(model, images, imgsz=640, conf=0.5):
+    """Run YOLO on a list of BGR images, returning an (N, 5) array [x1, y1, x2, y2, conf] per image"""
+    results = model.predict(source=list(images), imgsz=imgsz, conf=conf, verbose=False)
+    detections = []
+    for result in results:
+        if len(result.boxes) == 0:
+            detections.append(np.zeros((0, 5), dtype=np.float32))
+            continue
+        xyxy = result.boxes.xyxy.cpu().numpy()
+        scores = result.boxes.conf.cpu().numpy().reshape(-1, 1)
+        detections.append(np.hstack([xyxy, scores]).astype(np.float32))
+    return detections
+
+# --------------------------
+# Plate OCR (PaddleOCR)
+# --------------------------
+# read_text and recognize_text share one PaddleOCR predictor (plate_ocr and plate_rec each get
+# their own batcher thread in the inference server), and the predictor is not thread-safe
+plate_ocr_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def load_plate_ocr():
+    from paddleocr import PaddleOCR
+    return PaddleOCR(use_angle_cls=True, lang='en', cpu_threads=thread_budget.shares["paddle"])
+
+def read_text(ocr, images):
+    """Full PaddleOCR (detection + recognition) per image, returning [(text, score), ...] per image"""
+    outputs = []
+    for image in images:
+        with plate_ocr_lock:
+            result = ocr.ocr(image, cls=True)
+        outputs.append([
+            (line[1][0], float(line[1][1]))
+            for block in result if block
+            for line in block
+        ])
+    return outputs
+
+def recognize_text(ocr, images):
+    """
+    Recognition-only PaddleOCR over pre-localized BGR text crops in one batch
+    (no text detection, no angle classifier). Returns (text, score) per image.
+    """
+    if not images:
+        return []
+    with plate_ocr_lock:
+        results = ocr.ocr(list(images), det=False, cls=False)[0]
+    return [(text, float(score)) for text, score in results]
+
+# --------------------------
+# Face embeddings (ArcFace via DeepFace or ONNX Runtime, see FACE_EMBEDDING_BACKEND)
+# --------------------------
+def load_face_embedder():
+    from modules.face_Recognition.embedding_backends import create_embedding_backend
+    backend = create_embedding_backend()
+    print(f"Face embedding backend: {backend.name}")
+    return backend
+
+def embed_faces(backend, images, enforce_detection=True, detected=False):
+    """
+    Normalized ArcFace embedding per image, or None where no face could be detected.
+    With detected=True the images are already cropped and aligned faces and skip detection.
+    """
+    if detected:
+        return backend.embed_crops(images)
+    return backend.embed_batch(images, enforce_detection=enforce_detection)
+
+# name -> (loader, batch function)
+MODEL_REGISTRY = {
+    "plate_detect": (load_plate_detector, detect_plates),
+    "plate_ocr": (load_plate_ocr, read_text),
+    "plate_rec": (load_plate_ocr, recognize_text),
+    "face_embed": (load_face_embedder, embed_faces),
+}
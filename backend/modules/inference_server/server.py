@@ -0,0 +1,194 @@
+"""
+Local inference server that owns the YOLO, PaddleOCR and ArcFace models.
+
+Run from the backend directory:
+    python -m modules.inference_server.server
+
+Flask workers started with INFERENCE_SERVER_SOCKET pointing at the same socket
+become thin clients (see client.py); the models are loaded once, here, and
+concurrent requests from all workers are batched together per model.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Listener
+
+os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+
+from modules.common.scheduler import thread_budget
+thread_budget.export_env()
+
+from modules.inference_server.client import load_authkey
+from modules.inference_server.models import MODEL_REGISTRY, plate_detector_info
+
+SOCKET_PATH = os.environ.get('INFERENCE_SERVER_SOCKET', '/tmp/surveillance_inference.sock')
+MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH', 8))
+MAX_BATCH_WAIT = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 10)) / 1000
+
+
+class ModelBatcher:
+    """Collects single-item requests for one model and runs them as batches"""
+
+    def __init__(self, name, loader, batch_fn, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_BATCH_WAIT):
+        self.name = name
+        self.loader = loader
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.model = None
+        self.queue = queue.Queue()
+        # Entries that did not fit an earlier batch, oldest first; only the batcher thread touches it
+        self.carry_over = deque()
+        self.batches = 0
+        self.items = 0
+        self.run_time = 0.0
+        self.thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+
+    def start(self):
+        print(f"Loading model '{self.name}'...")
+        started = time.time()
+        self.model = self.loader()
+        print(f"Model '{self.name}' loaded in {time.time() - started:.1f}s")
+        self.thread.start()
+
+    def submit(self, item, params):
+        future = Future()
+        self.queue.put((item, params, future))
+        return future
+
+    def _collect(self):
+        """
+        Next batch of entries sharing one parameter set. Entries left out are carried over
+        and considered before anything newer, so they are never queued behind later work.
+        """
+        first = self.carry_over.popleft() if self.carry_over else self.queue.get()
+        batch = [first]
+        params = first[1]
+        deferred = deque()
+        while self.carry_over:
+            entry = self.carry_over.popleft()
+            # Only items with identical parameters can share a forward pass
+            if entry[1] == params and len(batch) < self.max_batch_size:
+                batch.append(entry)
+            else:
+                deferred.append(entry)
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                entry = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry[1] == params:
+                batch.append(entry)
+            else:
+                deferred.append(entry)
+        self.carry_over = deferred
+        return batch, params
+
+    def _run(self):
+        while True:
+            batch, params = self._collect()
+            started = time.time()
+            try:
+                outputs = list(self.batch_fn(self.model, [item for item, _, _ in batch], **params))
+                if len(outputs) != len(batch):
+                    raise RuntimeError(f"{self.name} returned {len(outputs)} outputs for {len(batch)} inputs")
+                for (_, _, future), output in zip(batch, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                # Every caller must get an answer, or its client blocks forever
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self.batches += 1
+            self.items += len(batch)
+            self.run_time += time.time() - started
+
+    def get_stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "avg_batch_ms": round(1000 * self.run_time / self.batches, 2) if self.batches else 0,
+            "queue_depth": self.queue.qsize() + len(self.carry_over),
+            "carried_over": len(self.carry_over)
+        }
+
+
+class InferenceServer:
+    """Unix-socket front end dispatching client requests to per-model batchers"""
+
+    def __init__(self, address=SOCKET_PATH, authkey=None, model_names=None):
+        self.address = address
+        self.authkey = authkey or load_authkey(address, create=True)
+        names = model_names or list(MODEL_REGISTRY.keys())
+        self.batchers = {
+            name: ModelBatcher(name, *MODEL_REGISTRY[name]) for name in names
+        }
+
+    def _handle(self, message):
+        command = message.get("command")
+        if command == "stats":
+            return {name: batcher.get_stats() for name, batcher in self.batchers.items()}
+        if command == "models":
+            return list(self.batchers.keys())
+        if command == "info":
+            return {"plate_detector": dict(plate_detector_info)}
+
+        batcher = self.batchers.get(message.get("model"))
+        if batcher is None:
+            raise ValueError(f"Model not served: {message.get('model')}")
+        params = message.get("params") or {}
+        futures = [batcher.submit(item, params) for item in message["inputs"]]
+        return [future.result() for future in futures]
+
+    def _serve_connection(self, connection):
+        try:
+            while True:
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    connection.send(("ok", self._handle(message)))
+                except Exception as e:
+                    connection.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            connection.close()
+
+    def serve_forever(self):
+        for batcher in self.batchers.values():
+            batcher.start()
+        thread_budget.apply()
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        # Bind under a restrictive umask so the socket is never reachable by other users,
+        # not even between bind() and a later chmod()
+        previous_umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(previous_umask)
+        print(f"Inference server listening on {self.address}")
+        try:
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:
+                    print(f"Rejected inference client: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+        finally:
+            listener.close()
+
+
+if __name__ == '__main__':
+    enabled = os.environ.get('INFERENCE_SERVER_MODELS')
+    InferenceServer(model_names=enabled.split(',') if enabled else None).serve_forever()
@@ -0,0 +1,37 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from modules.common.event_bus import event_bus
+from modules.common.jobs import JOB_EVENTS_CHANNEL, job_manager
+from modules.common.scheduler import inference_scheduler
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+@jobs_bp.route('/stats', methods=['GET'])
+def job_stats():
+    return jsonify({'success': True, 'stats': job_manager.get_stats()})
+
+
+# Per-model slot usage, per-priority-class wait/run time and the thread budget split
+@jobs_bp.route('/scheduler', methods=['GET'])
+def scheduler_stats():
+    return jsonify({'success': True, 'stats': inference_scheduler.get_stats()})
+
+
+# SSE stream of job state changes (job_queued, job_running, job_succeeded, job_failed)
+@jobs_bp.route('/events')
+def job_events():
+    last_id = event_bus.parse_last_id(request.headers.get('Last-Event-ID', request.args.get('last_id')))
+    return Response(
+        stream_with_context(event_bus.stream([JOB_EVENTS_CHANNEL], last_id=last_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found or expired'}), 404
+    return jsonify({'success': True, **job})
@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from modules.camera_manager.camera_manager import camera_manager
+from modules.camera_manager.motion_gate import get_motion_gate
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    if intersection == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return intersection / (area_a + area_b - intersection)
+
+
+def vote_plate(readings):
+    """
+    Character-level majority vote over (text, score) OCR readings of one plate.
+    The most supported length wins, then each position takes the score-weighted
+    most common character. Returns (plate_number, agreement in [0, 1]).
+    """
+    readings = [(text, score) for text, score in readings if text]
+    if not readings:
+        return "", 0.0
+
+    length_votes = Counter()
+    for text, score in readings:
+        length_votes[len(text)] += score
+    length = length_votes.most_common(1)[0][0]
+    candidates = [(text, score) for text, score in readings if len(text) == length]
+
+    plate = []
+    agreement = []
+    for position in range(length):
+        votes = defaultdict(float)
+        for text, score in candidates:
+            votes[text[position]] += score
+        character, weight = max(votes.items(), key=lambda item: item[1])
+        plate.append(character)
+        agreement.append(weight / sum(votes.values()))
+    return "".join(plate), round(min(agreement), 3)
+
+
+class PlateTrack:
+    def __init__(self, track_id, box, now):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.frames_since_read = 0
+        self.readings = []
+        self.decided = False
+
+
+class GateStreamWorker:
+    """
+    Live gate mode over a CameraManager named source.
+    Plates are tracked across frames with IoU matching; each track is OCR'd only a
+    few times, the readings are combined by a character-level vote and the final
+    plate is passed to decide_callback exactly once per vehicle.
+    """
+
+    def __init__(self, source_id, detect_fn, recognize_fn, decide_callback, max_fps=10.0,
+                 reads_per_track=3, read_interval=3, min_hits=2, iou_threshold=0.3,
+                 track_ttl=1.5, plate_cooldown=30.0):
+        if not 0 < max_fps < float("inf") or reads_per_track < 1:
+            raise ValueError("max_fps must be positive and reads_per_track at least 1")
+        self.source_id = source_id
+        self.detect_fn = detect_fn
+        self.recognize_fn = recognize_fn
+        self.decide_callback = decide_callback
+        self.max_fps = max_fps
+        self.reads_per_track = reads_per_track
+        self.read_interval = read_interval
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.track_ttl = track_ttl
+        self.plate_cooldown = plate_cooldown
+
+        self.tracks = []
+        self.next_track_id = 1
+        self.last_decision = {}
+        self.recent_decisions = deque(maxlen=50)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+        self.stats = {
+            "frames": 0,
+            "frames_skipped_static": 0,
+            "detections": 0,
+            "tracks": 0,
+            "ocr_calls": 0,
+            "vehicles_decided": 0
+        }
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return False
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name=f"gate-{self.source_id}", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self.thread = None
+
+    def _run(self):
+        print(f"Gate stream started on source {self.source_id}")
+        motion_gate = get_motion_gate(f"gate:{self.source_id}")
+        interval = 1.0 / self.max_fps
+        while not self.stop_event.is_set():
+            started = time.time()
+            try:
+                ret, frame = camera_manager.read_source_frame(self.source_id)
+                if not ret:
+                    time.sleep(0.5)
+                    continue
+                with self.lock:
+                    self.stats["frames"] += 1
+                if motion_gate.should_process(frame):
+                    self._process_frame(frame, started)
+                else:
+                    with self.lock:
+                        self.stats["frames_skipped_static"] += 1
+                    self._expire_tracks(started)
+            except Exception as e:
+                print(f"Error in gate stream {self.source_id}: {e}")
+                time.sleep(0.5)
+            time.sleep(max(0.0, interval - (time.time() - started)))
+        print(f"Gate stream stopped on source {self.source_id}")
+
+    def _match(self, boxes, now):
+        """Greedy IoU association of detections to live tracks"""
+        unmatched = list(range(len(boxes)))
+        matched = []
+        for track in sorted(self.tracks, key=lambda t: t.last_seen, reverse=True):
+            best, best_iou = None, self.iou_threshold
+            for index in unmatched:
+                iou = box_iou(track.box, boxes[index])
+                if iou >= best_iou:
+                    best, best_iou = index, iou
+            if best is None:
+                continue
+            unmatched.remove(best)
+            track.box = boxes[best]
+            track.last_seen = now
+            track.hits += 1
+            track.frames_since_read += 1
+            matched.append((track, best))
+
+        for index in unmatched:
+            track = PlateTrack(self.next_track_id, boxes[index], now)
+            self.next_track_id += 1
+            self.tracks.append(track)
+            self.stats["tracks"] += 1
+            matched.append((track, index))
+        return matched
+
+    def _needs_read(self, track):
+        return (not track.decided
+                and track.hits >= self.min_hits
+                and len(track.readings) < self.reads_per_track
+                and (not track.readings or track.frames_since_read >= self.read_interval))
+
+    def _process_frame(self, frame, now):
+        boxes = [tuple(float(v) for v in box[:5]) for box in self.detect_fn(frame)]
+        with self.lock:
+            self.stats["detections"] += len(boxes)
+            matched = self._match(boxes, now)
+
+        to_read = []
+        height, width = frame.shape[:2]
+        for track, index in matched:
+            if not self._needs_read(track):
+                continue
+            x1, y1, x2, y2 = (int(v) for v in boxes[index][:4])
+            crop = frame[max(y1, 0):min(y2, height), max(x1, 0):min(x2, width)]
+            if crop.size:
+                to_read.append((track, crop))
+
+        if to_read:
+            readings = self.recognize_fn([crop for _, crop in to_read])
+            with self.lock:
+                self.stats["ocr_calls"] += len(to_read)
+            for (track, _), reading in zip(to_read, readings):
+                track.readings.append(reading)
+                track.frames_since_read = 0
+                if len(track.readings) >= self.reads_per_track:
+                    self._decide(track, now)
+
+        self._expire_tracks(now)
+
+    def _expire_tracks(self, now):
+        alive = []
+        for track in self.tracks:
+            if now - track.last_seen <= self.track_ttl:
+                alive.append(track)
+            elif not track.decided and track.readings:
+                # Vehicle left before collecting all reads - decide on what we have
+                self._decide(track, now)
+        self.tracks = alive
+
+    def _decide(self, track, now):
+        track.decided = True
+        plate_number, agreement = vote_plate(track.readings)
+        if not plate_number:
+            return
+        self.last_decision = {
+            plate: decided_at for plate, decided_at in self.last_decision.items()
+            if now - decided_at < self.plate_cooldown
+        }
+        if plate_number in self.last_decision:
+            return
+        self.last_decision[plate_number] = now
+
+        try:
+            access_granted = self.decide_callback(plate_number, self.source_id)
+        except Exception as e:
+            print(f"Gate decision failed for {plate_number}: {e}")
+            return
+        with self.lock:
+            self.stats["vehicles_decided"] += 1
+            self.recent_decisions.append({
+                "track_id": track.track_id,
+                "plate_number": plate_number,
+                "agreement": agreement,
+                "ocr_reads": len(track.readings),
+                "readings": [text for text, _ in track.readings],
+                "access_granted": access_granted,
+                "timestamp": now
+            })
+
+    def get_status(self):
+        with self.lock:
+            decided = self.stats["vehicles_decided"]
+            return {
+                "source_id": self.source_id,
+                "running": self.is_running(),
+                "active_tracks": len(self.tracks),
+                "stats": dict(self.stats),
+                "ocr_calls_per_vehicle": round(self.stats["ocr_calls"] / decided, 2) if decided else 0,
+                "recent_decisions": list(self.recent_decisions)
+            }
@@ -0,0 +1,220 @@
+import threading
+import time
+
+# Character pairs PaddleOCR commonly confuses on plates; substituting within a pair is cheap
+OCR_CONFUSIONS = [
+    ('O', '0'), ('D', '0'), ('Q', '0'), ('I', '1'), ('L', '1'), ('B', '8'),
+    ('S', '5'), ('Z', '2'), ('G', '6'), ('T', '7'), ('A', '4'), ('U', 'V')
+]
+CONFUSION_COST = 0.5
+_CONFUSABLE = {frozenset(pair) for pair in OCR_CONFUSIONS}
+
+
+def substitution_cost(a, b):
+    if a == b:
+        return 0.0
+    if frozenset((a, b)) in _CONFUSABLE:
+        return CONFUSION_COST
+    return 1.0
+
+
+def plate_distance(a, b):
+    """Levenshtein distance where OCR-confusable substitutions cost CONFUSION_COST"""
+    if a == b:
+        return 0.0
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [float(i)]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1.0,
+                current[j - 1] + 1.0,
+                previous[j - 1] + substitution_cost(char_a, char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree over plate strings for radius queries under plate_distance"""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, plate):
+        if self.root is None:
+            self.root = (plate, {})
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = plate_distance(plate, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (plate, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, query, radius):
+        """All (distance, plate) pairs within radius of query"""
+        if self.root is None:
+            return []
+        matches = []
+        stack = [self.root]
+        while stack:
+            plate, children = stack.pop()
+            distance = plate_distance(query, plate)
+            if distance <= radius:
+                matches.append((distance, plate))
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return matches
+
+
+class PlateIndex:
+    """
+    In-process index of registered plates for gate decisions.
+    Exact reads are a dict lookup; near misses go through a BK-tree with
+    OCR-confusion-weighted edit distance. Ambiguous near misses (two plates at
+    the same best distance) are treated as no match. The default radius only
+    admits OCR-confusable substitutions, never an arbitrary edit.
+    After the first load a background thread reloads the index every
+    refresh_interval seconds; lookups always use the current tree.
+    """
+
+    def __init__(self, loader, max_distance=CONFUSION_COST, refresh_interval=60.0):
+        self.loader = loader
+        self.max_distance = max_distance
+        self.refresh_interval = refresh_interval
+        self.lock = threading.RLock()
+        # Only one thread reads the collection at a time
+        self.load_lock = threading.Lock()
+        self.vehicles = {}
+        self.tree = BKTree()
+        self.removed = set()
+        self.loaded_at = None
+        self.refresh_thread = None
+        self.stop_event = threading.Event()
+
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.ambiguous = 0
+        self.misses = 0
+        self.lookup_time = 0.0
+
+    def load(self):
+        """(Re)build the index from the loader, which returns an iterable of vehicle summaries"""
+        with self.load_lock:
+            self._load()
+        self._start_refresh()
+
+    def _load(self):
+        vehicles = {vehicle['plate_number']: vehicle for vehicle in self.loader()}
+        tree = BKTree()
+        for plate in vehicles:
+            tree.add(plate)
+        with self.lock:
+            self.vehicles = vehicles
+            self.tree = tree
+            self.removed = set()
+            self.loaded_at = time.time()
+        print(f"Loaded {len(vehicles)} registered plates into the plate index.")
+
+    def _ensure_loaded(self):
+        if self.loaded_at is None:
+            with self.load_lock:
+                if self.loaded_at is None:
+                    self._load()
+            self._start_refresh()
+
+    def _start_refresh(self):
+        with self.lock:
+            if self.refresh_thread is not None or self.stop_event.is_set():
+                return
+            self.refresh_thread = threading.Thread(target=self._refresh_loop, name="plate-index-refresh", daemon=True)
+            self.refresh_thread.start()
+
+    def _refresh_loop(self):
+        # Periodic reload keeps the index coherent with writes made by other workers
+        while not self.stop_event.wait(self.refresh_interval):
+            try:
+                with self.load_lock:
+                    self._load()
+            except Exception as e:
+                print(f"Plate index refresh failed, keeping the current index: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def add(self, vehicle):
+        with self.lock:
+            plate = vehicle['plate_number']
+            self.vehicles[plate] = vehicle
+            self.removed.discard(plate)
+            self.tree.add(plate)
+
+    def update(self, plate, fields):
+        with self.lock:
+            if plate in self.vehicles:
+                self.vehicles[plate] = dict(self.vehicles[plate], **fields)
+
+    def remove(self, plate):
+        with self.lock:
+            if self.vehicles.pop(plate, None) is None:
+                return
+            # BK-trees do not support deletion; tombstone and rebuild once they pile up
+            self.removed.add(plate)
+            if len(self.removed) > max(32, len(self.vehicles) // 4):
+                tree = BKTree()
+                for registered in self.vehicles:
+                    tree.add(registered)
+                self.tree = tree
+                self.removed = set()
+
+    def lookup(self, plate_number):
+        """Return (vehicle, matched_plate, distance), or (None, None, None) if no unambiguous match"""
+        self._ensure_loaded()
+        started = time.perf_counter()
+        with self.lock:
+            vehicle = self.vehicles.get(plate_number)
+            if vehicle is not None:
+                self.exact_hits += 1
+                self.lookup_time += time.perf_counter() - started
+                return vehicle, plate_number, 0.0
+
+            matches = [
+                (distance, plate) for distance, plate in self.tree.search(plate_number, self.max_distance)
+                if plate not in self.removed
+            ]
+            result = (None, None, None)
+            if matches:
+                best = min(distance for distance, _ in matches)
+                best_plates = [plate for distance, plate in matches if distance == best]
+                if len(best_plates) == 1:
+                    self.fuzzy_hits += 1
+                    result = (self.vehicles[best_plates[0]], best_plates[0], best)
+                else:
+                    self.ambiguous += 1
+            else:
+                self.misses += 1
+            self.lookup_time += time.perf_counter() - started
+            return result
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.exact_hits + self.fuzzy_hits + self.ambiguous + self.misses
+            return {
+                "plates": len(self.vehicles),
+                "max_distance": self.max_distance,
+                "exact_hits": self.exact_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "ambiguous": self.ambiguous,
+                "misses": self.misses,
+                "avg_lookup_us": round(1e6 * self.lookup_time / lookups, 2) if lookups else 0,
+                "loaded_at": self.loaded_at
+            }
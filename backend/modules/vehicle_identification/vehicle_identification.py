@@ -1,29 +1,95 @@
-from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from PIL import Image
 import numpy as np
 import cv2
 import re
-from ultralytics import YOLO
-from paddleocr import PaddleOCR
+import os
+import json
+import time
+import threading
+import secrets
+import tempfile
 from datetime import datetime, timedelta
 import base64
+from bson.binary import Binary
 from bson.objectid import ObjectId
 
-vehicle_plate_bp = Blueprint('vehicle_plate', __name__)
+from modules.inference_server.client import inference_client
+from modules.camera_manager.camera_manager import camera_manager
+from modules.vehicle_identification.gate_stream import GateStreamWorker
+from modules.vehicle_identification.plate_index import PlateIndex
+from modules.common.result_cache import content_key, result_cache_from_env
+from modules.common.session_store import MongoSessionStore
+from modules.common.log_rollups import LogRollups
+from modules.common.db import get_collection, get_log_collection
+from modules.common.export import EXPORT_FORMATS, export_response
+from modules.common.image_preprocessing import StageTimer, decode_image, canonical_plate
+from modules.common.jobs import run_or_enqueue
+from modules.common.scheduler import inference_scheduler, priority_class
+from modules.common.lazy import LazyResource
+from modules.inference_server.models import (
+    load_plate_detector, detect_plates, load_plate_ocr, read_text, recognize_text,
+    PLATE_DETECTOR_IMGSZ, PLATE_GATE_IMGSZ, plate_detector_info
+)
 
-# Load YOLOv8 model
-model = YOLO('modules/vehicle_identification/license_plate_detector.pt')
+vehicle_plate_bp = Blueprint('vehicle_plate', __name__)
 
-# Initialize PaddleOCR
-paddle_ocr = PaddleOCR(use_angle_cls=True, lang='en')
+# Models live in the shared inference server when INFERENCE_SERVER_SOCKET is set,
+# otherwise they are loaded in this process on first use (or warm_up)
+plate_detector = LazyResource("plate_detector", load_plate_detector)
+plate_ocr = LazyResource("plate_ocr", load_plate_ocr)
 
 # MongoDB setup
-MONGO_URI = "mongodb://localhost:27017"
-client = MongoClient(MONGO_URI)
-db = client["Smart_Surveillance"]
-registered_vehicles = db['vehicles']
-vehicle_logs = db['vehicle_logs']  # Collection for vehicle logs
+registered_vehicles = get_collection('vehicles')
+vehicle_logs = get_log_collection('vehicle_logs')  # Collection for vehicle logs
+# Per-day/per-hour aggregates of vehicle_logs for dashboard stats and trends
+vehicle_log_rollups = LogRollups(get_collection('vehicle_log_rollups'), vehicle_logs,
+                                 identity_field='plate_number', granted_field='access_granted',
+                                 lock_collection=get_collection('maintenance_locks'))
+
+# Registered vehicle fields kept in memory for gate decisions (images stay in MongoDB)
+PLATE_INDEX_FIELDS = {'plate_number': 1, 'owner': 1, 'vehicle_type': 1, 'color': 1, 'model': 1, 'registered_at': 1}
+
+def load_registered_plates():
+    return registered_vehicles.find({}, PLATE_INDEX_FIELDS)
+
+# Processed images wait here (as JPEG bytes) until register_vehicle references them by token.
+# Kept in MongoDB, not worker memory, so the follow-up request may land on any Gunicorn worker;
+# capped by count and bytes, oldest evicted first.
+processing_sessions = MongoSessionStore(
+    get_collection('processing_sessions'),
+    get_collection('session_store_counters'),
+    max_entries=int(os.environ.get('PROCESSING_SESSION_MAX_ENTRIES', 200)),
+    max_bytes=int(os.environ.get('PROCESSING_SESSION_MAX_BYTES', 64 * 1024 * 1024)),
+    ttl=float(os.environ.get('PROCESSING_SESSION_TTL_SECONDS', 600)),
+    name="processing_sessions"
+)
+PREVIEW_WIDTH = 320
+
+# Detection boxes + plate readings by image content, so resubmitted snapshots skip YOLO and OCR
+plate_result_cache = result_cache_from_env("plate_results")
+
+plate_index = PlateIndex(
+    load_registered_plates,
+    max_distance=float(os.environ.get('PLATE_MATCH_MAX_DISTANCE', 0.5)),
+    refresh_interval=float(os.environ.get('PLATE_INDEX_REFRESH_SECONDS', 60))
+)
+
+# Frames per YOLO forward pass for batch/video processing
+PLATE_BATCH_SIZE = int(os.environ.get('PLATE_BATCH_SIZE', 8))
+# Accepted detector input sizes for batch requests; YOLO strides need a multiple of 32
+MIN_IMGSZ, MAX_IMGSZ, IMGSZ_STRIDE = 128, 1920, 32
+VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
+
+# Uploads larger than this (longest side) are decoded at reduced resolution
+PLATE_DECODE_MAX_DIM = int(os.environ.get('PLATE_DECODE_MAX_DIM', 1920))
+
+# PaddleOCR recognizer input height (rec_image_shape 3, 48, 320)
+PLATE_REC_HEIGHT = 48
+# Crops taller than this height/width ratio are treated as two-row plates
+TWO_ROW_PLATE_RATIO = 0.45
+# Plates read below this recognition score are re-read with full OCR
+PLATE_REC_MIN_SCORE = float(os.environ.get('PLATE_REC_MIN_SCORE', 0.5))
 
 def clean_text(text):
     text = text.upper()
@@ -32,18 +98,93 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip().replace(" ", "")
 
-def crop_plate(image, results):
-    if len(results[0].boxes) == 0:
-        return None
-    box = results[0].boxes[0]
-    x1, y1, x2, y2 = map(int, box.xyxy[0])
-    return image[y1:y2, x1:x2]
+def detect_plate_boxes(images, imgsz=PLATE_DETECTOR_IMGSZ, conf=0.5):
+    """Plate boxes [x1, y1, x2, y2, conf] for each image"""
+    if inference_client is not None:
+        return inference_client.call("plate_detect", images, imgsz=imgsz, conf=conf)
+    with inference_scheduler.slot("plate_detect"):
+        return detect_plates(plate_detector.get(), images, imgsz=imgsz, conf=conf)
+
+def current_plate_detector_info():
+    """Backend/path/imgsz of the plate detector that actually serves requests, loading it if needed"""
+    if inference_client is not None:
+        return inference_client.info()["plate_detector"]
+    plate_detector.get()
+    return plate_detector_info
+
+def run_plate_ocr(image):
+    """[(text, score), ...] for one plate image"""
+    if inference_client is not None:
+        return inference_client.call("plate_ocr", [image])[0]
+    with inference_scheduler.slot("plate_ocr"):
+        return read_text(plate_ocr.get(), [image])[0]
+
+def run_plate_recognizer(images):
+    """Recognition-only OCR for a batch of plate row crops"""
+    if inference_client is not None:
+        return inference_client.call("plate_rec", images)
+    # Shares the PaddleOCR instance (and its slot) with run_plate_ocr
+    with inference_scheduler.slot("plate_ocr"):
+        return recognize_text(plate_ocr.get(), images)
+
+def crop_plates(image, boxes):
+    """Crop every detected plate box, clipped to the image bounds"""
+    height, width = image.shape[:2]
+    crops = []
+    for box in boxes:
+        x1, y1, x2, y2 = map(int, box[:4])
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, width), min(y2, height)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            continue
+        crops.append((box, image[y1:y2, x1:x2]))
+    return crops
+
+def normalize_plate_rows(crop):
+    """Split two-row plates and resize each row to the recognizer input height"""
+    height, width = crop.shape[:2]
+    if height / width > TWO_ROW_PLATE_RATIO:
+        rows = [crop[:height // 2], crop[height // 2:]]
+    else:
+        rows = [crop]
+    normalized = []
+    for row in rows:
+        row_height, row_width = row.shape[:2]
+        target_width = max(int(row_width * PLATE_REC_HEIGHT / row_height), 1)
+        normalized.append(cv2.resize(row, (target_width, PLATE_REC_HEIGHT), interpolation=cv2.INTER_CUBIC))
+    return normalized
+
+def recognize_plates(crops, timer=None):
+    """Read all plate crops with a single recognition-only OCR batch, returning (text, score) per crop"""
+    # Deskew each plate to a canonical height before any row split or thresholding
+    crops = [canonical_plate(crop, timer) for crop in crops]
+    rows = []
+    owners = []
+    for index, crop in enumerate(crops):
+        for row in normalize_plate_rows(crop):
+            rows.append(row)
+            owners.append(index)
+
+    texts = [[] for _ in crops]
+    scores = [[] for _ in crops]
+    for owner, (text, score) in zip(owners, run_plate_recognizer(rows)):
+        texts[owner].append(text)
+        scores[owner].append(score)
+
+    readings = []
+    for crop, crop_texts, crop_scores in zip(crops, texts, scores):
+        plate_number = clean_text(' '.join(crop_texts))
+        score = min(crop_scores) if crop_scores else 0.0
+        if not plate_number or score < PLATE_REC_MIN_SCORE:
+            # Unusual layout - fall back to full detection + recognition OCR
+            plate_number = extract_text_from_image(crop)
+        readings.append((plate_number, score))
+    return readings
 
 def extract_text_from_image(cropped_image):
     gray = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2GRAY)
     _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    paddle_result = paddle_ocr.ocr(thresh, cls=True)
-    paddle_texts = [line[1][0] for block in paddle_result for line in block]
+    paddle_texts = [text for text, _ in run_plate_ocr(thresh)]
     paddle_text = ' '.join(paddle_texts)
     cleaned_text = clean_text(paddle_text)
     return cleaned_text
@@ -52,32 +193,248 @@ def encode_image(image):
     _, buffer = cv2.imencode('.jpg', image)
     return base64.b64encode(buffer).decode('utf-8')
 
-@vehicle_plate_bp.route('/process_vehicle_image', methods=['POST'])
-def process_vehicle_image():
-    file = request.files.get('image')
-    if not file:
-        return jsonify({'success': False, 'message': 'No image provided'})
-    image = cv2.imdecode(np.frombuffer(file.read(), np.uint8), cv2.IMREAD_COLOR)
-    results = model.predict(source=image, imgsz=640, conf=0.5)
-    cropped = crop_plate(image, results)
-    if cropped is None:
-        return jsonify({
+def encode_preview(image):
+    """Small base64 JPEG for display only"""
+    height, width = image.shape[:2]
+    if width > PREVIEW_WIDTH:
+        image = cv2.resize(image, (PREVIEW_WIDTH, int(height * PREVIEW_WIDTH / width)), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return base64.b64encode(buffer).decode('utf-8')
+
+def create_processing_session(image, plate_crops):
+    """Keep full-resolution JPEGs server-side and return an opaque token for register_vehicle"""
+    _, full_buffer = cv2.imencode('.jpg', image)
+    plate_buffers = [cv2.imencode('.jpg', crop)[1].tobytes() for crop in plate_crops]
+    size = len(full_buffer) + sum(len(buffer) for buffer in plate_buffers)
+    token = secrets.token_urlsafe(16)
+    try:
+        stored = processing_sessions.put(token, {
+            'full_image': Binary(full_buffer.tobytes()),
+            'plate_images': [Binary(buffer) for buffer in plate_buffers]
+        }, size=size)
+    except Exception as e:
+        print(f"Could not store processing session: {e}")
+        return None
+    return token if stored else None
+
+def process_vehicle_upload(image_bytes):
+    """Detect and read every plate in one uploaded image; returns the response body"""
+    timer = StageTimer()
+    image = decode_image(image_bytes, max_dim=PLATE_DECODE_MAX_DIM, timer=timer)
+    if image is None:
+        return {'success': False, 'message': 'Failed to decode image'}
+    imgsz, conf = PLATE_DETECTOR_IMGSZ, 0.5
+    with timer.stage('cache_lookup'):
+        # Results differ between detector exports, so a backend switch must not serve old entries
+        detector_backend = current_plate_detector_info().get('backend')
+        cache_key = content_key(image, pipeline='plate', imgsz=imgsz, conf=conf, detector=detector_backend)
+        cached = plate_result_cache.get(cache_key)
+    if cached is not None:
+        # Only boxes that produced a crop were stored, so re-cropping yields the same plates
+        crops = crop_plates(image, np.array(cached['boxes'], dtype=np.float32).reshape(-1, 5))
+        readings = [tuple(reading) for reading in cached['readings']]
+    else:
+        with timer.stage('detect'):
+            boxes = detect_plate_boxes([image], imgsz=imgsz, conf=conf)[0]
+        crops = crop_plates(image, boxes)
+        readings = []
+        if crops:
+            with timer.stage('recognize'):
+                readings = recognize_plates([crop for _, crop in crops], timer)
+        # Only successful reads are cached; an image without a plate is processed again next time
+        if crops:
+            plate_result_cache.put(cache_key, {
+                'boxes': [[float(v) for v in box[:5]] for box, _ in crops],
+                'readings': [[plate_number, float(score)] for plate_number, score in readings]
+            })
+    token = create_processing_session(image, [crop for _, crop in crops])
+    if not crops:
+        return {
             'success': False, 
             'message': 'License plate not detected',
-            'full_image': encode_image(image),
+            'token': token,
+            'full_image': encode_preview(image),
             'plate_image': None,
             'plate_number': '',
-            'manual_override_available': True
+            'plates': [],
+            'manual_override_available': True,
+            'timings': timer.timings,
+            'cached': cached is not None
+        }
+    plates = []
+    for (box, crop), (plate_number, score) in zip(crops, readings):
+        plates.append({
+            'plate_number': plate_number,
+            'confidence': round(score, 4),
+            'detection_confidence': round(float(box[4]), 4),
+            'box': [int(v) for v in box[:4]],
+            'plate_image': encode_image(crop)
         })
-    plate_number = extract_text_from_image(cropped)
-    return jsonify({
+    # YOLO returns boxes by descending confidence, the first plate is the primary one
+    return {
         'success': True,
-        'message': 'License plate detected',
-        'plate_number': plate_number,
-        'full_image': encode_image(image),
-        'plate_image': encode_image(cropped),
-        'manual_override_available': False
-    })
+        'message': 'License plate detected' if len(plates) == 1 else f'{len(plates)} license plates detected',
+        'plate_number': plates[0]['plate_number'],
+        'token': token,
+        'full_image': encode_preview(image),
+        'plate_image': plates[0]['plate_image'],
+        'plates': plates,
+        'manual_override_available': False,
+        'timings': timer.timings,
+        'cached': cached is not None
+    }
+
+@vehicle_plate_bp.route('/process_vehicle_image', methods=['POST'])
+def process_vehicle_image():
+    """Single-image plate read (?async=1 returns a job id)"""
+    file = request.files.get('image')
+    if not file:
+        return jsonify({'success': False, 'message': 'No image provided'})
+    return run_or_enqueue(request, 'process_vehicle_image', process_vehicle_upload, file.read())
+
+def is_video_upload(file):
+    extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in (file.filename or '') else ''
+    return extension in VIDEO_EXTENSIONS or (file.mimetype or '').startswith('video/')
+
+def iter_uploaded_frames(files, frame_stride=1):
+    """Lazily decode uploaded images and video files, yielding (source, frame_index, image)"""
+    for file in files:
+        source = file.filename or 'upload'
+        if not is_video_upload(file):
+            image = decode_image(file.read(), max_dim=PLATE_DECODE_MAX_DIM)
+            yield source, 0, image
+            continue
+
+        # OpenCV can only open videos from a path, so spool the upload to disk
+        suffix = '.' + source.rsplit('.', 1)[-1] if '.' in source else '.mp4'
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            file.save(tmp)
+            video_path = tmp.name
+        capture = cv2.VideoCapture(video_path)
+        try:
+            frame_index = 0
+            while True:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                if frame_index % frame_stride == 0:
+                    yield source, frame_index, frame
+                frame_index += 1
+        finally:
+            capture.release()
+            os.unlink(video_path)
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def generate_batch_results(files, frame_stride, run_ocr, imgsz, conf):
+    """NDJSON generator: one line per frame, then a summary line with throughput"""
+    started = time.time()
+    detect_time = 0.0
+    frames = 0
+    frames_with_plates = 0
+    frames_failed = 0
+
+    batches = iter_batches(iter_uploaded_frames(files, frame_stride), PLATE_BATCH_SIZE)
+    while True:
+        try:
+            batch = next(batches, None)
+        except Exception as e:
+            # The upload itself could not be read further: report it and end with the summary
+            print(f"Error reading batch upload: {e}")
+            yield json.dumps({'error': f'Failed to read upload: {e}'}) + '\n'
+            break
+        if batch is None:
+            break
+
+        valid = []
+        for source, frame_index, image in batch:
+            if image is None:
+                yield json.dumps({'source': source, 'frame': frame_index, 'error': 'Failed to decode image'}) + '\n'
+            else:
+                valid.append((source, frame_index, image))
+        if not valid:
+            continue
+
+        try:
+            detect_started = time.time()
+            with priority_class("batch"):
+                all_boxes = detect_plate_boxes([image for _, _, image in valid], imgsz=imgsz, conf=conf)
+            detect_time += time.time() - detect_started
+
+            frame_crops = [crop_plates(image, boxes) for (_, _, image), boxes in zip(valid, all_boxes)]
+            if run_ocr:
+                # One recognition batch for every plate in every frame of this batch
+                with priority_class("batch"):
+                    readings = iter(recognize_plates([crop for crops in frame_crops for _, crop in crops]))
+        except Exception as e:
+            # One error line per frame of the failed batch, then carry on with the next batch
+            print(f"Error processing plate batch: {e}")
+            frames_failed += len(valid)
+            for source, frame_index, _ in valid:
+                yield json.dumps({'source': source, 'frame': frame_index, 'error': f'Processing failed: {e}'}) + '\n'
+            continue
+
+        for (source, frame_index, _), crops in zip(valid, frame_crops):
+            frames += 1
+            plates = []
+            for box, _ in crops:
+                plate = {
+                    'box': [int(v) for v in box[:4]],
+                    'detection_confidence': round(float(box[4]), 4)
+                }
+                if run_ocr:
+                    plate['plate_number'], score = next(readings)
+                    plate['confidence'] = round(score, 4)
+                plates.append(plate)
+            if plates:
+                frames_with_plates += 1
+            yield json.dumps({'source': source, 'frame': frame_index, 'plates': plates}) + '\n'
+
+    elapsed = time.time() - started
+    yield json.dumps({
+        'summary': True,
+        'frames': frames,
+        'frames_with_plates': frames_with_plates,
+        'frames_failed': frames_failed,
+        'elapsed_seconds': round(elapsed, 3),
+        'fps': round(frames / elapsed, 2) if elapsed else 0,
+        'detector_fps': round(frames / detect_time, 2) if detect_time else 0,
+        'batch_size': PLATE_BATCH_SIZE
+    }) + '\n'
+
+# Multi-image or video upload: form field "images" (repeatable) or "video",
+# optional "frame_stride", "ocr" (true/false), "imgsz", "conf". Streams NDJSON.
+@vehicle_plate_bp.route('/process_vehicle_batch', methods=['POST'])
+def process_vehicle_batch():
+    files = request.files.getlist('images') + request.files.getlist('video')
+    files = [file for file in files if file and file.filename]
+    if not files:
+        return jsonify({'success': False, 'message': 'No images or video provided'}), 400
+    try:
+        frame_stride = max(int(request.form.get('frame_stride', 1)), 1)
+        imgsz = int(request.form.get('imgsz', PLATE_DETECTOR_IMGSZ))
+        conf = float(request.form.get('conf', 0.5))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid frame_stride, imgsz or conf'}), 400
+    if not MIN_IMGSZ <= imgsz <= MAX_IMGSZ or imgsz % IMGSZ_STRIDE:
+        return jsonify({'success': False,
+                        'message': f'imgsz must be a multiple of {IMGSZ_STRIDE} between {MIN_IMGSZ} and {MAX_IMGSZ}'}), 400
+    if not 0.0 <= conf <= 1.0:
+        return jsonify({'success': False, 'message': 'conf must be between 0 and 1'}), 400
+    run_ocr = request.form.get('ocr', 'true').lower() != 'false'
+
+    return Response(
+        stream_with_context(generate_batch_results(files, frame_stride, run_ocr, imgsz, conf)),
+        mimetype='application/x-ndjson'
+    )
 
 @vehicle_plate_bp.route('/register_vehicle', methods=['POST'])
 def register_vehicle():
@@ -94,7 +451,20 @@ def register_vehicle():
     existing = registered_vehicles.find_one({'plate_number': plate_number.upper()})
     if existing:
         return jsonify({'success': False, 'message': 'Vehicle already registered'})
-    registered_vehicles.insert_one({
+    token = data.get('token')
+    if token:
+        # Images from /process_vehicle_image are referenced by token instead of re-uploaded
+        session = processing_sessions.get(token)
+        if session is None:
+            return jsonify({'success': False, 'message': 'Processing session expired, please capture the vehicle again'})
+        full_image = base64.b64encode(session['full_image']).decode('utf-8')
+        try:
+            selected = int(data.get('plate_index', 0) or 0)
+        except (TypeError, ValueError):
+            selected = 0
+        plate_images = session['plate_images']
+        plate_image = base64.b64encode(plate_images[selected]).decode('utf-8') if 0 <= selected < len(plate_images) else ''
+    vehicle = {
         'plate_number': plate_number.upper(),
         'owner': owner,
         'vehicle_type': vehicle_type,
@@ -103,37 +473,64 @@ def register_vehicle():
         'full_image': full_image,
         'plate_image': plate_image,
         'registered_at': datetime.utcnow()
-    })
+    }
+    registered_vehicles.insert_one(vehicle)
+    if token:
+        # Only consumed once the vehicle is stored, so a failed insert can be retried with the same token
+        processing_sessions.delete(token)
+    plate_index.add({key: vehicle[key] for key in list(PLATE_INDEX_FIELDS) + ['_id']})
     return jsonify({
         'success': True,
         'message': 'Vehicle registered successfully',
         'plate_number': plate_number.upper()
     })
 
-@vehicle_plate_bp.route('/authenticate_vehicle', methods=['POST'])
-def authenticate_vehicle():
-    data = request.json
-    plate_number = data.get('plate_number')
-    if not plate_number:
-        return jsonify({'success': False, 'message': 'No plate number provided'})
-    vehicle = registered_vehicles.find_one({'plate_number': plate_number.upper()})
+def authenticate_plate(plate_number, source=None):
+    """
+    Decide access for a read plate against the in-memory plate index, write the access
+    log entry and return (vehicle summary or None, needs_confirmation). Only an exact
+    match grants access; an OCR-tolerant match returns the vehicle with
+    needs_confirmation=True for an operator to confirm.
+    """
+    plate_number = plate_number.upper()
+    vehicle, matched_plate, distance = plate_index.lookup(plate_number)
+    needs_confirmation = vehicle is not None and matched_plate != plate_number
     log_data = {
-        'plate_number': plate_number.upper(),
+        'plate_number': plate_number,
         'timestamp': datetime.utcnow(),
-        'access_granted': vehicle is not None
+        'access_granted': vehicle is not None and not needs_confirmation
     }
+    if source:
+        log_data['source'] = source
+    if needs_confirmation:
+        log_data.update({'matched_plate': matched_plate, 'match_distance': distance, 'needs_confirmation': True})
     if vehicle:
         log_data.update({
             'owner': vehicle.get('owner', 'Unknown'),
             'vehicle_type': vehicle.get('vehicle_type', 'Unknown'),
             'model': vehicle.get('model', '')
         })
-    vehicle_logs.insert_one(log_data)
+    vehicle_log_rollups.insert(log_data)
+    return vehicle, needs_confirmation
+
+@vehicle_plate_bp.route('/authenticate_vehicle', methods=['POST'])
+def authenticate_vehicle():
+    data = request.json
+    plate_number = data.get('plate_number')
+    if not plate_number:
+        return jsonify({'success': False, 'message': 'No plate number provided'})
+    vehicle, needs_confirmation = authenticate_plate(plate_number)
     if vehicle:
+        # Images are only needed for the operator UI, not for the decision itself
+        images = registered_vehicles.find_one({'_id': vehicle['_id']}, {'full_image': 1, 'plate_image': 1}) or {}
+        vehicle = dict(vehicle, **images)
         vehicle['_id'] = str(vehicle['_id'])
         return jsonify({
-            'success': True, 
-            'message': 'Access Granted', 
+            # A near match is shown to the operator but does not open the gate by itself
+            'success': not needs_confirmation,
+            'message': 'Needs operator confirmation' if needs_confirmation else 'Access Granted',
+            'needs_confirmation': needs_confirmation,
+            'plate_number': plate_number.upper(),
             'vehicle': {
                 'plate_number': vehicle['plate_number'],
                 'owner': vehicle['owner'],
@@ -152,6 +549,107 @@ def authenticate_vehicle():
             'plate_number': plate_number.upper()
         })
 
+# --------------------------
+# Live gate stream mode
+# --------------------------
+gate_streams = {}
+gate_streams_lock = threading.Lock()
+# CameraManager owner tag: gate cameras are read only by their gate stream, not the person detector
+GATE_SOURCE_OWNER = "vehicle_gate"
+
+# Gate model calls run in the highest priority class
+def gate_detect(frame):
+    with priority_class("gate"):
+        return detect_plate_boxes([frame], imgsz=PLATE_GATE_IMGSZ, conf=0.5)[0]
+
+def gate_recognize(crops):
+    with priority_class("gate"):
+        return recognize_plates(crops)
+
+def gate_decide(plate_number, source_id):
+    vehicle, needs_confirmation = authenticate_plate(plate_number, source=source_id)
+    if needs_confirmation:
+        print(f"Gate {source_id}: {plate_number} ~ {vehicle['plate_number']} -> needs operator confirmation")
+        return False
+    print(f"Gate {source_id}: {plate_number} -> {'granted' if vehicle else 'denied'}")
+    return vehicle is not None
+
+# Body: {"source_id": "main_gate", "uri": "rtsp://..." (optional if already registered),
+#        "max_fps": 10, "reads_per_track": 3}
+@vehicle_plate_bp.route('/gate/start', methods=['POST'])
+def start_gate_stream():
+    data = request.get_json(silent=True) or {}
+    source_id = data.get('source_id')
+    if not source_id:
+        return jsonify({'success': False, 'message': 'Missing source_id'}), 400
+    # Validate before anything is registered; a bad value would otherwise only fail inside the worker thread
+    try:
+        max_fps = float(data.get('max_fps', 10))
+        reads_per_track = int(data.get('reads_per_track', 3))
+        if not 0 < max_fps < float('inf') or reads_per_track < 1:
+            raise ValueError()
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'max_fps must be positive and reads_per_track at least 1'}), 400
+
+    uri = data.get('uri')
+    with gate_streams_lock:
+        worker = gate_streams.get(source_id)
+        if worker is not None and worker.is_running():
+            return jsonify({'success': True, 'message': 'Gate stream already running'})
+        if uri not in (None, ''):
+            try:
+                camera_manager.add_source(source_id, int(uri) if isinstance(uri, str) and uri.isdigit() else uri,
+                                          owner=GATE_SOURCE_OWNER)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 409
+        elif source_id not in camera_manager.list_sources(owner=GATE_SOURCE_OWNER):
+            return jsonify({'success': False, 'message': 'Unknown source, provide uri'}), 400
+
+        worker = GateStreamWorker(
+            source_id, gate_detect, gate_recognize, gate_decide,
+            max_fps=max_fps, reads_per_track=reads_per_track
+        )
+        gate_streams[source_id] = worker
+        worker.start()
+    return jsonify({'success': True, 'message': 'Gate stream started'})
+
+@vehicle_plate_bp.route('/gate/stop', methods=['POST'])
+def stop_gate_stream():
+    data = request.get_json(silent=True) or {}
+    with gate_streams_lock:
+        worker = gate_streams.pop(data.get('source_id'), None)
+    if worker is None:
+        return jsonify({'success': False, 'message': 'Gate stream not found'}), 404
+    worker.stop()
+    camera_manager.remove_source(worker.source_id, owner=GATE_SOURCE_OWNER)
+    return jsonify({'success': True, 'message': 'Gate stream stopped'})
+
+@vehicle_plate_bp.route('/gate/status', methods=['GET'])
+def gate_stream_status():
+    with gate_streams_lock:
+        workers = list(gate_streams.items())
+    return jsonify({source_id: worker.get_status() for source_id, worker in workers})
+
+def stop_gate_streams():
+    with gate_streams_lock:
+        workers = list(gate_streams.values())
+        gate_streams.clear()
+    for worker in workers:
+        worker.stop()
+        camera_manager.remove_source(worker.source_id, owner=GATE_SOURCE_OWNER)
+
+def warm_up():
+    """Backfill log rollups if needed, load the plate index and, without an inference server, the detector and OCR models"""
+    vehicle_log_rollups.ensure_backfilled()
+    plate_index.load()
+    if inference_client is None:
+        plate_detector.get()
+        plate_ocr.get()
+
+def shutdown():
+    stop_gate_streams()
+    plate_index.stop()
+
 @vehicle_plate_bp.route("/records", methods=["GET"])
 def get_vehicle_records():
     try:
@@ -171,30 +669,54 @@ def get_vehicle_stats():
         registered_count = registered_vehicles.count_documents({
             "owner": {"$exists": True, "$ne": None}
         })
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        detected_today = vehicle_logs.count_documents({
-            "timestamp": {"$gte": today}
-        })
-        access_granted_today = vehicle_logs.count_documents({
-            "timestamp": {"$gte": today},
-            "access_granted": True
-        })
+        # Vehicle logs are timestamped in UTC, so "today" is the current UTC day
+        today = vehicle_log_rollups.summary(datetime.utcnow())
         stats = {
             "totalVehicles": total_vehicles,
             "registeredVehicles": registered_count,
-            "detectedToday": detected_today,
-            "accessGrantedToday": access_granted_today
+            "detectedToday": today["count"],
+            "accessGrantedToday": today["granted"],
+            "accessDeniedToday": today["denied"],
+            "uniqueVehiclesToday": today["unique_identities"]
         }
         return jsonify(stats), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@vehicle_plate_bp.route("/stats/trend", methods=["GET"])
+def get_vehicle_trend():
+    """Daily or hourly detection/access counts, e.g. ?days=30&granularity=day"""
+    try:
+        days = min(max(int(request.args.get('days', 7)), 1), 366)
+    except ValueError:
+        return jsonify({"error": "Invalid days"}), 400
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('day', 'hour'):
+        return jsonify({"error": "granularity must be day or hour"}), 400
+    end = datetime.utcnow()
+    start = end - timedelta(days=days - 1)
+    try:
+        return jsonify(vehicle_log_rollups.trend(start, end, granularity)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@vehicle_plate_bp.route("/rollups/rebuild", methods=["POST"])
+def rebuild_vehicle_rollups():
+    try:
+        days = vehicle_log_rollups.rebuild()
+        if days is None:
+            return jsonify({"error": "A rollup rebuild is already running"}), 409
+        return jsonify({"days": days}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @vehicle_plate_bp.route("/delete/<id>", methods=["DELETE"])
 def delete_vehicle_record(id):
     try:
-        result = registered_vehicles.delete_one({"_id": ObjectId(id)})
-        if result.deleted_count == 0:
+        deleted = registered_vehicles.find_one_and_delete({"_id": ObjectId(id)}, {"plate_number": 1})
+        if deleted is None:
             return jsonify({"error": "Vehicle record not found"}), 404
+        plate_index.remove(deleted["plate_number"])
         return jsonify({"message": "Vehicle record deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -203,7 +725,8 @@ def delete_vehicle_record(id):
 def update_vehicle_record(id):
     try:
         data = request.json
-        if not registered_vehicles.find_one({"_id": ObjectId(id)}):
+        current = registered_vehicles.find_one({"_id": ObjectId(id)}, {"plate_number": 1})
+        if not current:
             return jsonify({"error": "Vehicle record not found"}), 404
         update_data = {}
         if "owner_name" in data:
@@ -214,40 +737,79 @@ def update_vehicle_record(id):
             {"_id": ObjectId(id)},
             {"$set": update_data}
         )
+        plate_index.update(current["plate_number"], update_data)
         return jsonify({"message": "Vehicle record updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@vehicle_plate_bp.route("/session_cache/stats", methods=["GET"])
+def processing_session_stats():
+    return jsonify(processing_sessions.get_stats()), 200
+
+@vehicle_plate_bp.route("/detector/stats", methods=["GET"])
+def plate_detector_stats():
+    if inference_client is not None:
+        return jsonify({**inference_client.info()['plate_detector'], 'served_by': 'inference_server',
+                        'gate_imgsz': PLATE_GATE_IMGSZ}), 200
+    return jsonify({**plate_detector_info, 'gate_imgsz': PLATE_GATE_IMGSZ}), 200
+
+@vehicle_plate_bp.route("/result_cache/stats", methods=["GET"])
+def plate_result_cache_stats():
+    return jsonify(plate_result_cache.get_stats()), 200
+
+@vehicle_plate_bp.route("/plate_index/stats", methods=["GET"])
+def plate_index_stats():
+    return jsonify(plate_index.get_stats()), 200
+
+VEHICLE_LOG_FIELDS = ["_id", "plate_number", "timestamp", "access_granted", "owner", "vehicle_type", "model"]
+
+def build_vehicle_log_query(args):
+    """Filter from ?date=YYYY-MM-DD or ?start_date=...&end_date=... (inclusive); raises ValueError"""
+    filter_date = args.get('date')
+    start_date = args.get('start_date') or filter_date
+    end_date = args.get('end_date') or filter_date
+    if not start_date and not end_date:
+        return {}
+    query = {"timestamp": {}}
+    if start_date:
+        query["timestamp"]["$gte"] = datetime.strptime(start_date, '%Y-%m-%d')
+    if end_date:
+        query["timestamp"]["$lt"] = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+    return query
+
+def format_vehicle_log(log):
+    return {
+        "_id": str(log["_id"]),
+        "plate_number": log["plate_number"],
+        "timestamp": log["timestamp"].isoformat(),
+        "access_granted": log["access_granted"],
+        "owner": log.get("owner", "Unknown"),
+        "vehicle_type": log.get("vehicle_type", "Unknown"),
+        "model": log.get("model", "")
+    }
+
 @vehicle_plate_bp.route("/logs", methods=["GET"])
 def get_vehicle_logs():
     try:
-        filter_date = request.args.get('date')
-        query = {}
-        if filter_date:
-            try:
-                filter_date = datetime.strptime(filter_date, '%Y-%m-%d')
-                next_day = filter_date + timedelta(days=1)
-                query = {
-                    "timestamp": {
-                        "$gte": filter_date,
-                        "$lt": next_day
-                    }
-                }
-            except ValueError:
-                return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+        try:
+            query = build_vehicle_log_query(request.args)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
         logs = list(vehicle_logs.find(query).sort("timestamp", -1))
-        formatted_logs = []
-        for log in logs:
-            formatted_log = {
-                "_id": str(log["_id"]),
-                "plate_number": log["plate_number"],
-                "timestamp": log["timestamp"].isoformat(),
-                "access_granted": log["access_granted"],
-                "owner": log.get("owner", "Unknown"),
-                "vehicle_type": log.get("vehicle_type", "Unknown"),
-                "model": log.get("model", "")
-            }
-            formatted_logs.append(formatted_log)
+        formatted_logs = [format_vehicle_log(log) for log in logs]
         return jsonify(formatted_logs), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@vehicle_plate_bp.route("/logs/export", methods=["GET"])
+def export_vehicle_logs():
+    """Stream vehicle logs as NDJSON (default) or CSV: ?format=csv&start_date=...&end_date=..."""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        query = build_vehicle_log_query(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+    cursor = vehicle_logs.find(query, {field: 1 for field in VEHICLE_LOG_FIELDS}).sort("timestamp", -1)
+    return export_response(cursor, format_vehicle_log, VEHICLE_LOG_FIELDS, export_format, "vehicle_logs")
@@ -0,0 +1,128 @@
+"""
+Parity check and benchmark for the ArcFace embedding backends.
+
+Each backend runs in its own subprocess, so that peak RSS reflects only that backend.
+The script embeds every image in a fixture directory of face photos and reports:
+    - cosine agreement with the DeepFace reference (mean / min),
+    - load time, per-face latency (mean / p95) and peak RSS.
+It exits non-zero if any backend's minimum cosine falls below --min-cosine.
+
+Run from the backend directory:
+    python -m scripts.benchmark_face_embeddings --faces path/to/faces --backends deepface,onnx,onnx-int8
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def list_faces(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def run_worker(backend_name, faces_dir, repeat, output_path):
+    import cv2
+    from modules.face_Recognition.embedding_backends import create_embedding_backend
+
+    started = time.perf_counter()
+    backend = create_embedding_backend(backend_name)
+    load_seconds = time.perf_counter() - started
+
+    paths = list_faces(faces_dir)
+    images = [cv2.imread(path) for path in paths]
+    embeddings = np.zeros((len(images), 512), dtype=np.float32)
+    found = np.zeros(len(images), dtype=bool)
+    latencies = []
+    if images:
+        backend.embed_batch(images[:1], enforce_detection=False)  # warm-up
+    for _ in range(repeat):
+        for index, image in enumerate(images):
+            call_started = time.perf_counter()
+            try:
+                embeddings[index] = backend.represent(image, enforce_detection=True)
+                found[index] = True
+            except ValueError:
+                pass
+            latencies.append(1000 * (time.perf_counter() - call_started))
+
+    np.savez(output_path, embeddings=embeddings, found=found)
+    latencies.sort()
+    print(json.dumps({
+        "backend": backend.name,
+        "load_seconds": round(load_seconds, 2),
+        "faces": len(images),
+        "detected": int(found.sum()),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0,
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 2) if latencies else 0,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }))
+
+
+def run_backend(backend_name, faces_dir, repeat, workdir):
+    output_path = os.path.join(workdir, f"{backend_name}.npz")
+    completed = subprocess.run(
+        [sys.executable, "-m", "scripts.benchmark_face_embeddings", "--worker", backend_name,
+         "--faces", os.path.abspath(faces_dir), "--repeat", str(repeat), "--output", output_path],
+        capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+    )
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    data = np.load(output_path)
+    return report, data["embeddings"], data["found"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--faces', required=True, help='directory of fixture face images')
+    parser.add_argument('--backends', default='deepface,onnx,onnx-int8')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-cosine', type=float, default=0.98)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.faces, args.repeat, args.output)
+        return 0
+
+    names = [name.strip() for name in args.backends.split(',') if name.strip()]
+    if 'deepface' not in names:
+        names.insert(0, 'deepface')  # reference for the parity check
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            results[name] = run_backend(name, args.faces, args.repeat, workdir)
+
+    reference_report, reference, reference_found = results['deepface']
+    failed = False
+    print(f"{'backend':<12}{'load s':>8}{'mean ms':>10}{'p95 ms':>9}{'RSS MB':>9}{'detected':>10}{'cos mean':>10}{'cos min':>9}")
+    for name in names:
+        report, embeddings, found = results[name]
+        both = found & reference_found
+        cosines = np.sum(embeddings[both] * reference[both], axis=1)
+        cos_mean = float(cosines.mean()) if len(cosines) else float('nan')
+        cos_min = float(cosines.min()) if len(cosines) else float('nan')
+        if name != 'deepface' and not (cos_min >= args.min_cosine):
+            failed = True
+        print(f"{report['backend']:<12}{report['load_seconds']:>8}{report['mean_ms']:>10}{report['p95_ms']:>9}"
+              f"{report['peak_rss_mb']:>9}{report['detected']:>6}/{report['faces']:<3}{cos_mean:>10.4f}{cos_min:>9.4f}")
+    if failed:
+        print(f"Parity check failed: cosine agreement below {args.min_cosine}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Accuracy vs latency for every available plate detector backend and input size.
+
+Validates each combination on a YOLO-format fixture dataset, then prints mAP50,
+mAP50-95 and the per-image preprocess / inference / postprocess time on CPU.
+
+Run from the backend directory:
+    python -m scripts.benchmark_plate_detector --data path/to/plates.yaml --imgsz 640,480,320
+"""
+import argparse
+
+from modules.inference_server.models import plate_detector_candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', required=True, help='YOLO dataset YAML of the fixture set')
+    parser.add_argument('--imgsz', default='640,480,320')
+    parser.add_argument('--backends', default=None, help='subset of pt,onnx,openvino (default: all available)')
+    parser.add_argument('--conf', type=float, default=0.001)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    candidates = plate_detector_candidates()
+    if args.backends:
+        wanted = {name.strip() for name in args.backends.split(',')}
+        candidates = {name: path for name, path in candidates.items() if name in wanted}
+    sizes = [int(size) for size in args.imgsz.split(',') if size.strip()]
+
+    print(f"{'backend':<10}{'imgsz':>6}{'mAP50':>8}{'mAP50-95':>10}{'pre ms':>8}{'infer ms':>10}{'post ms':>9}")
+    for name, path in candidates.items():
+        for imgsz in sizes:
+            try:
+                metrics = YOLO(path, task="detect").val(
+                    data=args.data, imgsz=imgsz, batch=1, conf=args.conf, device="cpu", plots=False, verbose=False
+                )
+            except Exception as e:
+                print(f"{name:<10}{imgsz:>6}  failed: {e}")
+                continue
+            speed = metrics.speed
+            print(f"{name:<10}{imgsz:>6}{metrics.box.map50:>8.3f}{metrics.box.map:>10.3f}"
+                  f"{speed['preprocess']:>8.1f}{speed['inference']:>10.1f}{speed['postprocess']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Export DeepFace's ArcFace model to ONNX for FACE_EMBEDDING_BACKEND=onnx / onnx-int8.
+
+Run from the backend directory (needs tensorflow, deepface, tf2onnx, onnxruntime):
+    python -m scripts.export_arcface_onnx [--int8]
+"""
+import argparse
+import os
+
+from modules.face_Recognition.embedding_backends import (
+    ARCFACE_INPUT_SIZE, ARCFACE_ONNX_INT8_PATH, ARCFACE_ONNX_PATH, ensure_quantized_model
+)
+
+
+def export(output_path):
+    import tensorflow as tf
+    import tf2onnx
+    from deepface import DeepFace
+
+    model = DeepFace.build_model("ArcFace")
+    # Newer DeepFace versions wrap the Keras model in a client object
+    keras_model = getattr(model, "model", model)
+    signature = [tf.TensorSpec((None, ARCFACE_INPUT_SIZE, ARCFACE_INPUT_SIZE, 3), tf.float32, name="input")]
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tf2onnx.convert.from_keras(keras_model, input_signature=signature, opset=13, output_path=output_path)
+    print(f"Wrote {output_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=ARCFACE_ONNX_PATH)
+    parser.add_argument('--int8', action='store_true', help='also write the dynamically quantized int8 graph')
+    parser.add_argument('--int8-output', default=ARCFACE_ONNX_INT8_PATH)
+    args = parser.parse_args()
+
+    export(args.output)
+    if args.int8:
+        if os.path.exists(args.int8_output):
+            os.remove(args.int8_output)
+        ensure_quantized_model(args.output, args.int8_output)
+        print(f"Wrote {args.int8_output}")
@@ -0,0 +1,38 @@
+"""
+Export the license plate detector to CPU-optimized graphs next to the .pt weights:
+    <stem>.onnx and <stem>_openvino_model/
+load_plate_detector() picks them up (PLATE_DETECTOR_BACKEND=auto keeps the fastest).
+The exports use dynamic input shapes, so one graph serves every PLATE_DETECTOR_IMGSZ / PLATE_GATE_IMGSZ.
+
+Run from the backend directory (needs ultralytics; openvino for the OpenVINO export):
+    python -m scripts.export_plate_detector [--formats onnx,openvino]
+"""
+import argparse
+import os
+import shutil
+
+from modules.inference_server.models import PLATE_DETECTOR_PATH
+
+
+def export(weights, export_format, imgsz):
+    from ultralytics import YOLO
+
+    exported = YOLO(weights).export(format=export_format, imgsz=imgsz, dynamic=True, simplify=True)
+    stem = os.path.splitext(weights)[0]
+    target = f"{stem}.onnx" if export_format == "onnx" else f"{stem}_openvino_model"
+    if os.path.abspath(exported) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        shutil.move(exported, target)
+    print(f"Wrote {target}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default=PLATE_DETECTOR_PATH)
+    parser.add_argument('--formats', default='onnx,openvino')
+    parser.add_argument('--imgsz', type=int, default=640)
+    args = parser.parse_args()
+
+    for export_format in filter(None, (part.strip() for part in args.formats.split(','))):
+        export(args.weights, export_format, args.imgsz)
@@ -0,0 +1,78 @@
+"""
+Embedding parity against the stored face templates.
+
+Registered templates were produced by DeepFace ArcFace. Any other embedding path
+compared against them must land close enough to DeepFace's vector for the same photo,
+otherwise switching to it silently breaks recognition and every user has to be
+re-enrolled.
+
+Needs a directory of face photos and the models, so it is skipped unless
+FACE_PARITY_FIXTURES is set:
+    FACE_PARITY_FIXTURES=path/to/faces python -m pytest tests/test_embedding_parity.py
+"""
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.benchmark_face_embeddings import BACKEND_DIR, list_faces, run_backend
+
+FIXTURES = os.environ.get("FACE_PARITY_FIXTURES")
+MIN_COSINE = float(os.environ.get("FACE_PARITY_MIN_COSINE", 0.98))
+
+pytestmark = pytest.mark.skipif(not FIXTURES, reason="set FACE_PARITY_FIXTURES to a directory of face photos")
+
+
+@pytest.fixture(scope="module")
+def deepface_reference(tmp_path_factory):
+    pytest.importorskip("deepface")
+    return run_backend("deepface", FIXTURES, 1, str(tmp_path_factory.mktemp("deepface")))
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_backend_matches_deepface_templates(backend, deepface_reference, tmp_path):
+    pytest.importorskip("onnxruntime")
+    from modules.face_Recognition.embedding_backends import ARCFACE_ONNX_PATH
+    if not os.path.exists(os.path.join(BACKEND_DIR, ARCFACE_ONNX_PATH)):
+        pytest.skip("export the graph first: python -m scripts.export_arcface_onnx --int8")
+
+    _, reference, reference_found = deepface_reference
+    report, embeddings, found = run_backend(backend, FIXTURES, 1, str(tmp_path))
+    # create_embedding_backend falls back to DeepFace when ONNX cannot load, which would pass trivially
+    assert report["backend"] == backend
+
+    both = found & reference_found
+    assert both.any(), "no fixture face was detected by both backends"
+    cosines = np.sum(embeddings[both] * reference[both], axis=1)
+    assert cosines.min() >= MIN_COSINE, (
+        f"{backend} min cosine {cosines.min():.4f} < {MIN_COSINE} against DeepFace: "
+        f"switching FACE_EMBEDDING_BACKEND to {backend} requires re-enrolling registered faces"
+    )
+
+
+def test_live_crop_path_matches_deepface_templates(deepface_reference):
+    """The default live path: Haar box, quality gate and eye-line roll instead of DeepFace's detector"""
+    cv2 = pytest.importorskip("cv2")
+    from modules.face_Recognition.embedding_backends import create_embedding_backend
+    from modules.face_Recognition.face_crops import largest_face, prepare_face_crop
+
+    _, reference, reference_found = deepface_reference
+    backend = create_embedding_backend("deepface")
+    cosines = []
+    for index, path in enumerate(list_faces(FIXTURES)):
+        image = cv2.imread(path)
+        box = largest_face(image)
+        if not reference_found[index] or box is None:
+            continue
+        x, y, w, h = box
+        face, rejected = prepare_face_crop(image[y:y+h, x:x+w])
+        if rejected:
+            continue
+        cosines.append(float(np.dot(backend.embed_crops([face])[0], reference[index])))
+
+    assert cosines, "no fixture face passed the live crop path"
+    assert min(cosines) >= MIN_COSINE, (
+        f"crop path min cosine {min(cosines):.4f} < {MIN_COSINE} against DeepFace: "
+        f"set FACE_LIVE_EMBEDDING=frame, or re-enroll registered faces through the crop path"
+    )
@@ -0,0 +1,128 @@
+"""
+Gate stream plate voting and IoU tracking, driven with scripted detections and OCR
+readings instead of a camera and models.
+"""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")  # gate_stream imports the camera manager
+
+from modules.vehicle_identification.gate_stream import GateStreamWorker, box_iou, vote_plate
+
+PLATE = "MH12AB1234"
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def noisy_reading(rng, plate, error_rate):
+    text = "".join(rng.choice("0123456789ABCDEFGH") if rng.random() < error_rate else char for char in plate)
+    return text, rng.uniform(0.5, 1.0)
+
+
+def test_box_iou():
+    assert box_iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert box_iou((0, 0, 10, 10), (20, 20, 30, 30)) == 0.0
+    assert box_iou((0, 0, 10, 10), (5, 0, 15, 10)) == pytest.approx(50 / 150)
+
+
+def test_vote_plate_basics():
+    assert vote_plate([]) == ("", 0.0)
+    assert vote_plate([("", 0.9)]) == ("", 0.0)
+    assert vote_plate([(PLATE, 0.9)] * 3) == (PLATE, 1.0)
+    # Each position is voted on separately, so three reads with errors in different places still agree
+    plate, agreement = vote_plate([("MH12A81234", 0.9), ("MH1ZAB1234", 0.9), ("MH12AB1Z34", 0.9)])
+    assert plate == PLATE
+    assert agreement == pytest.approx(2 / 3, abs=1e-3)
+
+
+def test_vote_plate_weights_by_score_and_length():
+    # One confident read outweighs two unsure ones at the disputed position
+    assert vote_plate([("AB12", 0.95), ("A812", 0.3), ("A812", 0.3)])[0] == "AB12"
+    # A read with a spurious extra character is outvoted on length and ignored
+    assert vote_plate([(PLATE, 0.8), (PLATE, 0.8), (PLATE + "7", 0.9)])[0] == PLATE
+
+
+@pytest.mark.parametrize("error_rate", [0.1, 0.2, 0.3])
+def test_vote_plate_converges_with_more_reads(error_rate):
+    rng = random.Random(int(error_rate * 100))
+    trials = 200
+    correct = {}
+    for reads in (1, 3, 7, 15):
+        correct[reads] = sum(
+            vote_plate([noisy_reading(rng, PLATE, error_rate) for _ in range(reads)])[0] == PLATE
+            for _ in range(trials)
+        )
+    assert correct[1] <= correct[3] <= correct[7] <= correct[15]
+    assert correct[15] >= 0.95 * trials
+
+
+class ScriptedGate:
+    """GateStreamWorker with scripted detections per frame and OCR reads per crop"""
+
+    def __init__(self, boxes_per_frame, readings, **params):
+        self.boxes_per_frame = iter(boxes_per_frame)
+        self.readings = iter(readings)
+        self.decisions = []
+        self.worker = GateStreamWorker(
+            "test_gate", self.detect, self.recognize, self.decide, **params
+        )
+
+    def detect(self, frame):
+        return next(self.boxes_per_frame)
+
+    def recognize(self, crops):
+        return [next(self.readings) for _ in crops]
+
+    def decide(self, plate_number, source_id):
+        self.decisions.append(plate_number)
+        return True
+
+    def run(self, frames, fps=10.0):
+        for index in range(frames):
+            self.worker._process_frame(FRAME, index / fps)
+
+
+def moving_box(step, x=100, y=300):
+    return (x + 4 * step, y, x + 124 + 4 * step, y + 30, 0.9)
+
+
+def test_one_moving_plate_is_one_track_and_one_decision():
+    readings = [("MH12A81234", 0.9), (PLATE, 0.8), (PLATE, 0.85)]
+    gate = ScriptedGate([[moving_box(step)] for step in range(20)], readings,
+                        reads_per_track=3, read_interval=2, min_hits=2)
+    gate.run(20)
+    status = gate.worker.get_status()
+    assert status["stats"]["tracks"] == 1
+    assert status["stats"]["ocr_calls"] == 3
+    assert gate.decisions == [PLATE]
+
+
+def test_two_plates_get_separate_tracks():
+    left = [moving_box(step, x=20) for step in range(12)]
+    right = [moving_box(step, x=400, y=100) for step in range(12)]
+    readings = [("AB1234", 0.9), ("XY9876", 0.9)] * 3
+    gate = ScriptedGate([[a, b] for a, b in zip(left, right)], readings,
+                        reads_per_track=3, read_interval=1, min_hits=2)
+    gate.run(12)
+    assert gate.worker.get_status()["stats"]["tracks"] == 2
+    assert sorted(gate.decisions) == ["AB1234", "XY9876"]
+
+
+def test_track_that_leaves_early_is_decided_on_partial_reads():
+    boxes = [[moving_box(step)] for step in range(3)] + [[] for _ in range(30)]
+    gate = ScriptedGate(boxes, [(PLATE, 0.9), (PLATE, 0.9)],
+                        reads_per_track=5, read_interval=1, min_hits=2, track_ttl=1.0)
+    gate.run(33)
+    assert gate.decisions == [PLATE]
+    assert gate.worker.get_status()["active_tracks"] == 0
+
+
+def test_same_plate_is_not_decided_twice_within_cooldown():
+    boxes = [[moving_box(step)] for step in range(4)] + [[] for _ in range(20)] + \
+            [[moving_box(step)] for step in range(4)] + [[] for _ in range(20)]
+    gate = ScriptedGate(boxes, [(PLATE, 0.9)] * 4, reads_per_track=2, read_interval=1, min_hits=2,
+                        track_ttl=1.0, plate_cooldown=30.0)
+    gate.run(len(boxes))
+    assert gate.worker.get_status()["stats"]["tracks"] == 2
+    assert gate.decisions == [PLATE]
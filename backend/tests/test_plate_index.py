@@ -0,0 +1,137 @@
+"""
+PlateIndex building blocks: the OCR-weighted plate distance, the BK-tree radius search
+and tombstoned removals. Pure Python, no database or model needed.
+"""
+import itertools
+import random
+
+import pytest
+
+from modules.vehicle_identification.plate_index import (
+    CONFUSION_COST, OCR_CONFUSIONS, BKTree, PlateIndex, plate_distance
+)
+
+ALPHABET = "ABCDEGHKLMNOPRSTUVZ0123456789"
+CONFUSABLE = "".join(sorted({char for pair in OCR_CONFUSIONS for char in pair}))
+
+
+def random_plate(rng, length=None):
+    length = length or rng.randint(5, 8)
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def mutate(rng, plate, edits):
+    """Random substitutions (biased towards OCR confusions), insertions and deletions"""
+    chars = list(plate)
+    for _ in range(edits):
+        operation = rng.random()
+        position = rng.randrange(len(chars)) if chars else 0
+        if operation < 0.5 and chars:
+            chars[position] = rng.choice(CONFUSABLE if rng.random() < 0.7 else ALPHABET)
+        elif operation < 0.75:
+            chars.insert(position, rng.choice(ALPHABET))
+        elif chars:
+            del chars[position]
+    return "".join(chars)
+
+
+@pytest.fixture(scope="module")
+def plates():
+    rng = random.Random(7)
+    return sorted({random_plate(rng) for _ in range(300)} | {"MH12AB1234", "MH12A81234", "KA05MN0001"})
+
+
+def index_from(plates):
+    index = PlateIndex(lambda: [{"plate_number": plate} for plate in plates], refresh_interval=3600)
+    index.stop()  # no background refresh thread in tests
+    index.load()
+    return index
+
+
+def test_plate_distance_weights_ocr_confusions():
+    assert plate_distance("MH12AB1234", "MH12AB1234") == 0.0
+    assert plate_distance("MH12AB1234", "MH12A81234") == CONFUSION_COST
+    assert plate_distance("MH12AB1234", "MH12AX1234") == 1.0
+    assert plate_distance("MH12AB1234", "MH12AB123") == 1.0
+    assert plate_distance("", "ABC") == 3.0
+
+
+def test_plate_distance_is_a_metric():
+    rng = random.Random(11)
+    samples = [random_plate(rng, 6) for _ in range(12)]
+    # Near neighbours exercise the cheap confusion substitutions, not just unrelated strings
+    samples += [mutate(rng, plate, rng.randint(1, 2)) for plate in samples]
+    for a, b in itertools.product(samples, repeat=2):
+        assert plate_distance(a, b) == plate_distance(b, a)
+        assert (plate_distance(a, b) == 0) == (a == b)
+    for a, b, c in itertools.product(samples, repeat=3):
+        assert plate_distance(a, c) <= plate_distance(a, b) + plate_distance(b, c) + 1e-9
+
+
+@pytest.mark.parametrize("radius", [0.0, CONFUSION_COST, 1.0, 1.5, 2.0])
+def test_bk_tree_search_matches_brute_force(plates, radius):
+    tree = BKTree()
+    for plate in plates:
+        tree.add(plate)
+    assert tree.size == len(plates)
+
+    rng = random.Random(int(radius * 10))
+    queries = [mutate(rng, rng.choice(plates), rng.randint(0, 3)) for _ in range(60)]
+    queries += [random_plate(rng) for _ in range(20)]
+    for query in queries:
+        expected = sorted(
+            (plate_distance(query, plate), plate) for plate in plates
+            if plate_distance(query, plate) <= radius
+        )
+        assert sorted(tree.search(query, radius)) == expected
+
+
+def test_bk_tree_ignores_duplicates():
+    tree = BKTree()
+    for plate in ["AB12", "AB12", "A812"]:
+        tree.add(plate)
+    assert tree.size == 2
+
+
+def test_lookup_exact_fuzzy_and_ambiguous():
+    index = index_from(["MH12AB1234", "KA05MN0001"])
+    assert index.lookup("MH12AB1234")[1:] == ("MH12AB1234", 0.0)
+    # 8 -> B is an OCR confusion, within the default radius
+    assert index.lookup("MH12A81234")[1:] == ("MH12AB1234", CONFUSION_COST)
+    # An arbitrary substitution is not
+    assert index.lookup("MH12AX1234") == (None, None, None)
+
+    ambiguous = index_from(["AO1234", "AQ1234"])
+    # 0 is one confusion away from both O and Q: no decision
+    assert ambiguous.lookup("A01234") == (None, None, None)
+    assert ambiguous.get_stats()["ambiguous"] == 1
+
+
+def test_removed_plates_are_never_matched():
+    index = index_from(["AO1234", "AQ1234", "ZZ9999"])
+    index.remove("AO1234")
+    assert "AO1234" in index.removed  # tombstoned, still in the tree
+    assert index.lookup("AO1234") == (None, None, None)
+    # The tombstoned plate no longer makes the near miss ambiguous
+    assert index.lookup("A01234")[1:] == ("AQ1234", CONFUSION_COST)
+
+    # Registering the plate again lifts the tombstone
+    index.add({"plate_number": "AO1234"})
+    assert index.lookup("AO1234")[1:] == ("AO1234", 0.0)
+    assert index.lookup("A01234") == (None, None, None)
+
+
+def test_tombstones_trigger_a_rebuild(plates):
+    index = index_from(plates)
+    removed = plates[:len(plates) // 2]
+    for plate in removed:
+        index.remove(plate)
+    remaining = set(plates) - set(removed)
+    # Rebuilt at least once: the tree holds far fewer dead entries than were removed
+    assert len(index.removed) <= max(32, len(remaining) // 4)
+    assert index.tree.size - len(index.removed) == len(remaining)
+    for plate in removed:
+        vehicle, matched, _ = index.lookup(plate)
+        assert matched != plate
+    for plate in list(remaining)[:50]:
+        assert index.lookup(plate)[1:] == (plate, 0.0)
@@ -0,0 +1,131 @@
+"""
+ResultCache memory and disk tiers: spilling, disk eviction, TTL on both tiers and
+corrupt spill files. Time is driven by a fake clock.
+"""
+import os
+import time
+
+import pytest
+
+from modules.common.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, "time", fake)
+    return fake
+
+
+def spill_files(cache):
+    return sorted(name[:-5] for name in os.listdir(cache.spill_dir) if name.endswith(".json"))
+
+
+def test_memory_only_cache_does_not_touch_disk(tmp_path):
+    cache = ResultCache("plates", max_entries=2)
+    cache.put("a", {"plate": "AB12"})
+    assert cache.get("a") == {"plate": "AB12"}
+    assert cache.get("missing") is None
+    assert cache.get_stats()["disk"]["enabled"] is False
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_memory_evictions_are_served_from_disk(tmp_path):
+    cache = ResultCache("plates", max_entries=1, spill_dir=str(tmp_path))
+    cache.put("a", {"plate": "AB12"})
+    cache.put("b", {"plate": "CD34"})
+    assert cache.memory.get_stats()["evictions"]["capacity"] == 1
+    assert spill_files(cache) == ["a", "b"]
+
+    assert cache.get("a") == {"plate": "AB12"}
+    disk = cache.get_stats()["disk"]
+    assert disk["hits"] == 1
+    assert disk["writes"] == 2
+
+
+def test_spilled_results_survive_a_restart(tmp_path):
+    ResultCache("plates", spill_dir=str(tmp_path)).put("a", [1, 2, 3])
+    restarted = ResultCache("plates", spill_dir=str(tmp_path))
+    assert restarted.get_stats()["disk"]["entries"] == 1
+    assert restarted.get("a") == [1, 2, 3]
+
+
+def test_disk_is_bounded_oldest_first(tmp_path):
+    value = {"plate": "X" * 100}
+    probe = ResultCache("probe", spill_dir=str(tmp_path))
+    probe.put("probe", value)
+    file_size = probe.get_stats()["disk"]["bytes"]
+
+    cache = ResultCache("plates", max_entries=1, spill_dir=str(tmp_path), spill_max_bytes=3 * file_size)
+    for key in "abcde":
+        cache.put(key, value)
+    assert spill_files(cache) == ["c", "d", "e"]
+    disk = cache.get_stats()["disk"]
+    assert disk["entries"] == 3
+    assert disk["bytes"] == 3 * file_size
+    assert disk["evictions"] == 2
+    assert cache.get("a") is None
+
+
+def test_oversized_results_are_not_spilled(tmp_path):
+    cache = ResultCache("plates", spill_dir=str(tmp_path), spill_max_bytes=16)
+    cache.put("a", {"plate": "X" * 100})
+    assert spill_files(cache) == []
+    assert cache.get("a") == {"plate": "X" * 100}  # still cached in memory
+
+
+def test_ttl_expires_memory_and_disk(tmp_path, clock):
+    cache = ResultCache("plates", ttl=60, spill_dir=str(tmp_path))
+    cache.put("a", {"plate": "AB12"})
+    clock.now += 59
+    assert cache.get("a") == {"plate": "AB12"}
+
+    clock.now += 2
+    assert cache.get("a") is None
+    assert spill_files(cache) == []
+    stats = cache.get_stats()
+    assert stats["evictions"]["expired"] == 1
+    assert stats["disk"]["expired"] == 1
+    assert stats["disk"]["entries"] == 0
+
+
+def test_expiry_is_kept_across_restarts(tmp_path, clock):
+    ResultCache("plates", ttl=60, spill_dir=str(tmp_path)).put("a", "AB12")
+    clock.now += 30
+    # A longer TTL after the restart does not extend entries that were already spilled
+    restarted = ResultCache("plates", ttl=3600, spill_dir=str(tmp_path))
+    assert restarted.get("a") == "AB12"
+    clock.now += 31
+    assert restarted.get("a") is None
+    assert restarted.get_stats()["disk"]["expired"] == 1
+
+
+def test_promoted_entry_keeps_its_disk_expiry(tmp_path, clock):
+    cache = ResultCache("plates", max_entries=1, ttl=60, spill_dir=str(tmp_path))
+    cache.put("a", "AB12")
+    cache.put("b", "CD34")  # evicts "a" from memory
+    clock.now += 50
+    assert cache.get("a") == "AB12"  # promoted back into memory
+    clock.now += 11
+    assert cache.memory.get("a") is None
+
+
+@pytest.mark.parametrize("content", [b'{"plate": "AB', b'not json', b'["AB12"]', b'{"plate": "AB12"}'])
+def test_corrupt_spill_files_are_dropped(tmp_path, content):
+    cache = ResultCache("plates", max_entries=1, spill_dir=str(tmp_path))
+    cache.put("a", "AB12")
+    cache.put("b", "CD34")
+    with open(cache._path("a"), "wb") as handle:
+        handle.write(content)
+
+    assert cache.get("a") is None
+    assert spill_files(cache) == ["b"]
+    assert cache.get_stats()["disk"]["entries"] == 1
@@ -0,0 +1,110 @@
+"""
+Inference scheduler primitives: PrioritySemaphore wake-up order and slot handoff,
+ThreadBudget apportionment.
+"""
+import itertools
+import threading
+import time
+
+import pytest
+
+from modules.common.scheduler import PrioritySemaphore, ThreadBudget
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out waiting for condition")
+        time.sleep(0.001)
+
+
+class Waiter(threading.Thread):
+    def __init__(self, semaphore, priority, label, served):
+        super().__init__(daemon=True)
+        self.semaphore = semaphore
+        self.priority = priority
+        self.label = label
+        self.served = served
+        self.acquired = threading.Event()
+
+    def run(self):
+        self.semaphore.acquire(self.priority)
+        self.served.append(self.label)
+        self.acquired.set()
+
+
+def queue_waiters(semaphore, priorities, served):
+    """Start one waiter per (label, priority), each queued before the next starts"""
+    waiters = []
+    for label, priority in priorities:
+        waiter = Waiter(semaphore, priority, label, served)
+        queued = semaphore.get_stats()["waiting"]
+        waiter.start()
+        wait_until(lambda: semaphore.get_stats()["waiting"] == queued + 1)
+        waiters.append(waiter)
+    return waiters
+
+
+def test_waiters_are_served_by_priority_then_fifo():
+    semaphore = PrioritySemaphore(1)
+    semaphore.acquire(1)
+    served = []
+    waiters = queue_waiters(semaphore, [("batch", 2), ("interactive-1", 1), ("gate", 0), ("interactive-2", 1)], served)
+
+    for expected in ["gate", "interactive-1", "interactive-2", "batch"]:
+        semaphore.release()
+        wait_until(lambda: expected in served)
+    assert served == ["gate", "interactive-1", "interactive-2", "batch"]
+    for waiter in waiters:
+        waiter.join(1)
+    semaphore.release()
+    assert semaphore.get_stats() == {"capacity": 1, "active": 0, "waiting": 0}
+
+
+def test_release_hands_the_slot_to_a_waiter():
+    semaphore = PrioritySemaphore(1)
+    semaphore.acquire(1)
+    served = []
+    (waiter,) = queue_waiters(semaphore, [("queued", 2)], served)
+
+    semaphore.release()
+    assert waiter.acquired.wait(1)
+    # Handed over, never freed: the slot stays counted and a newcomer has to queue
+    assert semaphore.get_stats() == {"capacity": 1, "active": 1, "waiting": 0}
+    queue_waiters(semaphore, [("newcomer", 0)], served)
+    assert served == ["queued"]
+
+    semaphore.release()
+    wait_until(lambda: "newcomer" in served)
+    semaphore.release()
+    assert semaphore.get_stats()["active"] == 0
+
+
+def test_no_barging_past_queued_waiters():
+    semaphore = PrioritySemaphore(2)
+    semaphore.acquire(1)
+    semaphore.acquire(1)
+    served = []
+    queue_waiters(semaphore, [("first", 1)], served)
+    semaphore.release()
+    wait_until(lambda: served == ["first"])
+    assert semaphore.get_stats() == {"capacity": 2, "active": 2, "waiting": 0}
+
+
+@pytest.mark.parametrize("total", range(1, 65))
+def test_thread_budget_shares_sum_to_total(total):
+    budget = ThreadBudget(total)
+    assert sum(budget.shares.values()) == budget.total == max(total, len(ThreadBudget.WEIGHTS))
+    assert all(share >= 1 for share in budget.shares.values())
+    # A heavier framework never gets fewer threads than a lighter one
+    weights = ThreadBudget.WEIGHTS
+    for heavier, lighter in itertools.permutations(weights, 2):
+        if weights[heavier] > weights[lighter]:
+            assert budget.shares[heavier] >= budget.shares[lighter]
+
+
+def test_thread_budget_follows_weights_when_divisible():
+    weights = ThreadBudget.WEIGHTS
+    total = len(weights) + 2 * sum(weights.values())
+    assert ThreadBudget(total).shares == {name: 1 + 2 * weight for name, weight in weights.items()}
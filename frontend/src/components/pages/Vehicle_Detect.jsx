@@ -24,6 +24,7 @@ const VehicleIdentificationSystem = () => {
     plateNumber: "",
     fullImage: "",
     plateImage: "",
+    token: "",
   });
 
   const [vehicleData, setVehicleData] = useState({
@@ -37,7 +38,8 @@ const VehicleIdentificationSystem = () => {
   const [manualOverrideData, setManualOverrideData] = useState({
     fullImage: "",
     captureMode: "",
-    message: ""
+    message: "",
+    token: ""
   });
 
   const instructionSteps = [
@@ -156,6 +158,7 @@ const VehicleIdentificationSystem = () => {
           plateNumber: response.data.plate_number,
           fullImage: `data:image/jpeg;base64,${response.data.full_image}`,
           plateImage: `data:image/jpeg;base64,${response.data.plate_image}`,
+          token: response.data.token || "",
         });
 
         setCameraPopupOpen(false);
@@ -172,7 +175,8 @@ const VehicleIdentificationSystem = () => {
           setManualOverrideData({
             fullImage: `data:image/jpeg;base64,${response.data.full_image}`,
             captureMode: captureMode,
-            message: response.data.message
+            message: response.data.message,
+            token: response.data.token || ""
           });
           setCameraPopupOpen(false);
           stopCamera();
@@ -195,6 +199,7 @@ const VehicleIdentificationSystem = () => {
       plateNumber: "",
       fullImage: manualOverrideData.fullImage,
       plateImage: "", // No plate image for manual override
+      token: manualOverrideData.token,
     });
 
     setManualOverridePopupOpen(false);
@@ -212,7 +217,8 @@ const VehicleIdentificationSystem = () => {
     setManualOverrideData({
       fullImage: "",
       captureMode: "",
-      message: ""
+      message: "",
+      token: ""
     });
   };
 
@@ -226,9 +232,14 @@ const VehicleIdentificationSystem = () => {
         vehicle_type: vehicleData.vehicleType,
         color: vehicleData.color,
         model: vehicleData.model,
-        full_image: plateData.fullImage.split(",")[1],
-        plate_image: plateData.plateImage ? plateData.plateImage.split(",")[1] : "",
       };
+      // Images stay on the server after processing, reference them by token
+      if (plateData.token) {
+        data.token = plateData.token;
+      } else {
+        data.full_image = plateData.fullImage.split(",")[1];
+        data.plate_image = plateData.plateImage ? plateData.plateImage.split(",")[1] : "";
+      }
 
       const response = await axios.post(
         "http://127.0.0.1:5000/vehicle_plate/register_vehicle",
@@ -278,6 +289,7 @@ const VehicleIdentificationSystem = () => {
       plateNumber: "",
       fullImage: "",
       plateImage: "",
+      token: "",
     });
     setVehicleData({
       owner: "",
@@ -288,7 +300,8 @@ const VehicleIdentificationSystem = () => {
     setManualOverrideData({
       fullImage: "",
       captureMode: "",
-      message: ""
+      message: "",
+      token: ""
     });
   };
 
@@ -658,7 +671,11 @@ const VehicleIdentificationSystem = () => {
                   authResult?.success ? "vis-success-title" : "vis-error-title"
                 }
               >
-                {authResult?.success ? "Access Granted" : "Access Denied"}
+                {authResult?.success
+                  ? "Access Granted"
+                  : authResult?.needs_confirmation
+                  ? "Needs Confirmation"
+                  : "Access Denied"}
               </h2>
 
               {authResult?.success ? (
@@ -708,6 +725,18 @@ const VehicleIdentificationSystem = () => {
                     </div>
                   </div>
                 </div>
+              ) : authResult?.needs_confirmation ? (
+                <div className="vis-auth-result-container">
+                  <div className="vis-result-icon vis-error">?</div>
+                  <h3>Close Match Found</h3>
+                  <p>
+                    The read plate <strong>{authResult.plate_number}</strong>{" "}
+                    is close to the registered plate{" "}
+                    <strong>{authResult.vehicle.plate_number}</strong> (
+                    {authResult.vehicle.owner}).
+                  </p>
+                  <p>Please check the plate and confirm access manually.</p>
+                </div>
               ) : (
                 <div className="vis-auth-result-container">
                   <div className="vis-result-icon vis-error">✗</div>